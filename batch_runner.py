@@ -0,0 +1,197 @@
+# batch_runner.py
+# Równoległe przetwarzanie wielu plików wideo (pula procesów)
+#
+# Opis:
+# Dzieli pracę na dwa etapy z osobnymi limitami równoległości:
+# 1. analiza (ffprobe + odczyt QR) sesji nagrania (sessions.py) - praca CPU, pula `jobs` procesów,
+# 2. generowanie LTC i łączenie z wideo (ffmpeg) każdego pliku sesji - głównie I/O, pula `mux_jobs` procesów;
+#    rozdziały jednej sesji mają już wyliczone czasy startu, więc są łączone równolegle.
+#    Łączenia są zlecane od największego pliku, najwyżej `device_jobs` naraz na jednym urządzeniu
+#    źródłowym lub docelowym (io_scheduler.py).
+# Pełny log każdego pliku trafia do osobnego pliku w `log_dir`, a ostrzeżenia i błędy są zbierane
+# w procesie roboczym i wypisywane na konsoli w kolejności plików wejściowych; na końcu drukowane jest
+# podsumowanie. Ctrl-C anuluje oczekujące zadania i zatrzymuje procesy robocze.
+
+import heapq
+import logging
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+
+from io_scheduler import DeviceSlots, file_size, job_devices
+from log_config import capture_file_log, file_log_path
+from sessions import RecordingSession
+from video_processor import VideoProcessor
+
+logger = logging.getLogger(__name__)
+
+# Instancja VideoProcessor i katalog logów, ustawiane raz na proces roboczy (patrz _init_worker)
+_worker_processor = None
+_worker_log_dir = None
+
+
+@dataclass
+class BatchSummary:
+    """Podsumowanie przetwarzania wsadowego."""
+    succeeded: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    cancelled: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)  # już przetworzone we wcześniejszym uruchomieniu (manifest)
+    metrics: list[dict] = field(default_factory=list)  # rekordy pomiarów zakończonych plików (metrics.FileMetrics)
+
+
+def _init_worker(processor_kwargs: dict, log_level: int, log_dir: str | None):
+    # Ctrl-C obsługuje tylko proces główny - procesy robocze są zatrzymywane przez niego
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Logger główny bez handlerów (także tych odziedziczonych przez fork) - wyjście ustawia capture_file_log
+    logging.getLogger().handlers.clear()
+    logging.getLogger().setLevel(log_level)
+    global _worker_processor, _worker_log_dir
+    _worker_processor = VideoProcessor(**processor_kwargs)
+    _worker_log_dir = log_dir
+
+
+def _run_captured(video_path: str, func, *args):
+    """
+    Wywołuje func(*args), zapisując log do pliku logu `video_path` i zbierając ostrzeżenia i błędy dla konsoli.
+    Zwraca (wynik, tekst dla konsoli, rekordy pomiarów plików zakończonych w tym wywołaniu).
+    """
+    log_path = None
+    if _worker_log_dir is not None:
+        log_path = file_log_path(_worker_log_dir, video_path, _worker_processor.input_base_dir)
+    with capture_file_log(log_path, console_level=logging.WARNING) as console:
+        result = func(*args)
+    return result, console.getvalue(), _worker_processor.drain_metrics()
+
+
+def _analyze_worker(session: RecordingSession):
+    return _run_captured(session.pending[0], _worker_processor.analyze_session, session)
+
+
+def _mux_worker(plan):
+    return _run_captured(plan.video_path, _worker_processor.mux_video, plan)
+
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    terminate_workers = getattr(executor, 'terminate_workers', None)  # Python 3.14+
+    if terminate_workers is not None:
+        terminate_workers()
+        return
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+
+
+def run_batch(sessions: list[RecordingSession], processor_kwargs: dict, jobs: int, mux_jobs: int | None = None,
+              log_level: int = logging.INFO, log_dir: str | None = None, device_jobs: int | None = None,
+              get_output_path=None) -> BatchSummary:
+    """
+    Przetwarza pliki `sessions` równolegle: analiza sesji w puli `jobs` procesów, łączenie plików w puli
+    `mux_jobs` procesów. Log każdego pliku (od poziomu `log_level`) trafia do pliku w `log_dir`; ostrzeżenia
+    i błędy są wypisywane w kolejności plików, gdy tylko wszystkie wcześniejsze pliki są gotowe.
+    Gotowe do łączenia pliki są zlecane od największego; z `device_jobs` i `get_output_path`
+    (VideoProcessor.get_output_path) na każdym urządzeniu źródłowym i docelowym działa najwyżej
+    `device_jobs` łączeń naraz.
+    """
+    mux_jobs = mux_jobs or jobs
+    video_files = []
+    session_starts = []  # indeks pierwszego pliku każdej sesji w video_files
+    for session in sessions:
+        session_starts.append(len(video_files))
+        video_files.extend(session.pending)
+    summary = BatchSummary()
+    logs = [[] for _ in video_files]
+    results = [None] * len(video_files)
+    next_to_print = 0
+
+    def finish(index: int, ok: bool):
+        nonlocal next_to_print
+        results[index] = ok
+        while next_to_print < len(video_files) and results[next_to_print] is not None:
+            sys.stdout.write(''.join(logs[next_to_print]))
+            (summary.succeeded if results[next_to_print] else summary.failed).append(video_files[next_to_print])
+            next_to_print += 1
+        sys.stdout.flush()
+
+    initargs = (processor_kwargs, log_level, log_dir)
+    analysis_pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs)
+    mux_pool = ProcessPoolExecutor(max_workers=mux_jobs, initializer=_init_worker, initargs=initargs)
+    pending = {}
+    ready = []  # kopiec (-rozmiar pliku, indeks, plan, urządzenia) planów czekających na łączenie
+    slots = DeviceSlots(device_jobs if get_output_path is not None else None)
+    running_mux = 0
+
+    def submit_ready():
+        # Największe pliki najpierw; plik, którego urządzenie jest zajęte, czeka, ale nie blokuje mniejszych
+        nonlocal running_mux
+        blocked = []
+        while ready and running_mux < mux_jobs:
+            item = heapq.heappop(ready)
+            _, index, plan, devices = item
+            if not slots.can_start(devices):
+                blocked.append(item)
+                continue
+            slots.start(devices)
+            running_mux += 1
+            pending[mux_pool.submit(_mux_worker, plan)] = (index, 'mux', devices)
+        for item in blocked:
+            heapq.heappush(ready, item)
+
+    try:
+        for session, index in zip(sessions, session_starts):
+            pending[analysis_pool.submit(_analyze_worker, session)] = (index, 'analyze', None)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, stage, devices = pending.pop(future)
+                try:
+                    result, log, metrics = future.result()
+                except Exception as e:
+                    result, log, metrics = None, f"ERROR: Błąd procesu roboczego dla {video_files[index]}: {e}\n", []
+                logs[index].append(log)
+                summary.metrics.extend(metrics)
+
+                if stage == 'analyze':
+                    # Wynik analizy sesji: plan (albo None) dla każdego jej pliku, od pliku `index`
+                    plans = result or [None] * len(sessions[session_starts.index(index)].pending)
+                    for offset, plan in enumerate(plans):
+                        if plan is not None:
+                            devices = frozenset()
+                            if get_output_path is not None:
+                                devices = job_devices(plan.video_path, get_output_path(plan.video_path))
+                            heapq.heappush(ready, (-file_size(plan.video_path), index + offset, plan, devices))
+                        else:
+                            finish(index + offset, False)
+                else:
+                    slots.finish(devices)
+                    running_mux -= 1
+                    finish(index, bool(result))
+            submit_ready()
+    except KeyboardInterrupt:
+        logger.warning("Przerwano (Ctrl-C) - anulowanie oczekujących zadań i zatrzymywanie procesów roboczych...")
+        for pool in (analysis_pool, mux_pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+            _terminate_workers(pool)
+        for index in range(next_to_print, len(video_files)):
+            if results[index] is None:
+                summary.cancelled.append(video_files[index])
+            else:
+                sys.stdout.write(''.join(logs[index]))
+                (summary.succeeded if results[index] else summary.failed).append(video_files[index])
+    finally:
+        analysis_pool.shutdown(wait=True, cancel_futures=True)
+        mux_pool.shutdown(wait=True, cancel_futures=True)
+
+    return summary
+
+
+def print_summary(summary: BatchSummary):
+    logger.info("-----------------------------------")
+    logger.info("Podsumowanie: %d przetworzonych, %d nieudanych%s%s", len(summary.succeeded), len(summary.failed),
+                f", {len(summary.cancelled)} anulowanych" if summary.cancelled else "",
+                f", {len(summary.skipped)} pominiętych (bez zmian od poprzedniego uruchomienia)" if summary.skipped else "")
+    for video_file in summary.failed:
+        logger.warning("  BŁĄD: %s", video_file)
+    for video_file in summary.cancelled:
+        logger.warning("  ANULOWANO: %s", video_file)
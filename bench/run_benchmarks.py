@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# run_benchmarks.py
+# Benchmarki gorących ścieżek: kodowanie LTC, generowanie audio LTC, wyszukiwanie QR i pełne przetwarzanie pliku
+#
+# Opis:
+# Samodzielny skrypt (bez pytest) mierzący czas ścian (wall time) dla:
+# - ltc_encode     - kodowanie ramek LTC: ltc_encode (pojedyncza klatka) i ltc_encode_frames (wsadowo),
+# - ltc_audio      - generate_ltc_audio_file dla kilku długości klipu i klatkaży,
+# - qr             - VideoProcessor._read_qr_from_video na syntetycznych klipach z kodem QR
+#                    (kod generowany lokalnie przez cv2.QRCodeEncoder, klip przez ffmpeg),
+# - process        - pełne VideoProcessor.process_video na klipach testsrc z ffmpeg (oba sposoby przekazania LTC),
+# - startup        - czas startu CLI w nowym procesie: import main, main.py --help i main.py --dry-run
+#                    (oraz lista ciężkich modułów załadowanych przy imporcie main - powinna być pusta).
+# Wyniki są zapisywane jako JSON, a --compare porównuje je z poprzednim plikiem wyników
+# (kod wyjścia 1, jeśli któryś przypadek jest wolniejszy niż --threshold razy). Po zestawie startup sprawdzany
+# jest budżet czasu startu CLI (--startup-budget) - kod wyjścia 1, jeśli mediana go przekracza lub import main
+# ładuje ciężkie moduły.
+#
+# Użycie:
+#   python bench/run_benchmarks.py --output bench_results.json
+#   python bench/run_benchmarks.py --quick --suite ltc_encode ltc_audio --compare bench_results.json
+#   python bench/run_benchmarks.py --suite startup --repeat 10 --startup-budget 0.3
+#
+# Zależności:
+# - te same co main.py (numpy, OpenCV, pyzbar, timecode, timecode_tools),
+# - ffmpeg/ffprobe w PATH (zestawy qr i process).
+# Zestaw, którego zależności nie są dostępne, jest pomijany i odnotowywany w wynikach.
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from fractions import Fraction
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Moduły repozytorium i timecode_tools także bez instalacji (pip install -e ./external_libs/timecode_tools_repo/)
+for path in (REPO_DIR, os.path.join(REPO_DIR, 'external_libs', 'timecode_tools_repo')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+SUITES = ('ltc_encode', 'ltc_audio', 'qr', 'process', 'startup')
+
+QR_TEXT = 'oT250618091541.679oTD1oTZ2oTI0'
+QR_START_SECONDS = 3.0      # Od której sekundy klipu syntetycznego widoczny jest kod QR
+CLIP_SIZE = '1280x720'
+# Moduły, których import main.py nie powinien ładować (importowane dopiero w etapach analizy i łączenia)
+HEAVY_MODULES = ('cv2', 'numpy', 'pyzbar', 'scipy', 'timecode', 'timecode_tools', 'ltc_audio', 'qr_scanner')
+STARTUP_BUDGET_SECONDS = 0.5
+
+
+class SkipSuite(Exception):
+    """Zestaw nie może zostać uruchomiony w tym środowisku (brak zależności)."""
+
+
+def _timed(func, repeat: int, warmup: int = 0):
+    """Wywołuje func() `warmup` + `repeat` razy. Zwraca (czasy w sekundach, wynik ostatniego wywołania)."""
+    result = None
+    for _ in range(warmup):
+        result = func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def _record(results: list, suite: str, name: str, params: dict, times: list[float], **extra):
+    results.append({
+        'suite': suite,
+        'name': f"{suite}.{name}[{','.join(f'{key}={value}' for key, value in params.items())}]",
+        'params': params,
+        'repeat': len(times),
+        'times_s': times,
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+        'extra': extra,
+    })
+    print(f"  {results[-1]['name']}: median {results[-1]['median_s'] * 1000:.1f} ms (min {results[-1]['min_s'] * 1000:.1f} ms)")
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Wycisza wyjście mierzonego kodu (komunikaty DEBUG nie powinny zaburzać pomiarów ani raportu)."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _import_video_processor():
+    try:
+        with _quiet():
+            import video_processor
+    except ImportError as e:
+        raise SkipSuite(f"nie można zaimportować video_processor: {e}") from e
+    return video_processor
+
+
+def _require_ffmpeg():
+    for tool in ('ffmpeg', 'ffprobe'):
+        if shutil.which(tool) is None:
+            raise SkipSuite(f"{tool} nie znaleziono w PATH")
+
+
+def _video_encoder_args() -> list[str]:
+    encoders = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True).stdout
+    if ' libx264 ' in encoders:
+        return ['-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p']
+    return ['-c:v', 'mpeg4', '-q:v', '3']
+
+
+def _make_qr_png(path: str, size: int = 360):
+    import cv2
+    qr = cv2.QRCodeEncoder.create().encode(QR_TEXT)
+    qr = cv2.resize(qr, (size, size), interpolation=cv2.INTER_NEAREST)
+    border = size // 8
+    cv2.imwrite(path, cv2.copyMakeBorder(qr, border, border, border, border, cv2.BORDER_CONSTANT, value=255))
+
+
+def _make_clip(path: str, frame_rate: str, duration_seconds: float, qr_png: str | None = None) -> str:
+    """Tworzy klip testsrc (z tonem 1 kHz jako ścieżką audio), opcjonalnie z kodem QR od QR_START_SECONDS."""
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f"testsrc=size={CLIP_SIZE}:rate={frame_rate}:duration={duration_seconds}",
+        '-f', 'lavfi', '-i', f"sine=frequency=1000:sample_rate=48000:duration={duration_seconds}",
+    ]
+    if qr_png is not None:
+        command += ['-i', qr_png, '-filter_complex', f"[0:v][2:v]overlay=x=80:y=80:enable='gte(t,{QR_START_SECONDS})'[v]",
+                    '-map', '[v]', '-map', '1:a']
+    command += _video_encoder_args() + ['-c:a', 'aac', '-shortest', path]
+    subprocess.run(command, check=True, capture_output=True)
+    return path
+
+
+def bench_ltc_encode(results: list, repeat: int, quick: bool, work_dir: str):
+    try:
+        from timecode import Timecode
+        from timecode_tools.tools import ltc_encode, ltc_encode_frames
+    except ImportError as e:
+        raise SkipSuite(f"brak timecode/timecode_tools: {e}") from e
+
+    frame_rates = (25, 29.97) if quick else (23.976, 25, 29.97, 50, 59.94)
+    single_frames = 1000
+    batch_seconds = 600 if quick else 3600
+    for fps in frame_rates:
+        timecodes = [Timecode(fps, frames=frame) for frame in range(1, single_frames + 1)]
+        times, _ = _timed(lambda: [ltc_encode(tc, as_string=False) for tc in timecodes], repeat, warmup=1)
+        _record(results, 'ltc_encode', 'ltc_encode', {'fps': fps, 'frames': single_frames}, times,
+                frames_per_second=single_frames / statistics.median(times))
+
+        count = int(batch_seconds * fps)
+        times, _ = _timed(lambda: ltc_encode_frames(0, count, fps), repeat, warmup=1)
+        _record(results, 'ltc_encode', 'ltc_encode_frames', {'fps': fps, 'frames': count}, times,
+                frames_per_second=count / statistics.median(times))
+
+
+def bench_ltc_audio(results: list, repeat: int, quick: bool, work_dir: str):
+    vp = _import_video_processor()
+    start = datetime.datetime(2025, 6, 18, 9, 15, 41, 679000, tzinfo=datetime.timezone.utc)
+    durations = (10, 60) if quick else (10, 60, 600)
+    frame_rates = (25, 29.97) if quick else (23.976, 25, 29.97, 50, 59.94)
+    output_path = os.path.join(work_dir, 'ltc.wav')
+    for duration in durations:
+        for fps in frame_rates:
+            def run():
+                with _quiet():
+                    if not vp.generate_ltc_audio_file(start, float(duration), float(fps), output_path):
+                        raise RuntimeError(f"generate_ltc_audio_file nie powiodło się (fps={fps}, duration={duration})")
+            times, _ = _timed(run, repeat)
+            _record(results, 'ltc_audio', 'generate_ltc_audio_file', {'fps': fps, 'duration_s': duration}, times,
+                    bytes_written=os.path.getsize(output_path),
+                    realtime_factor=duration / statistics.median(times))
+    os.remove(output_path)
+
+
+def bench_qr(results: list, repeat: int, quick: bool, work_dir: str):
+    vp = _import_video_processor()
+    _require_ffmpeg()
+    qr_png = os.path.join(work_dir, 'qr.png')
+    _make_qr_png(qr_png)
+
+    frame_rates = ('25',) if quick else ('25', '30000/1001', '50')
+    for frame_rate in frame_rates:
+        clip = _make_clip(os.path.join(work_dir, f"qr_{frame_rate.replace('/', '_')}.mp4"), frame_rate, 12, qr_png)
+        fps = float(Fraction(frame_rate))
+        for source in vp.QR_FRAME_SOURCES:
+            def run():
+                # Nowy procesor przy każdym powtórzeniu - bez ROI zapamiętanego z poprzedniego przebiegu
+                processor = vp.VideoProcessor(os.path.join(work_dir, 'out_qr'), work_dir, qr_frame_source=source,
+                                              use_media_cache=False, use_manifest=False)
+                with _quiet():
+                    return processor._read_qr_from_video(clip, fps)
+            times, (qr_time, frame_index) = _timed(run, repeat)
+            _record(results, 'qr', '_read_qr_from_video', {'source': source, 'fps': frame_rate}, times,
+                    frame_index=frame_index, found=qr_time is not None)
+
+
+def bench_process(results: list, repeat: int, quick: bool, work_dir: str):
+    vp = _import_video_processor()
+    _require_ffmpeg()
+    qr_png = os.path.join(work_dir, 'qr.png')
+    _make_qr_png(qr_png)
+
+    durations = (10,) if quick else (10, 60)
+    input_dir = os.path.join(work_dir, 'process_in')
+    os.makedirs(input_dir, exist_ok=True)
+    for duration in durations:
+        clip = _make_clip(os.path.join(input_dir, f"clip_{duration}s.mp4"), '30000/1001', duration, qr_png)
+        for transport in vp.LTC_TRANSPORTS:
+            def run():
+                processor = vp.VideoProcessor(os.path.join(work_dir, 'process_out'), input_dir, ltc_transport=transport,
+                                              use_media_cache=False, use_manifest=False)
+                with _quiet():
+                    if not processor.process_video(clip):
+                        raise RuntimeError(f"process_video nie powiodło się dla {clip} ({transport})")
+            times, _ = _timed(run, repeat)
+            _record(results, 'process', 'process_video', {'transport': transport, 'duration_s': duration}, times,
+                    realtime_factor=duration / statistics.median(times))
+
+
+def _timed_process(command: list[str], repeat: int, warmup: int = 1) -> list[float]:
+    """Czasy ścian `repeat` uruchomień polecenia w nowym procesie (po `warmup` uruchomieniach rozgrzewających)."""
+    def run():
+        subprocess.run(command, cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    times, _ = _timed(run, repeat, warmup)
+    return times
+
+
+def bench_startup(results: list, repeat: int, quick: bool, work_dir: str):
+    python = sys.executable
+    main_script = os.path.join(REPO_DIR, 'main.py')
+    check_heavy = (f"import sys, json, main; "
+                   f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    heavy_modules = json.loads(subprocess.run([python, '-c', check_heavy], cwd=REPO_DIR, check=True,
+                                              capture_output=True, text=True).stdout)
+
+    # Plik o nazwie spoza rozdziałów GoPro - sesja jednoplikowa, więc --dry-run nie uruchamia nawet ffprobe
+    input_dir = os.path.join(work_dir, 'startup_in')
+    os.makedirs(input_dir, exist_ok=True)
+    open(os.path.join(input_dir, 'clip.mp4'), 'wb').close()
+    cases = {
+        'interpreter': [python, '-c', 'pass'],
+        'import_main': [python, '-c', 'import main'],
+        'help': [python, main_script, '--help'],
+        'dry_run': [python, main_script, input_dir, os.path.join(work_dir, 'startup_out'), '--dry-run',
+                    '--no-manifest', '--no-media-cache'],
+    }
+    for name, command in cases.items():
+        times = _timed_process(command, repeat)
+        extra = {'heavy_modules': heavy_modules} if name == 'import_main' else {}
+        _record(results, 'startup', name, {}, times, **extra)
+    if heavy_modules:
+        print(f"  UWAGA: import main ładuje ciężkie moduły: {', '.join(heavy_modules)}")
+
+
+def check_startup_budget(results: list, budget: float) -> bool:
+    """Sprawdza, czy mediany przypadków zestawu startup (poza samym interpreterem) mieszczą się w `budget` sekund
+    i czy import main nie ładuje ciężkich modułów. Zwraca False przy przekroczeniu."""
+    ok = True
+    print(f"\nBudżet startu CLI: {budget * 1000:.0f} ms")
+    for result in results:
+        if result['suite'] != 'startup' or result['name'].startswith('startup.interpreter'):
+            continue
+        over = result['median_s'] > budget
+        heavy_modules = result['extra'].get('heavy_modules')
+        ok = ok and not over and not heavy_modules
+        print(f"  {result['name']}: {result['median_s'] * 1000:.1f} ms{'  PRZEKROCZONO' if over else ''}"
+              f"{'  CIĘŻKIE MODUŁY: ' + ', '.join(heavy_modules) if heavy_modules else ''}")
+    return ok
+
+
+BENCHMARKS = {
+    'ltc_encode': bench_ltc_encode,
+    'ltc_audio': bench_ltc_audio,
+    'qr': bench_qr,
+    'process': bench_process,
+    'startup': bench_startup,
+}
+
+
+def _metadata() -> dict:
+    import numpy as np
+    meta = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+    with contextlib.suppress(OSError, subprocess.CalledProcessError):
+        meta['git_commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                            capture_output=True, text=True, check=True).stdout.strip()
+    with contextlib.suppress(OSError, subprocess.CalledProcessError, IndexError):
+        meta['ffmpeg'] = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True,
+                                        check=True).stdout.splitlines()[0]
+    return meta
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> bool:
+    """Porównuje medianę czasów z poprzednim plikiem wyników. Zwraca False, jeśli jest regresja powyżej `threshold`."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+
+    ok = True
+    print(f"\nPorównanie z {baseline_path} (próg regresji: x{threshold}):")
+    for result in results:
+        previous = baseline.get(result['name'])
+        if previous is None:
+            print(f"  {result['name']}: brak w pliku bazowym")
+            continue
+        ratio = result['median_s'] / previous['median_s'] if previous['median_s'] else float('inf')
+        regression = ratio > threshold
+        ok = ok and not regression
+        print(f"  {result['name']}: {previous['median_s'] * 1000:.1f} ms -> {result['median_s'] * 1000:.1f} ms"
+              f" (x{ratio:.2f}){'  REGRESJA' if regression else ''}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarki generowania LTC, wyszukiwania QR i łączenia z wideo.")
+    parser.add_argument("--suite", nargs='+', choices=SUITES, default=list(SUITES),
+                        help="Zestawy do uruchomienia. Domyślnie: wszystkie.")
+    parser.add_argument("--repeat", type=int, default=3, help="Liczba powtórzeń każdego przypadku. Domyślnie: 3.")
+    parser.add_argument("--quick", action="store_true", help="Mniej i krótszych przypadków (szybki przebieg kontrolny).")
+    parser.add_argument("--output", help="Plik JSON z wynikami. Domyślnie wyniki są tylko wypisywane.")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Porównaj wyniki z wcześniejszym plikiem JSON.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Dopuszczalny stosunek mediany do wyniku bazowego przy --compare. Domyślnie: 1.2.")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS, metavar="SECONDS",
+                        help=f"Maksymalna mediana czasu startu CLI sprawdzana po zestawie startup. Domyślnie: {STARTUP_BUDGET_SECONDS}.")
+    args = parser.parse_args()
+
+    report = {'meta': _metadata(), 'results': [], 'skipped': []}
+    report['meta'].update(repeat=args.repeat, quick=args.quick)
+    with tempfile.TemporaryDirectory(prefix='ltc_bench_') as work_dir:
+        for suite in args.suite:
+            print(f"[{suite}]")
+            try:
+                BENCHMARKS[suite](report['results'], args.repeat, args.quick, work_dir)
+            except SkipSuite as e:
+                print(f"  pominięto: {e}")
+                report['skipped'].append({'suite': suite, 'reason': str(e)})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nZapisano wyniki: {args.output}")
+
+    ok = True
+    if args.compare and not compare(report['results'], args.compare, args.threshold):
+        ok = False
+    if 'startup' in args.suite and not check_startup_budget(report['results'], args.startup_budget):
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,10 @@ setup(
     name='timecode-tools-local-pkg',
     version='0.1.0',
     packages=find_packages(),
+    install_requires=[
+        'numpy',
+        'timecode',
+    ],
     author='Jeff Mikels (Oryginalny Autor)',
     description='Lokalna kopia narzędzi timecode, w tym ltc_encode, z repozytorium Jeffa Mikelsa.',
     long_description=open(os.path.join(os.path.dirname(__file__), 'README.md')).read() if os.path.exists(os.path.join(os.path.dirname(__file__), 'README.md')) else '',
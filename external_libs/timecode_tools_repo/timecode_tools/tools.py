@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+from fractions import Fraction
+
+import numpy as np
 from timecode import Timecode
 
 
@@ -50,55 +53,152 @@ def units_tens(n):
 # everything is encoded little endian
 # so to encode the number 3 with four bits, we have 1100
 
+# bit layout of one LTC frame: (field, first bit, number of bits)
+# the remaining bits (user bits, other flags) stay at zero
+LTC_BITS_PER_FRAME = 80
+LTC_SYNC_WORD = '0011111111111101'
+LTC_DROP_FRAME_BIT = 10
+LTC_FIELDS = (
+    ('frame_units', 0, 4),
+    ('frame_tens', 8, 2),
+    ('secs_units', 16, 4),
+    ('secs_tens', 24, 3),
+    ('mins_units', 32, 4),
+    ('mins_tens', 40, 3),
+    ('hrs_units', 48, 4),
+    ('hrs_tens', 56, 2),
+)
+
+
+def _ltc_template():
+  bits = np.zeros(LTC_BITS_PER_FRAME, dtype=np.uint8)
+  bits[64:] = [int(b) for b in LTC_SYNC_WORD]
+  return bits
+
+
+def _ltc_field_table(first_bit, bits, max_value):
+  # one row per value: the 80-bit frame contribution of the units/tens digit
+  # built with ble() so the bit order (and truncation) matches the string encoder
+  table = np.zeros((max_value, LTC_BITS_PER_FRAME), dtype=np.uint8)
+  for n in range(max_value):
+    table[n, first_bit:first_bit + bits] = [int(b) for b in ble(n, bits)]
+  return table
+
+
+def _ltc_bcd_table(units_field, tens_field, max_value):
+  # BCD lookup table indexed directly by the value (frames, secs, mins or hrs)
+  _, units_bit, units_bits = units_field
+  _, tens_bit, tens_bits = tens_field
+  units = _ltc_field_table(units_bit, units_bits, 10)
+  tens = _ltc_field_table(tens_bit, tens_bits, (max_value + 9) // 10)
+  values = np.arange(max_value)
+  return units[values % 10] | tens[values // 10]
+
+
+LTC_TEMPLATE = _ltc_template()
+# the frame tens field has 2 bits, so frame values repeat every 40 (ble() drops the higher tens bits);
+# frame values of high rates (100-119 at 120 fps) are looked up modulo the table size
+LTC_FRAMES_TABLE = _ltc_bcd_table(LTC_FIELDS[0], LTC_FIELDS[1], 40)
+LTC_SECS_TABLE = _ltc_bcd_table(LTC_FIELDS[2], LTC_FIELDS[3], 60)
+LTC_MINS_TABLE = _ltc_bcd_table(LTC_FIELDS[4], LTC_FIELDS[5], 60)
+LTC_HRS_TABLE = _ltc_bcd_table(LTC_FIELDS[6], LTC_FIELDS[7], 100)
+
+
+def ltc_encode_tc(hrs, mins, secs, frs, drop_frame=False):
+  # encode timecode fields (scalars or arrays of equal length) into an (N, 80) uint8 bit array
+  hrs, mins, secs, frs = (np.atleast_1d(np.asarray(v, dtype=np.int64)) for v in (hrs, mins, secs, frs))
+  bits = (LTC_TEMPLATE
+          | LTC_FRAMES_TABLE[frs % len(LTC_FRAMES_TABLE)]
+          | LTC_SECS_TABLE[secs]
+          | LTC_MINS_TABLE[mins]
+          | LTC_HRS_TABLE[hrs])
+  if drop_frame:
+    bits[:, LTC_DROP_FRAME_BIT] = 1
+  return bits
+
+
+def ltc_frame_rate(framerate):
+  # exact frame rate as a Fraction: '29.97', 29.97 and 30000/1001 all mean 30000/1001
+  # (rates within 0.01 of n*1000/1001 are the NTSC-style fractional rates)
+  rate = Fraction(framerate)
+  nominal = round(rate)
+  if rate.denominator != 1 and nominal and abs(rate - Fraction(nominal * 1000, 1001)) < Fraction(1, 100):
+    return Fraction(nominal * 1000, 1001)
+  return rate.limit_denominator(1001)
+
+
+def ltc_rate_params(framerate, drop_frame=None):
+  # integer frame base (frames per timecode second) and drop-frame counting for a frame rate
+  # 30000/1001 and 60000/1001 count drop-frame unless drop_frame=False is given
+  rate = ltc_frame_rate(framerate)
+  int_framerate = round(rate)
+  if drop_frame is None:
+    drop_frame = rate.denominator == 1001 and int_framerate in (30, 60)
+  if drop_frame and int_framerate % 30:
+    raise ValueError('drop-frame timecode is only defined for 29.97 and 59.94 fps, not {}'.format(rate))
+  return int_framerate, bool(drop_frame)
+
+
+def frames_to_tc_array(frame_numbers, framerate, drop_frame=None):
+  # vectorized Timecode.frames_to_tc() for zero-based frame numbers (Timecode.frame_number)
+  # with exact integer drop-frame counting: 2 (29.97) or 4 (59.94) labels skipped
+  # every minute except every tenth, timecode rolls over after 24 hours
+  ifps, drop_frame = ltc_rate_params(framerate, drop_frame)
+  drop_frames = ifps // 15 if drop_frame else 0
+
+  frames_per_minute = ifps * 60 - drop_frames
+  frames_per_10_minutes = ifps * 60 * 10 - drop_frames * 9
+  frames_per_24_hours = frames_per_10_minutes * 6 * 24
+
+  frame_number = np.asarray(frame_numbers, dtype=np.int64) % frames_per_24_hours
+  if drop_frame:
+    d = frame_number // frames_per_10_minutes
+    m = frame_number % frames_per_10_minutes
+    skipped = drop_frames * 9 * d
+    skipped = skipped + np.where(m > drop_frames, drop_frames * ((m - drop_frames) // frames_per_minute), 0)
+    frame_number = frame_number + skipped
+
+  total_secs = frame_number // ifps
+  return total_secs // 3600, (total_secs // 60) % 60, total_secs % 60, frame_number % ifps
+
+
+def ltc_frame_parity(start_frame, count, framerate, drop_frame=None):
+  # parity (0/1, uint8) of the number of zero bits in each of `count` LTC frames, without building the frames:
+  # a biphase mark signal ends a frame at the opposite level to its start iff the parity is 1
+  # (80 bits per frame, so the parity of zeros equals the parity of ones - summed from the lookup tables)
+  _, drop_frame = ltc_rate_params(framerate, drop_frame)
+  frame_numbers = np.arange(start_frame, start_frame + count, dtype=np.int64)
+  hrs, mins, secs, frs = frames_to_tc_array(frame_numbers, framerate, drop_frame)
+  ones = (int(LTC_TEMPLATE.sum()) + int(drop_frame)
+          + LTC_FRAMES_TABLE.sum(axis=1)[frs % len(LTC_FRAMES_TABLE)]
+          + LTC_SECS_TABLE.sum(axis=1)[secs]
+          + LTC_MINS_TABLE.sum(axis=1)[mins]
+          + LTC_HRS_TABLE.sum(axis=1)[hrs])
+  return (ones & 1).astype(np.uint8)
+
+
+def frames_to_tc_string(frame_number, framerate, drop_frame=None):
+  # 'HH:MM:SS:FF' label of a zero-based frame number, 'HH:MM:SS;FF' for drop-frame
+  _, drop_frame = ltc_rate_params(framerate, drop_frame)
+  hrs, mins, secs, frs = (int(v[0]) for v in frames_to_tc_array([frame_number], framerate, drop_frame))
+  return '{:02d}:{:02d}:{:02d}{}{:02d}'.format(hrs, mins, secs, ';' if drop_frame else ':', frs)
+
+
+def ltc_encode_frames(start_frame, count, framerate, drop_frame=None):
+  # encode `count` consecutive LTC frames starting at the zero-based frame number `start_frame`
+  # returns an (count, 80) uint8 array with one bit per element, drop-frame flag set for DF rates
+  _, drop_frame = ltc_rate_params(framerate, drop_frame)
+  frame_numbers = np.arange(start_frame, start_frame + count, dtype=np.int64)
+  return ltc_encode_tc(*frames_to_tc_array(frame_numbers, framerate, drop_frame), drop_frame=drop_frame)
+
 
 def ltc_encode(timecode, as_string=False):
-  LTC = ''
-  HLP = ''
   hrs, mins, secs, frs = timecode.frames_to_tc(timecode.frames)
-  frame_units, frame_tens = units_tens(frs)
-  secs_units, secs_tens = units_tens(secs)
-  mins_units, mins_tens = units_tens(mins)
-  hrs_units, hrs_tens = units_tens(hrs)
-
-  # frames units / user bits field 1 / frames tens
-  LTC += ble(frame_units, 4) + '0000' + ble(frame_tens, 2)
-  HLP += '---{u}____-{t}'.format(u=frame_units, t=frame_tens)
-
-  # drop frame / color frame / user bits field 2
-  LTC += '00'+'0000'
-  HLP += '__'+'____'
-
-  # secs units / user bits field 3 / secs tens
-  LTC += ble(secs_units, 4) + '0000' + ble(secs_tens, 3)
-  HLP += '---{u}____--{t}'.format(u=secs_units, t=secs_tens)
-
-  # bit 27 flag / user bits field 4
-  LTC += '0' + '0000'
-  HLP += '_' + '____'
-
-  # mins units / user bits field 5 / mins tens
-  LTC += ble(mins_units, 4) + '0000' + ble(mins_tens, 3)
-  HLP += '---{u}____--{t}'.format(u=mins_units, t=mins_tens)
-
-  # bit 43 flag / user bits field 6
-  LTC += '0' + '0000'
-  HLP += '_' + '____'
-
-  # hrs units / user bits field 7 / hrs tens
-  LTC += ble(hrs_units, 4) + '0000' + ble(hrs_tens, 2)
-  HLP += '---{u}____--{t}'.format(u=hrs_units, t=hrs_tens)
-
-  # bit 58 clock flag / bit 59 flag / user bits field 8
-  LTC += '0' + '0' + '0000'
-  HLP += '_' + '_' + '____'
-
-  # sync word
-  LTC += '0011111111111101'
-  HLP += '################'
+  LTC = ltc_encode_tc(hrs, mins, secs, frs, drop_frame=timecode.drop_frame)[0]
   if as_string:
-    return LTC
+    return (LTC + ord('0')).tobytes().decode('ascii')
   else:
-    return bitstring_to_bytes(LTC, bytecount=10)
+    return np.packbits(LTC).tobytes()
 
 
 ##
@@ -0,0 +1,117 @@
+# ffmpeg_runner.py
+# Uruchamianie ffmpeg przez asyncio z postępem z -progress i ograniczonym buforem stderr
+#
+# Opis:
+# Zamiast subprocess.run(capture_output=True), które trzyma całe wyjście ffmpeg w pamięci aż do końca procesu,
+# run_ffmpeg_async:
+# - dodaje do komendy '-progress pipe:1 -nostats' i czyta postęp (pary klucz=wartość, blok kończy 'progress=')
+#   ze stdout na bieżąco, przekazując go do `on_progress`,
+# - zachowuje tylko ostatnie FFMPEG_STDERR_TAIL_LINES linii stderr (komunikaty błędów i podsumowanie -benchmark),
+# - opcjonalnie podaje na stdin bloki bajtów (np. próbki PCM), pobierając kolejny blok z generatora w wątku,
+#   żeby synteza nie blokowała pętli zdarzeń, gdy równolegle działa kilka procesów.
+# run_ffmpeg to synchroniczne opakowanie (własna pętla zdarzeń) dla kodu, który nie działa w asyncio.
+#
+# Zależności:
+# - FFmpeg (musi być zainstalowany i dostępny w PATH)
+
+import asyncio
+import logging
+import subprocess
+from collections import deque
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Liczba ostatnich linii stderr ffmpeg zachowywanych dla komunikatów błędów i metryk (-benchmark)
+FFMPEG_STDERR_TAIL_LINES = 40
+
+
+@dataclass
+class FFmpegResult:
+    """Wynik zakończonego procesu ffmpeg."""
+    returncode: int
+    stderr: str  # ostatnie FFMPEG_STDERR_TAIL_LINES linii
+    progress: dict[str, str] = field(default_factory=dict)  # ostatni blok postępu (-progress)
+
+
+def progress_command(command: list[str]) -> list[str]:
+    """Komenda ffmpeg z wyjściem postępu na stdout ('-progress pipe:1') i bez linii statystyk na stderr."""
+    return [command[0], '-progress', 'pipe:1', '-nostats', *command[1:]]
+
+
+async def _read_progress(stream: asyncio.StreamReader, progress: dict, on_progress):
+    block = {}
+    async for line in stream:
+        key, _, value = line.decode('utf-8', errors='replace').strip().partition('=')
+        if not key:
+            continue
+        block[key] = value
+        if key == 'progress':
+            progress.clear()
+            progress.update(block)
+            if on_progress is not None:
+                on_progress(dict(block))
+            block = {}
+
+
+async def _read_tail(stream: asyncio.StreamReader, tail: deque):
+    async for line in stream:
+        tail.append(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+
+
+async def _write_blocks(stream: asyncio.StreamWriter, blocks):
+    """Pisze bloki na stdin; kolejny blok jest pobierany z iteratora w wątku (synteza nie blokuje pętli)."""
+    iterator = iter(blocks)
+    try:
+        while True:
+            block = await asyncio.to_thread(next, iterator, None)
+            if block is None:
+                break
+            stream.write(block)
+            await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg przestał czytać wejście (np. przez -shortest) - o błędzie zdecyduje kod wyjścia
+        pass
+    finally:
+        stream.close()
+        try:
+            await stream.wait_closed()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+async def run_ffmpeg_async(command: list[str], stdin_blocks=None, on_progress=None) -> FFmpegResult:
+    """
+    Uruchamia ffmpeg (komenda bez opcji -progress - dodaje je progress_command) i czeka na jego zakończenie.
+    `stdin_blocks` - iterowalne bloki bajtów podawane na stdin (komenda powinna czytać 'pipe:0').
+    `on_progress` - wywoływana z każdym blokiem postępu (słownik, np. out_time, speed, total_size, progress).
+    Rzuca subprocess.CalledProcessError (z końcówką stderr) dla niezerowego kodu wyjścia
+    i FileNotFoundError, jeśli ffmpeg nie jest dostępny.
+    """
+    command = progress_command(command)
+    process = await asyncio.create_subprocess_exec(
+        *command, stdin=subprocess.PIPE if stdin_blocks is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    progress = {}
+    tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+    tasks = [_read_progress(process.stdout, progress, on_progress), _read_tail(process.stderr, tail)]
+    if stdin_blocks is not None:
+        tasks.append(_write_blocks(process.stdin, stdin_blocks))
+    try:
+        await asyncio.gather(*tasks)
+        returncode = await process.wait()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    stderr = '\n'.join(tail)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, None, stderr)
+    return FFmpegResult(returncode, stderr, progress)
+
+
+def run_ffmpeg(command: list[str], stdin_blocks=None, on_progress=None) -> FFmpegResult:
+    """Synchroniczne run_ffmpeg_async - we własnej pętli zdarzeń (wywoływane z wątku bez działającej pętli)."""
+    return asyncio.run(run_ffmpeg_async(command, stdin_blocks, on_progress))
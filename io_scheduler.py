@@ -0,0 +1,70 @@
+# io_scheduler.py
+# Kolejność i limity zadań łączenia z podziałem na urządzenia (dyski, czytniki kart)
+#
+# Opis:
+# Drzewa wejściowe mają zwykle jeden czytnik kart lub dysk na kamerę (source/<kamera>/...), a wiele
+# jednoczesnych procesów ffmpeg czytających z tego samego dysku talerzowego (albo piszących na ten sam dysk
+# docelowy) tylko zwiększa liczbę przeskoków głowicy. Dlatego:
+# - każde zadanie łączenia ma zbiór urządzeń (st_dev pliku źródłowego i katalogu docelowego),
+# - DeviceSlots pozwala uruchomić zadanie tylko wtedy, gdy na każdym jego urządzeniu działa mniej niż
+#   `per_device` zadań,
+# - największe pliki (i sesje) idą pierwsze, żeby na końcu przetwarzania nie został jeden długi plik.
+
+import os
+
+from sessions import RecordingSession
+
+
+def device_id(path: str) -> int:
+    """st_dev urządzenia ścieżki; dla nieistniejącej jeszcze ścieżki (plik wyjściowy) - najbliższego istniejącego katalogu."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except FileNotFoundError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise
+            path = parent
+
+
+def job_devices(source_path: str, output_path: str) -> frozenset[int]:
+    """Urządzenia, z których czyta i na które pisze zadanie łączenia (jedno, jeśli źródło i cel są na tym samym)."""
+    return frozenset((device_id(source_path), device_id(output_path)))
+
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def largest_first(sessions: list[RecordingSession]) -> list[RecordingSession]:
+    """Sesje od największej łącznej wielkości plików do przetworzenia (sortowanie stabilne)."""
+    return sorted(sessions, key=lambda session: sum(file_size(path) for path in session.pending), reverse=True)
+
+
+class DeviceSlots:
+    """Licznik zadań działających na każdym urządzeniu, z limitem `per_device` (0 lub None = bez limitu)."""
+
+    def __init__(self, per_device: int | None):
+        if per_device is not None and per_device < 0:
+            raise ValueError(f"Limit zadań na urządzenie nie może być ujemny: {per_device}")
+        self.per_device = per_device or None
+        self.running = {}
+
+    def can_start(self, devices: frozenset[int]) -> bool:
+        if self.per_device is None:
+            return True
+        return all(self.running.get(device, 0) < self.per_device for device in devices)
+
+    def start(self, devices: frozenset[int]):
+        for device in devices:
+            self.running[device] = self.running.get(device, 0) + 1
+
+    def finish(self, devices: frozenset[int]):
+        for device in devices:
+            self.running[device] -= 1
+            if not self.running[device]:
+                del self.running[device]
@@ -0,0 +1,137 @@
+# job_manifest.py
+# Manifest zadań - wznawialne, przyrostowe przetwarzanie katalogu wejściowego
+#
+# Opis:
+# Baza SQLite w katalogu wyjściowym zapisuje stan każdego pliku źródłowego (pending/running/done/failed),
+# wynik odczytu QR, odcisk pliku źródłowego oraz ścieżkę i sumę kontrolną pliku wyjściowego.
+# Ponowne uruchomienie pomija pliki ukończone i niezmienione, a wznawia tylko oczekujące, nieudane
+# lub przerwane (stan 'running' z poprzedniego przebiegu) oraz te, których plik wyjściowy zniknął lub się zmienił.
+# Zapisywana jest też postać wyniku ('remux' lub 'sidecar') - zmiana trybu oznacza ponowne przetworzenie.
+#
+# Odcisk i suma kontrolna są liczone z rozmiaru pliku i próbek jego zawartości (początek, środek, koniec),
+# żeby nie czytać całych wielogigabajtowych plików.
+
+import datetime
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+from urllib.parse import quote
+
+MANIFEST_FILENAME = '.ltc_manifest.sqlite'
+
+JOB_STATES = ('pending', 'running', 'done', 'failed')
+
+# Kolumny dodane po pierwszej wersji tabeli jobs (nazwa, typ)
+ADDED_COLUMNS = (('output_mode', 'TEXT'),)
+
+# Rozmiar jednej próbki zawartości pliku przy liczeniu sumy kontrolnej
+CHECKSUM_SAMPLE_BYTES = 1 << 20
+
+
+def sampled_checksum(path: str, sample_bytes: int = CHECKSUM_SAMPLE_BYTES) -> str:
+    """Suma BLAKE2b z rozmiaru pliku i trzech próbek jego zawartości (początek, środek, koniec)."""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode('ascii'), digest_size=16)
+    with open(path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - sample_bytes // 2), max(0, size - sample_bytes)}):
+            f.seek(offset)
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+
+class JobManifest:
+    """
+    Stan przetwarzania plików źródłowych w bazie SQLite.
+    Baza jest otwierana na czas jednej operacji, więc może być współdzielona przez procesy robocze.
+    Z `read_only` istniejąca baza jest tylko odczytywana (--dry-run) - zmiany stanu rzucają sqlite3.Error.
+    """
+
+    def __init__(self, db_path: str, read_only: bool = False):
+        self.db_path = db_path
+        self.read_only = read_only
+        if read_only:
+            return
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " source_path TEXT PRIMARY KEY,"
+                " source_size INTEGER, source_mtime_ns INTEGER, source_checksum TEXT,"
+                " state TEXT NOT NULL DEFAULT 'pending',"
+                " qr_time TEXT, qr_frame_index INTEGER,"
+                " output_path TEXT, output_size INTEGER, output_mtime_ns INTEGER, output_checksum TEXT,"
+                " output_mode TEXT,"
+                " error TEXT, updated_at TEXT NOT NULL)"
+            )
+            # Manifesty sprzed dodania kolumn - brakujące kolumny są dopisywane
+            columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in ADDED_COLUMNS:
+                if column not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            return sqlite3.connect(f"file:{quote(os.path.abspath(self.db_path))}?mode=ro", uri=True, timeout=30)
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _update(self, source_path: str, **fields):
+        fields['updated_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        source_path = os.path.abspath(source_path)
+        columns = ', '.join(fields)
+        placeholders = ', '.join('?' for _ in fields)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in fields)
+        with closing(self._connect()) as db, db:
+            db.execute(f"INSERT INTO jobs (source_path, {columns}) VALUES (?, {placeholders}) "
+                       f"ON CONFLICT(source_path) DO UPDATE SET {updates}",
+                       (source_path, *fields.values()))
+
+    def get(self, source_path: str) -> dict | None:
+        with closing(self._connect()) as db, db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM jobs WHERE source_path = ?", (os.path.abspath(source_path),)).fetchone()
+        return dict(row) if row is not None else None
+
+    def is_complete(self, source_path: str, output_path: str, output_mode: str = 'remux', verify_checksum: bool = False) -> bool:
+        """
+        Czy plik został już poprawnie przetworzony: stan 'done' w tej samej postaci wyniku, niezmienione źródło
+        (rozmiar, mtime i odcisk z próbek zawartości) i istniejący, niezmieniony plik wyjściowy (rozmiar, mtime,
+        opcjonalnie suma kontrolna). Wpisy bez postaci wyniku (starsze manifesty) oznaczają 'remux'.
+        """
+        job = self.get(source_path)
+        if job is None or job['state'] != 'done' or job['output_path'] != os.path.abspath(output_path):
+            return False
+        if (job.get('output_mode') or 'remux') != output_mode:
+            return False
+        try:
+            source_stat = os.stat(source_path)
+            output_stat = os.stat(output_path)
+        except OSError:
+            return False
+        if (source_stat.st_size, source_stat.st_mtime_ns) != (job['source_size'], job['source_mtime_ns']):
+            return False
+        if (output_stat.st_size, output_stat.st_mtime_ns) != (job['output_size'], job['output_mtime_ns']):
+            return False
+        # Źródło podmienione na inny plik o tym samym rozmiarze i mtime (np. karta z tymi samymi nazwami plików)
+        if sampled_checksum(source_path) != job['source_checksum']:
+            return False
+        return not verify_checksum or sampled_checksum(output_path) == job['output_checksum']
+
+    def mark_pending(self, source_path: str):
+        self._update(source_path, state='pending', error=None)
+
+    def mark_running(self, source_path: str):
+        stat = os.stat(source_path)
+        self._update(source_path, state='running', source_size=stat.st_size, source_mtime_ns=stat.st_mtime_ns, error=None)
+
+    def record_qr(self, source_path: str, qr_time: datetime.datetime | None, qr_frame_index: int):
+        self._update(source_path, qr_time=qr_time.isoformat() if qr_time else None, qr_frame_index=qr_frame_index)
+
+    def mark_done(self, source_path: str, output_path: str, output_mode: str = 'remux'):
+        output_stat = os.stat(output_path)
+        self._update(source_path, state='done', error=None, output_mode=output_mode,
+                     source_checksum=sampled_checksum(source_path),
+                     output_path=os.path.abspath(output_path), output_size=output_stat.st_size,
+                     output_mtime_ns=output_stat.st_mtime_ns, output_checksum=sampled_checksum(output_path))
+
+    def mark_failed(self, source_path: str, error: str):
+        self._update(source_path, state='failed', error=error)
@@ -0,0 +1,69 @@
+# log_config.py
+# Konfiguracja logowania: konsola i osobne pliki logów dla poszczególnych plików wideo
+#
+# Opis:
+# Moduły używają loggerów `logging.getLogger(__name__)` z leniwym formatowaniem ("%s"), więc komunikaty
+# poniżej ustawionego poziomu (domyślnie DEBUG) nie są w ogóle formatowane.
+# configure_logging ustawia konsolę w procesie głównym, a capture_file_log przekierowuje logi
+# przetwarzania jednego pliku do jego pliku logu (i opcjonalnie do bufora wypisywanego potem na konsoli).
+
+import io
+import logging
+import os
+import sys
+from contextlib import contextmanager
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+CONSOLE_LOG_FORMAT = '%(levelname)s: %(message)s'
+FILE_LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+def configure_logging(level: str | int = logging.INFO):
+    """Ustawia logger główny: komunikaty od poziomu `level` trafiają na stdout."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(CONSOLE_LOG_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def file_log_path(log_dir: str, video_path: str, input_base_dir: str) -> str:
+    """Ścieżka logu pliku: <log_dir>/<ścieżka względem katalogu wejściowego>.log."""
+    relative = os.path.relpath(video_path, start=input_base_dir)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(video_path)
+    return os.path.join(log_dir, f"{relative}.log")
+
+
+@contextmanager
+def capture_file_log(log_path: str | None, console_level: int | None = None):
+    """
+    Na czas bloku `with` dopisuje logi do `log_path` (jeśli podano) i zbiera komunikaty od `console_level`
+    w buforze zwracanym jako wartość `with` (StringIO; pusty, gdy console_level jest None).
+    Logger główny w procesie roboczym nie ma własnych handlerów, więc tylko te dwa trafiają na wyjście.
+    """
+    root = logging.getLogger()
+    console = io.StringIO()
+    handlers = []
+    if console_level is not None:
+        console_handler = logging.StreamHandler(console)
+        console_handler.setLevel(max(console_level, root.level))
+        console_handler.setFormatter(logging.Formatter(CONSOLE_LOG_FORMAT))
+        handlers.append(console_handler)
+    if log_path is not None:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        file_handler = logging.FileHandler(log_path, mode='a', encoding='utf-8', delay=True)
+        file_handler.setFormatter(logging.Formatter(FILE_LOG_FORMAT))
+        handlers.append(file_handler)
+
+    for handler in handlers:
+        root.addHandler(handler)
+    try:
+        yield console
+    finally:
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
@@ -0,0 +1,430 @@
+# ltc_audio.py
+# Moduł syntezy sygnału LTC na tablicach NumPy
+#
+# Opis:
+# Zamienia strumień bitów LTC na sygnał bifazowy (biphase mark, "double pulse")
+# i dalej na próbki PCM bez pętli w Pythonie po pojedynczych bitach i próbkach.
+# Każda klatka LTC zajmuje dokładnie swoje próbki (granice klatek liczone w arytmetyce wymiernej),
+# a wyrenderowane klatki trafiają do pamięci podręcznej LRU i są używane ponownie.
+# Bardzo długie nagrania można syntezować równolegle w puli wątków (iter_ltc_pcm_blocks(workers=N)):
+# bloki klatek są niezależne poza poziomem sygnału na ich granicy, który wynika z parzystości bitów
+# poprzednich klatek (timecode_tools.tools.ltc_frame_parity), więc jest znany przed renderowaniem.
+# Audio jest generowane blokami i dopisywane do pliku WAV, którego nagłówek RIFF jest
+# uzupełniany na końcu - zużycie pamięci nie zależy od długości klipu.
+# Plik może zawierać dodatkowe chunki przed danymi audio, np. 'bext' i 'iXML' pliku Broadcast WAV
+# (bext_chunk, ixml_chunk).
+#
+# Zależności:
+# - numpy (instalacja: `pip install numpy`)
+# - timecode_tools (external_libs/, używamy ltc_encode_frames, ltc_frame_rate i cint z tools.py)
+
+import math
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from timecode_tools.tools import ltc_encode_frames, ltc_frame_parity, ltc_frame_rate, cint, LTC_BITS_PER_FRAME
+
+ON_VALUE = 32767    # Max wartość dla int16
+OFF_VALUE = -32768  # Min wartość dla int16
+
+# Liczba półbitów "double pulse" na jedną klatkę LTC
+HALF_BITS_PER_FRAME = 2 * LTC_BITS_PER_FRAME
+
+# Domyślna liczba próbek w jednym bloku audio (~5.5 s przy 48 kHz).
+# Ogranicza rozmiar tablic pomocniczych (indeksy int64), niezależnie od długości klipu.
+PCM_BLOCK_SAMPLES = 1 << 18
+
+WAV_HEADER_SIZE = 44
+
+# Największa wartość 32-bitowych pól rozmiaru RIFF i 'data' - ok. 12.4 h przy 48 kHz, mono, 16 bit
+WAV_MAX_CHUNK_SIZE = 0xFFFFFFFF
+
+# Stała część chunka 'bext' (EBU Tech 3285): opis 256, autor 32, referencja 32, data 10, godzina 8,
+# TimeReference 8, wersja 2, UMID 64, pola głośności 10, zarezerwowane 180 bajtów
+BEXT_FIXED_SIZE = 602
+BEXT_VERSION = 1
+
+# Maksymalna liczba szablonów klatek w pamięci podręcznej (ok. 1.6 KB każdy przy 48 kHz i 30 kl/s,
+# więc domyślnie ok. 26 MB - ponad 9 minut materiału 29.97 kl/s)
+LTC_TEMPLATE_CACHE_SIZE = 16384
+
+
+def biphase_mark_encode(bits: np.ndarray, start_high: bool = True) -> np.ndarray:
+    """
+    Koduje bity LTC jako "double pulse" - dwa półbity na każdy bit.
+
+    Każdy bit zaczyna się zmianą poziomu, a bit '1' ma dodatkową zmianę w połowie.
+    Poziom pierwszego półbitu wynika więc z parzystości liczby zer przed danym bitem,
+    którą liczymy jako skumulowany XOR zamiast pętli ze stanem `next_is_up`.
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    zeros = bits ^ 1
+    # Parzystość liczby zer PRZED bitem (XOR skumulowany "wyłączny")
+    parity_before = np.bitwise_xor.accumulate(zeros) ^ zeros if len(zeros) else zeros
+    first_half = parity_before ^ (1 if start_high else 0)
+    second_half = first_half ^ bits
+
+    double_pulse = np.empty(2 * len(bits), dtype=np.uint8)
+    double_pulse[0::2] = first_half
+    double_pulse[1::2] = second_half
+    return double_pulse
+
+
+class LTCFrameTemplateCache:
+    """
+    Pamięć podręczna LRU wyrenderowanych pojedynczych klatek LTC (poziomy 0/1 kolejnych próbek, uint8).
+
+    Klucz: (klatkaż, częstotliwość próbkowania, 80 bitów ramki, poziom początkowy, faza), gdzie faza
+    to ułamkowe przesunięcie początku klatki względem siatki próbek - przy klatkażach ułamkowych
+    (np. 30000/1001) klatki mają różną liczbę próbek (1601 lub 1602 przy 48 kHz) i to faza wyznacza,
+    którą z nich. Ta sama ramka (np. ten sam timecode w kolejnej kamerze albo w ponownym przebiegu)
+    jest więc renderowana tylko raz.
+    Pamięć jest współdzielona przez wątki (--ltc-threads, --async), więc operacje na LRU są pod blokadą.
+    """
+
+    def __init__(self, maxsize: int = LTC_TEMPLATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._layouts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._layouts.clear()
+            self.hits = self.misses = 0
+
+    def half_bit_layout(self, num: int, den: int, sample_rate: int, phase: int) -> np.ndarray:
+        """
+        Indeksy półbitów (0..159) dla kolejnych próbek klatki o danej fazie, przy klatkażu num/den.
+        Klatka k zaczyna się w próbce ceil(k * sample_rate * den / num); faza to (k * sample_rate * den) mod num.
+        """
+        key = (num, den, sample_rate, phase)
+        layout = self._layouts.get(key)
+        if layout is None:
+            step = sample_rate * den  # długość klatki w próbkach, pomnożona przez num
+            sample_count = -(-(phase + step) // num) - (1 if phase else 0)
+            offsets = (num - phase) % num + np.arange(sample_count, dtype=np.int64) * num
+            layout = (offsets * HALF_BITS_PER_FRAME) // step
+            self._layouts[key] = layout
+        return layout
+
+    def get(self, key) -> np.ndarray | None:
+        with self._lock:
+            template = self._templates.get(key)
+            if template is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return template
+
+    def put(self, key, template: np.ndarray) -> np.ndarray:
+        template.flags.writeable = False
+        with self._lock:
+            self._templates[key] = template
+            if len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return template
+
+
+# Wspólna pamięć podręczna szablonów klatek (na proces)
+LTC_TEMPLATE_CACHE = LTCFrameTemplateCache()
+
+
+def ltc_frame_count(framerate, sample_rate: int, total_samples: int) -> int:
+    """Liczba klatek LTC potrzebnych, żeby pokryć `total_samples` próbek (ostatnia może być niepełna)."""
+    rate = ltc_frame_rate(framerate)
+    return -(-(total_samples * rate.numerator) // (sample_rate * rate.denominator))
+
+
+def render_ltc_frames(start_frame: int, first_frame: int, count: int, framerate, sample_rate: int,
+                      start_high: bool, total_samples: int, levels: np.ndarray, layout: np.ndarray | None = None,
+                      out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Próbki PCM klatek `first_frame` .. `first_frame + count - 1` klipu (licząc od klatki `start_frame`),
+    bez pamięci podręcznej szablonów: półbit każdej próbki p to floor(p * 160 * fps / sample_rate),
+    czyli ten sam układ co w iter_ltc_pcm_blocks. Same operacje NumPy (zwalniają GIL), więc wywołania
+    dla różnych zakresów klatek mogą działać równolegle w wątkach; `start_high` to poziom na początku zakresu.
+    `layout` to gotowe indeksy półbitów zakresu (ten sam dla zakresów o tej samej fazie, patrz
+    _iter_ltc_pcm_blocks_parallel) - wtedy renderowanie to tylko kodowanie ramek i dwa odczyty z tablic.
+    Z `out` (np. wycinek np.memmap) próbki są zapisywane od razu w nim, bez tablicy pośredniej.
+    """
+    rate = ltc_frame_rate(framerate)
+    step = sample_rate * rate.denominator
+    frame_bits = ltc_encode_frames(start_frame + first_frame, count, rate)
+    double_pulse = biphase_mark_encode(frame_bits.reshape(-1), start_high)
+    first_sample = -(-first_frame * step // rate.numerator)
+    stop_sample = min(-(-(first_frame + count) * step // rate.numerator), total_samples)
+    if layout is None:
+        layout = np.arange(first_sample, stop_sample, dtype=np.int64) * (HALF_BITS_PER_FRAME * rate.numerator) // step
+        layout -= first_frame * HALF_BITS_PER_FRAME
+    # Poziomy wybierane dla półbitów (160 na klatkę), a nie dla próbek - jeden odczyt na próbkę
+    return np.take(levels[double_pulse], layout[:stop_sample - first_sample], out=out)
+
+
+def _ltc_block_layout(rate, sample_rate: int, frames_per_block: int) -> tuple[int, np.ndarray | None]:
+    """
+    Układ próbek powtarza się co `period` klatek (np. 1 przy 25 kl/s, 5 przy 30000/1001 i 48 kHz), więc bloki
+    o długości będącej wielokrotnością `period` mają wspólną tablicę indeksów półbitów, liczoną raz.
+    Zwraca (liczba klatek w bloku wyrównana do `period`, wspólne indeksy) albo (frames_per_block, None).
+    """
+    step = sample_rate * rate.denominator
+    period = rate.numerator // math.gcd(step, rate.numerator)
+    if period > frames_per_block:
+        return frames_per_block, None
+    frames_per_block -= frames_per_block % period
+    layout = np.arange(frames_per_block * step // rate.numerator, dtype=np.int64) * (HALF_BITS_PER_FRAME * rate.numerator) // step
+    return frames_per_block, layout
+
+
+def _iter_ltc_block_ranges(start_frame: int, rate, frame_count: int, frames_per_block: int):
+    """Kolejne zakresy klatek (pierwsza klatka, liczba klatek, poziom początkowy) z poziomem z parzystości bitów."""
+    start_high = True
+    for first_frame in range(0, frame_count, frames_per_block):
+        count = min(frames_per_block, frame_count - first_frame)
+        yield first_frame, count, start_high
+        # Poziom na początku następnego bloku - z parzystości bitów zerowych klatek tego bloku
+        start_high ^= bool(np.bitwise_xor.reduce(ltc_frame_parity(start_frame + first_frame, count, rate)))
+
+
+def _iter_ltc_pcm_blocks_parallel(start_frame: int, rate, sample_rate: int, total_samples: int,
+                                  frame_count: int, frames_per_block: int, levels: np.ndarray, workers: int):
+    """Bloki z render_ltc_frames liczone w puli `workers` wątków i zwracane po kolei (najwyżej 2 * workers naprzód)."""
+    frames_per_block, layout = _ltc_block_layout(rate, sample_rate, frames_per_block)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ltc') as pool:
+        blocks = deque()
+        for first_frame, count, start_high in _iter_ltc_block_ranges(start_frame, rate, frame_count, frames_per_block):
+            blocks.append(pool.submit(render_ltc_frames, start_frame, first_frame, count, rate, sample_rate,
+                                      start_high, total_samples, levels, layout))
+            while len(blocks) >= 2 * workers:
+                yield blocks.popleft().result()
+        while blocks:
+            yield blocks.popleft().result()
+
+
+def fill_ltc_pcm(out: np.ndarray, start_frame: int, framerate, sample_rate: int,
+                 block_samples: int = PCM_BLOCK_SAMPLES, on_val: int = ON_VALUE, off_val: int = OFF_VALUE,
+                 workers: int = 1, on_block=None):
+    """
+    Wypełnia `out` (int16, np. np.memmap obszaru danych pliku WAV) sygnałem LTC w miejscu - tym samym co
+    iter_ltc_pcm_blocks dla total_samples = len(out). Każdy blok klatek jest renderowany od razu do swojego
+    wycinka `out` (w `workers` wątkach), bez tablic bloków i bez późniejszego kopiowania.
+    `on_block(liczba próbek)` jest wywoływane po każdym bloku (np. liczniki metryk).
+    """
+    total_samples = len(out)
+    if total_samples <= 0:
+        return
+    rate = ltc_frame_rate(framerate)
+    step = sample_rate * rate.denominator
+    levels = np.array([off_val, on_val], dtype=np.int16)
+    frame_count = ltc_frame_count(rate, sample_rate, total_samples)
+    frames_per_block, layout = _ltc_block_layout(rate, sample_rate, max(1, block_samples * rate.numerator // step))
+
+    def render(first_frame, count, start_high):
+        first_sample = -(-first_frame * step // rate.numerator)
+        stop_sample = min(-(-(first_frame + count) * step // rate.numerator), total_samples)
+        render_ltc_frames(start_frame, first_frame, count, rate, sample_rate, start_high, total_samples, levels,
+                          layout, out=out[first_sample:stop_sample])
+        return stop_sample - first_sample
+
+    ranges = _iter_ltc_block_ranges(start_frame, rate, frame_count, frames_per_block)
+    if workers <= 1:
+        for block_range in ranges:
+            written = render(*block_range)
+            if on_block is not None:
+                on_block(written)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ltc') as pool:
+        for written in pool.map(lambda block_range: render(*block_range), ranges):
+            if on_block is not None:
+                on_block(written)
+
+
+def iter_ltc_pcm_blocks(start_frame: int, framerate, sample_rate: int, total_samples: int,
+                        block_samples: int = PCM_BLOCK_SAMPLES,
+                        on_val: int = ON_VALUE, off_val: int = OFF_VALUE,
+                        cache: LTCFrameTemplateCache | None = None, workers: int = 1):
+    """
+    Generator bloków PCM (int16) z sygnałem LTC.
+
+    Klatki LTC, poczynając od klatki `start_frame` (numeracja od zera, jak Timecode.frame_number),
+    są ułożone na dokładnych pozycjach próbek: klatka k zaczyna się w próbce ceil(k * sample_rate / fps),
+    więc przy klatkażach ułamkowych reszta próbek rozkłada się równomiernie i sygnał nie dryfuje
+    względem obrazu. Próbki każdej klatki pochodzą z pamięci podręcznej szablonów (`cache`, domyślnie
+    LTC_TEMPLATE_CACHE). Bloki mają ok. `block_samples` próbek, zawsze pełną liczbę klatek (poza ostatnim,
+    przyciętym do `total_samples`), a poziom sygnału na granicy bloków jest przenoszony.
+    Z `workers` > 1 bloki są liczone równolegle w wątkach (render_ltc_frames, bez pamięci podręcznej) -
+    wynik jest identyczny, a czas syntezy długich nagrań skraca się z liczbą rdzeni.
+    """
+    if total_samples <= 0:
+        return
+    cache = LTC_TEMPLATE_CACHE if cache is None else cache
+    rate = ltc_frame_rate(framerate)
+    num, den = rate.numerator, rate.denominator
+    step = sample_rate * den
+    levels = np.array([off_val, on_val], dtype=np.int16)
+    payload_bytes = LTC_BITS_PER_FRAME // 8
+
+    frame_count = ltc_frame_count(rate, sample_rate, total_samples)
+    frames_per_block = max(1, block_samples * num // step)
+    if workers > 1:
+        yield from _iter_ltc_pcm_blocks_parallel(start_frame, rate, sample_rate, total_samples,
+                                                 frame_count, frames_per_block, levels, workers)
+        return
+    start_high = True
+    remaining = total_samples
+
+    for first_frame in range(0, frame_count, frames_per_block):
+        count = min(frames_per_block, frame_count - first_frame)
+        frame_bits = ltc_encode_frames(start_frame + first_frame, count, rate)
+
+        # Sygnał bifazowy całego bloku naraz - poziom początkowy każdej klatki to jej pierwszy półbit
+        double_pulse = biphase_mark_encode(frame_bits.reshape(-1), start_high).reshape(count, HALF_BITS_PER_FRAME)
+        frame_start_high = double_pulse[:, 0].tolist()
+        start_high = bool(start_high) ^ bool(np.count_nonzero(frame_bits == 0) & 1)
+
+        payloads = np.packbits(frame_bits, axis=1).tobytes()
+        phases = ((np.arange(first_frame, first_frame + count, dtype=np.int64) * step) % num).tolist()
+        templates = []
+        for i in range(count):
+            key = (num, den, sample_rate, payloads[i * payload_bytes:(i + 1) * payload_bytes], frame_start_high[i], phases[i])
+            template = cache.get(key)
+            if template is None:
+                template = cache.put(key, double_pulse[i][cache.half_bit_layout(num, den, sample_rate, phases[i])])
+            templates.append(template)
+
+        block = levels[np.concatenate(templates)]
+        if len(block) > remaining:
+            block = block[:remaining]
+        remaining -= len(block)
+        yield block
+
+
+def riff_chunk(chunk_id: bytes, payload: bytes) -> bytes:
+    """Chunk RIFF: identyfikator, długość i dane wyrównane do parzystej liczby bajtów."""
+    return chunk_id + cint(len(payload), 4) + payload + (b'\0' if len(payload) % 2 else b'')
+
+
+def _fixed_ascii(text: str, size: int) -> bytes:
+    return text.encode('ascii', errors='replace')[:size].ljust(size, b'\0')
+
+
+def bext_chunk(description: str, originator: str, originator_reference: str, origination_date: str,
+               origination_time: str, time_reference: int, coding_history: str = '') -> bytes:
+    """
+    Chunk 'bext' pliku Broadcast WAV (EBU Tech 3285, wersja 1).
+    `time_reference` to liczba próbek od północy do pierwszej próbki pliku; data 'rrrr-mm-dd', godzina 'gg:mm:ss'.
+    """
+    payload = b''
+    payload += _fixed_ascii(description, 256)
+    payload += _fixed_ascii(originator, 32)
+    payload += _fixed_ascii(originator_reference, 32)
+    payload += _fixed_ascii(origination_date, 10)
+    payload += _fixed_ascii(origination_time, 8)
+    payload += cint(time_reference & 0xFFFFFFFF, 4)      # TimeReferenceLow
+    payload += cint(time_reference >> 32, 4)             # TimeReferenceHigh
+    payload += cint(BEXT_VERSION, 2)
+    payload += bytes(BEXT_FIXED_SIZE - len(payload))     # UMID, pola głośności i zarezerwowane - zera
+    payload += coding_history.encode('ascii', errors='replace')
+    return riff_chunk(b'bext', payload)
+
+
+def ixml_chunk(xml_text: str) -> bytes:
+    """Chunk 'iXML' z dokumentem XML (UTF-8)."""
+    return riff_chunk(b'iXML', xml_text.encode('utf-8'))
+
+
+def wav_max_data_length(chunks: bytes = b'') -> int:
+    """Największa liczba bajtów danych audio, dla której rozmiar RIFF (z nagłówkiem i `chunks`) mieści się w 32 bitach."""
+    return WAV_MAX_CHUNK_SIZE - (WAV_HEADER_SIZE - 8 + len(chunks))
+
+
+def check_wav_data_length(data_length: int, rate: int = 48000, bits: int = 16, channels: int = 1, chunks: bytes = b''):
+    """Rzuca ValueError, gdy dane audio nie zmieszczą się w pliku WAV (32-bitowe pola rozmiaru RIFF)."""
+    max_data_length = wav_max_data_length(chunks)
+    if data_length > max_data_length:
+        max_hours = max_data_length / (rate * bits * channels // 8) / 3600
+        raise ValueError(f"Dane audio ({data_length} B) nie mieszczą się w pliku WAV: pola rozmiaru RIFF są 32-bitowe, "
+                         f"limit to {max_data_length} B (ok. {max_hours:.1f} h przy {rate} Hz, {bits} bit, "
+                         f"{channels} kan.)")
+
+
+def wav_header(data_length: int, rate: int = 48000, bits: int = 16, channels: int = 1, chunks: bytes = b'') -> bytes:
+    """
+    Nagłówek PCM WAV (RIFF) - 44 bajty, powiększone o `chunks` (gotowe chunki, np. bext_chunk i ixml_chunk),
+    które trafiają między chunk 'fmt ' a 'data'. Rzuca ValueError, gdy rozmiary nie mieszczą się w polach RIFF.
+    """
+    check_wav_data_length(data_length, rate, bits, channels, chunks)
+    header = b''
+    header += b'RIFF'
+    header += cint(WAV_HEADER_SIZE - 8 + len(chunks) + data_length, 4)  # rozmiar pliku bez 'RIFF' i tego pola
+    header += b'WAVE'
+    header += b'fmt '
+    header += cint(16, 4)                                # długość danych formatu
+    header += cint(1, 2)                                 # 1 = PCM
+    header += cint(channels, 2)
+    header += cint(rate, 4)
+    header += cint(rate * bits * channels // 8, 4)      # bajty na sekundę
+    header += cint(bits * channels // 8, 2)             # bajty na próbkę (wszystkie kanały)
+    header += cint(bits, 2)
+    header += chunks
+    header += b'data'
+    header += cint(data_length, 4)
+    return header
+
+
+def write_wav_memmap(output_path: str, sample_rate: int, total_samples: int, fill, bits: int = 16, chunks: bytes = b'') -> int:
+    """
+    Zapisuje plik WAV (mono, 16 bit), którego obszar danych jest mapowany w pamięci (np.memmap):
+    nagłówek (z `chunks`) powstaje od razu z ostatecznymi rozmiarami, plik jest powiększany do pełnej długości,
+    a `fill(samples)` wypełnia próbki w miejscu (np. fill_ltc_pcm). Pamięć zajmują tylko strony w pamięci
+    podręcznej systemu, niezależnie od długości klipu, a zapis na dysk nie wymaga kopiowania.
+    Zbyt długie dane (limit rozmiaru WAV) rzucają ValueError, zanim plik zostanie utworzony.
+    Zwraca liczbę bajtów danych audio.
+    """
+    if bits != 16:
+        raise ValueError(f"write_wav_memmap obsługuje tylko próbki 16-bitowe, nie {bits}")
+    data_length = total_samples * 2
+    header = wav_header(data_length, rate=sample_rate, bits=bits, chunks=chunks)
+    with open(output_path, 'wb') as f:
+        f.write(header)
+        f.truncate(len(header) + data_length)
+    if total_samples > 0:
+        samples = np.memmap(output_path, dtype='<i2', mode='r+', offset=len(header), shape=(total_samples,))
+        try:
+            fill(samples)
+            samples.flush()
+        finally:
+            del samples
+    return data_length
+
+
+def write_wav_stream(output_path: str, sample_rate: int, blocks, bits: int = 16, channels: int = 1, chunks: bytes = b'') -> int:
+    """
+    Zapisuje plik WAV z bloków próbek podawanych przez generator.
+
+    Nagłówek (z dodatkowymi `chunks`, np. 'bext' i 'iXML') jest zapisywany najpierw z zerowym rozmiarem danych,
+    bloki są dopisywane po kolei, a na końcu pola rozmiaru w nagłówku RIFF są poprawiane.
+    Blok, który przekroczyłby limit rozmiaru WAV (wav_max_data_length), przerywa zapis ValueError.
+    Zwraca liczbę zapisanych bajtów danych audio.
+    """
+    data_length = 0
+    with open(output_path, 'wb') as f:
+        f.write(wav_header(0, rate=sample_rate, bits=bits, channels=channels, chunks=chunks))
+        for block in blocks:
+            data = np.ascontiguousarray(block, dtype='<i2')
+            check_wav_data_length(data_length + data.nbytes, sample_rate, bits, channels, chunks)
+            f.write(data.tobytes())
+            data_length += data.nbytes
+        f.seek(0)
+        f.write(wav_header(data_length, rate=sample_rate, bits=bits, channels=channels, chunks=chunks))
+    return data_length
@@ -1,42 +1,230 @@
-import sys
-import os # <-- Dodano to
-
-# Dynamicznie dodaj katalog 'external_libs' do sys.path
-# Zakładamy, że 'external_libs' jest w tym samym katalogu co 'main.py'
-current_script_dir = os.path.dirname(os.path.abspath(__file__))
-external_libs_path = os.path.join(current_script_dir, 'external_libs')
-if external_libs_path not in sys.path:
-    sys.path.insert(0, external_libs_path)
-
-# Teraz możesz bezpiecznie importować swoje moduły
-from video_processor import VideoProcessor
+import os
+
+# Ciężkie zależności (cv2, pyzbar, numpy, timecode_tools) są ładowane dopiero w etapach analizy i łączenia,
+# więc --help, --dry-run i wznowienie bez plików do przetworzenia ich nie importują.
+# timecode_tools musi być zainstalowany: pip install -e ./external_libs/timecode_tools_repo/
+from video_processor import (VideoProcessor, LTC_TRANSPORTS, OUTPUT_MODES, WAV_WRITERS, QR_FRAME_SOURCES,
+                             QR_SCAN_STRIDE_SECONDS)
+from batch_runner import BatchSummary, run_batch, print_summary
+from sessions import group_sessions
+from io_scheduler import largest_first
+from media_discovery import discover_videos
+from metrics import METRICS_FORMATS, write_metrics
+from log_config import LOG_LEVELS, capture_file_log, configure_logging, file_log_path
 import argparse
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def positive_int(value: str) -> int:
+    """Typ argparse dla liczby zadań: liczba całkowita >= 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"wymagana liczba całkowita >= 1: {value}")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Typ argparse dla limitów, w których 0 oznacza brak limitu: liczba całkowita >= 0."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"wymagana liczba całkowita >= 0: {value}")
+    return number
+
+
+def plan_sessions(processor: VideoProcessor, videos: list, force: bool, mark_pending: bool) -> tuple[list, list[str]]:
+    """
+    Grupuje znalezione pliki (media_discovery.DiscoveredVideo) w sesje i pomija pliki ukończone we wcześniejszym
+    uruchomieniu. Zwraca (sesje z plikami do przetworzenia, pominięte pliki).
+    """
+    # Czas trwania i klatkaż z metadanych karty (AVCHD, XAVC) - bez ffprobe
+    for video in videos:
+        if video.clip_info is not None:
+            processor.add_media_info(video.clip_info)
+    found_files = [video.path for video in videos]
+
+    # Rozdziały nagrań GoPro (GX01nnnn, GX02nnnn, ...) są łączone w sesje z ciągłym LTC
+    sessions = group_sessions(found_files, processor.get_media_info)
+    for session in sessions:
+        if len(session.chapters) > 1:
+            logger.info("Sesja %s: %s", session.name, ', '.join(os.path.basename(chapter) for chapter in session.chapters))
+
+    # Pliki ukończone we wcześniejszym uruchomieniu (niezmienione źródło i plik wyjściowy) są pomijane
+    skipped_files = []
+    if processor.manifest is not None and not force:
+        skipped_files = [video_file for video_file in found_files if processor.is_up_to_date(video_file)]
+        skipped = set(skipped_files)
+        for session in sessions:
+            session.pending = [chapter for chapter in session.chapters if chapter not in skipped]
+        sessions = [session for session in sessions if session.pending]
+        if mark_pending:
+            for session in sessions:
+                for video_file in session.pending:
+                    processor.manifest.mark_pending(video_file)
+        if skipped_files:
+            logger.info("Pomijanie %d plików przetworzonych we wcześniejszym uruchomieniu (użyj --force, aby przetworzyć je ponownie).", len(skipped_files))
+    return sessions, skipped_files
+
+
+def process_sessions(processor: VideoProcessor, sessions: list, summary: BatchSummary, log_dir: str | None, input_dir: str):
+    """Przetwarza sesje sekwencyjnie w bieżącym procesie, dopisując wyniki do `summary`."""
+    for session in sessions:
+        # Log analizy sesji trafia do logu jej pierwszego przetwarzanego pliku
+        log_path = file_log_path(log_dir, session.pending[0], input_dir) if log_dir else None
+        with capture_file_log(log_path):
+            plans = processor.analyze_session(session)
+        for video_file, plan in zip(session.pending, plans):
+            log_path = file_log_path(log_dir, video_file, input_dir) if log_dir else None
+            with capture_file_log(log_path):
+                ok = plan is not None and processor.mux_video(plan)
+            if ok:
+                summary.succeeded.append(video_file)
+            else:
+                summary.failed.append(video_file)
+        summary.metrics.extend(processor.drain_metrics())
+
+
+def finish_run(summary: BatchSummary, args: argparse.Namespace):
+    """Drukuje podsumowanie i zapisuje pomiary (--metrics)."""
+    print_summary(summary)
+
+    if args.metrics:
+        write_metrics(args.metrics, summary.metrics, args.metrics_format)
+        logger.info("Zapisano pomiary %d plików: %s", len(summary.metrics), args.metrics)
+
+
+def print_dry_run(processor: VideoProcessor, sessions: list, skipped_files: list[str]):
+    """Wypisuje plan przebiegu (--dry-run): pliki do przetworzenia z plikami wyjściowymi, pogrupowane w sesje."""
+    logger.info("-----------------------------------")
+    logger.info("Plan (--dry-run): %d plików do przetworzenia, %d pominiętych",
+                sum(len(session.pending) for session in sessions), len(skipped_files))
+    for session in sessions:
+        if len(session.chapters) > 1:
+            logger.info("Sesja %s (%d rozdziały):", session.name, len(session.chapters))
+        for video_file in session.pending:
+            outputs = [processor.get_output_path(video_file)]
+            if processor.output_mode == 'sidecar':
+                outputs.append(processor.get_timecode_reference_path(video_file))
+            logger.info("  %s -> %s", video_file, ', '.join(outputs))
+    for video_file in skipped_files:
+        logger.info("  POMINIĘTY: %s", video_file)
+
 
 def main():
     parser = argparse.ArgumentParser(description="Przetwarza pliki wideo, dodając ścieżki audio LTC oparte na kodach QR GoPro.")
     parser.add_argument("input_dir", help="Ścieżka do katalogu wejściowego zawierającego pliki wideo.")
     parser.add_argument("output_dir", help="Ścieżka do katalogu wyjściowego, gdzie zostaną zapisane przetworzone pliki wideo.")
+    parser.add_argument("--ltc-transport", choices=LTC_TRANSPORTS, default='pipe',
+                        help="Sposób przekazania audio LTC do ffmpeg: 'pipe' (stdin, bez pliku tymczasowego) lub 'file' (tymczasowy WAV). Domyślnie: pipe.")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default='remux',
+                        help="Postać wyniku: 'remux' (kopia wideo z dodaną ścieżką audio LTC) lub 'sidecar' (bez kopiowania wideo: plik <nazwa>_LTC.wav i mały <nazwa>_TC.mov ze ścieżką timecode). Domyślnie: remux.")
+    parser.add_argument("--jobs", "-j", type=positive_int, default=1,
+                        help="Liczba równoległych procesów etapu analizy (ffprobe + odczyt QR). Domyślnie: 1 (przetwarzanie sekwencyjne).")
+    parser.add_argument("--mux-jobs", type=positive_int, default=None,
+                        help="Liczba równoległych procesów etapu generowania LTC i łączenia (ffmpeg). Domyślnie: tyle co --jobs.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Asynchroniczna orkiestracja w jednym procesie: ffprobe kolejnych plików (--probe-jobs), odczyt QR (--jobs) i łączenie (--mux-jobs) działają jednocześnie, bez przerw między procesami ffmpeg. Bez osobnych logów plików (--log-dir).")
+    parser.add_argument("--probe-jobs", type=positive_int, default=4,
+                        help="Liczba równoległych wywołań ffprobe przy --async. Domyślnie: 4.")
+    parser.add_argument("--device-jobs", type=non_negative_int, default=0,
+                        help="Najwięcej łączeń naraz na jednym urządzeniu (dysk, czytnik kart - st_dev źródła i katalogu docelowego) przy --jobs/--mux-jobs > 1 lub --async. Domyślnie: 0 (bez limitu).")
+    parser.add_argument("--ltc-threads", type=positive_int, default=1,
+                        help="Liczba wątków syntezy LTC jednego pliku (bloki klatek liczone równolegle; przydatne dla bardzo długich nagrań). Domyślnie: 1.")
+    parser.add_argument("--wav-writer", choices=WAV_WRITERS, default='stream',
+                        help="Zapis plików WAV z LTC (sidecar i tymczasowy WAV): 'stream' (bloki dopisywane do pliku) lub 'memmap' (obszar danych mapowany w pamięci i wypełniany w miejscu). Domyślnie: stream.")
+    parser.add_argument("--qr-stride", type=float, default=QR_SCAN_STRIDE_SECONDS,
+                        help=f"Odstęp (w sekundach) między klatkami sprawdzanymi w pierwszym przebiegu wyszukiwania QR; 0 = każda klatka. Domyślnie: {QR_SCAN_STRIDE_SECONDS}.")
+    parser.add_argument("--qr-source", choices=QR_FRAME_SOURCES, default='opencv',
+                        help="Źródło klatek do wyszukiwania QR: 'opencv' (cv2.VideoCapture) lub 'ffmpeg' (zmniejszone klatki w skali szarości z potoku ffmpeg). Domyślnie: opencv.")
+    parser.add_argument("--no-media-cache", action="store_true",
+                        help="Nie używaj trwałej pamięci podręcznej wyników ffprobe (plik .ltc_media_cache.sqlite w katalogu wyjściowym).")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="Nie używaj manifestu zadań (plik .ltc_manifest.sqlite w katalogu wyjściowym) - przetwarzaj wszystkie pliki i nie zapisuj ich stanu.")
+    parser.add_argument("--no-qr-hints", action="store_true",
+                        help="Nie używaj wskazówek wyszukiwania QR (plik .ltc_qr_hints.sqlite w katalogu wyjściowym) - każdy klip jest przeszukiwany od początku.")
+    parser.add_argument("--dry-run", "-n", action="store_true",
+                        help="Tylko wypisz sesje i pliki do przetworzenia (z plikami wyjściowymi) oraz pomijane - bez odczytu QR, syntezy LTC i ffmpeg. Katalog wyjściowy nie jest tworzony ani zmieniany (manifest i pamięć podręczna ffprobe są tylko odczytywane); ffprobe może zostać uruchomione dla rozdziałów GoPro przy grupowaniu sesji.")
+    parser.add_argument("--force", action="store_true",
+                        help="Przetwórz ponownie także pliki oznaczone w manifeście jako ukończone i niezmienione.")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Zapisz pomiary etapów (ffprobe, QR, synteza LTC, zapis WAV, ffmpeg) i liczniki każdego pliku do PATH.")
+    parser.add_argument("--metrics-format", choices=METRICS_FORMATS, default='jsonl',
+                        help="Format pliku --metrics: 'jsonl' (rekord na plik, dopisywany) lub 'prometheus' (sumy per kamera, textfile collector). Domyślnie: jsonl.")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default='INFO',
+                        help="Poziom logowania. Domyślnie: INFO (DEBUG dodaje szczegóły generowania LTC i wyjście ffmpeg).")
+    parser.add_argument("--quiet", "-q", action="store_true",
+                        help="Tylko ostrzeżenia i błędy (odpowiednik --log-level WARNING).")
+    parser.add_argument("--log-dir",
+                        help="Katalog na osobne logi każdego pliku wideo. Domyślnie: <output_dir>/logs przy przetwarzaniu równoległym, brak przy sekwencyjnym.")
     
     args = parser.parse_args()
+    log_level = logging.WARNING if args.quiet else getattr(logging, args.log_level)
+    configure_logging(log_level)
 
-    processor = VideoProcessor(args.output_dir, args.input_dir)
-    
-    video_extensions = ('.mp4', '.mov', '.avi', '.mkv', "mts") # Dodaj więcej rozszerzeń, jeśli potrzebujesz
+    processor_kwargs = dict(output_base_dir=args.output_dir, input_base_dir=args.input_dir, ltc_transport=args.ltc_transport,
+                            qr_scan_stride_seconds=args.qr_stride, qr_frame_source=args.qr_source,
+                            use_media_cache=not args.no_media_cache, use_manifest=not args.no_manifest,
+                            output_mode=args.output_mode, ltc_workers=args.ltc_threads,
+                            wav_writer=args.wav_writer, use_qr_hints=not args.no_qr_hints, read_only=args.dry_run)
     
-    found_files = []
-    print(f"Scanning for video files in: {args.input_dir}/")
-    print("-----------------------------------")
-    for root, _, files in os.walk(args.input_dir):
-        for file in files:
-            if file.lower().endswith(video_extensions):
-                found_files.append(os.path.join(root, file))
-
-    if not found_files:
-        print(f"Nie znaleziono żadnych plików wideo w: {args.input_dir}")
+    # Pliki wideo z uwzględnieniem układu kart (DCIM, AVCHD, XAVC) - generator, katalog po katalogu
+    logger.info("Scanning for video files in: %s/", args.input_dir)
+    logger.info("-----------------------------------")
+    discovered = discover_videos(args.input_dir, exclude=(args.output_dir,))
+    processor = VideoProcessor(**processor_kwargs)
+
+    parallel = args.use_async or args.jobs > 1 or (args.mux_jobs or 1) > 1
+    if not parallel and not args.dry_run:
+        # Sekwencyjnie: przetwarzanie zaczyna się po przejrzeniu pierwszego katalogu (rozdziały sesji
+        # GoPro leżą w jednym katalogu), a nie po przejrzeniu całego drzewa
+        summary = BatchSummary()
+        found_count = 0
+        for _, videos in itertools.groupby(discovered, key=lambda video: os.path.dirname(video.path)):
+            videos = list(videos)
+            found_count += len(videos)
+            sessions, skipped_files = plan_sessions(processor, videos, args.force, mark_pending=True)
+            summary.skipped.extend(skipped_files)
+            process_sessions(processor, sessions, summary, args.log_dir, args.input_dir)
+        if not found_count:
+            logger.warning("Nie znaleziono żadnych plików wideo w: %s", args.input_dir)
+            return
+        finish_run(summary, args)
         return
 
-    for video_file in found_files:
-        processor.process_video(video_file)
+    videos = list(discovered)
+    if not videos:
+        logger.warning("Nie znaleziono żadnych plików wideo w: %s", args.input_dir)
+        return
+    sessions, skipped_files = plan_sessions(processor, videos, args.force, mark_pending=not args.dry_run)
+
+    if args.dry_run:
+        print_dry_run(processor, sessions, skipped_files)
+        return
+
+    # Przy przetwarzaniu równoległym największe sesje idą pierwsze - krótszy ogon całego przebiegu
+    sessions = largest_first(sessions)
+
+    if args.use_async:
+        if args.log_dir:
+            logger.warning("--log-dir nie jest obsługiwane z --async - logi trafiają tylko na konsolę.")
+        jobs = max(1, args.jobs)
+        results = asyncio.run(processor.process_sessions_async(sessions, probe_jobs=args.probe_jobs, analyze_jobs=jobs,
+                                                               mux_jobs=args.mux_jobs or jobs, device_jobs=args.device_jobs))
+        summary = BatchSummary()
+        for session in sessions:
+            for video_file in session.pending:
+                (summary.succeeded if results.get(video_file) else summary.failed).append(video_file)
+        summary.metrics.extend(processor.drain_metrics())
+    else:
+        summary = run_batch(sessions, processor_kwargs, jobs=max(1, args.jobs), mux_jobs=args.mux_jobs,
+                            log_level=log_level, log_dir=args.log_dir or os.path.join(args.output_dir, 'logs'),
+                            device_jobs=args.device_jobs, get_output_path=processor.get_output_path)
+
+    summary.skipped = skipped_files
+    finish_run(summary, args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,239 @@
+# media_discovery.py
+# Wyszukiwanie plików wideo z uwzględnieniem układu katalogów kart pamięci kamer
+#
+# Opis:
+# Zamiast pełnego os.walk z filtrem po końcówce nazwy, discover_videos przechodzi drzewo przez os.scandir
+# i zna typowe układy kart:
+# - DCIM:       GoPro DCIM/1nnGOPRO/*.MP4 i inne aparaty (pliki .LRV i .THM to podglądy i miniatury -
+#               pomijane jak wszystkie pliki o innych rozszerzeniach),
+# - AVCHD:      PRIVATE/AVCHD/BDMV/STREAM/*.MTS, z informacjami o klipach w BDMV/CLIPINF/*.CPI;
+#               pozostałe katalogi AVCHD (AVCHDTN, PLAYLIST, BACKUP, CLIPINF, ...) nie są przeglądane,
+# - BDMV:       BDMV/STREAM/*.M2TS z BDMV/CLIPINF/*.CLPI (ten sam format co AVCHD),
+# - Sony XAVC:  PRIVATE/M4ROOT/CLIP/*.MP4 z metadanymi <nazwa>M01.XML; pozostałe katalogi M4ROOT są pomijane.
+# Czas trwania, klatkaż, kodek i rozdzielczość z plików CLPI/CPI i XML trafiają do MediaInfo, więc dla
+# tych klipów nie trzeba uruchamiać ffprobe (VideoProcessor.add_media_info). Pliki są zwracane przez
+# generator, katalog po katalogu (pliki katalogu przed jego podkatalogami), więc przetwarzanie może
+# zacząć się przed końcem przeglądania karty.
+
+import logging
+import os
+import struct
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from fractions import Fraction
+
+from media_info import MediaInfo
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.mts', '.m2ts')
+
+# Kody klatkażu i formatu obrazu strumienia wideo w plikach CLPI (AVCHD/Blu-ray)
+CLPI_FRAME_RATES = {1: '24000/1001', 2: '24/1', 3: '25/1', 4: '30000/1001', 6: '50/1', 7: '60000/1001'}
+CLPI_VIDEO_SIZES = {1: (720, 480), 2: (720, 576), 3: (720, 480), 4: (1920, 1080), 5: (1280, 720),
+                    6: (1920, 1080), 7: (720, 576), 8: (3840, 2160)}
+CLPI_VIDEO_CODECS = {0x01: 'mpeg1video', 0x02: 'mpeg2video', 0x1b: 'h264', 0x20: 'h264', 0x24: 'hevc', 0xea: 'vc1'}
+CLPI_AUDIO_CODING_TYPES = {0x03, 0x04, 0x80, 0x81, 0x82, 0x83, 0x84, 0x85, 0x86, 0xa1, 0xa2}
+CLPI_TIME_BASE = 45000  # jednostka czasów prezentacji w SequenceInfo (45 kHz)
+
+# Klatkaże XAVC (formatFps) zapisywane w zaokrągleniu
+XAVC_FRAME_RATES = {'23.98': '24000/1001', '29.97': '30000/1001', '59.94': '60000/1001', '119.88': '120000/1001'}
+
+
+@dataclass
+class DiscoveredVideo:
+    """Plik wideo znaleziony na karcie; `clip_info` z metadanych karty (CLPI, XML) albo None."""
+    path: str
+    layout: str  # 'dcim', 'avchd', 'bdmv', 'xavc' lub 'generic'
+    clip_info: MediaInfo | None = None
+
+
+def _media_info(video_path: str, duration_seconds: float, frame_rate: str, codec: str | None,
+                width: int | None, height: int | None, audio_streams: int) -> MediaInfo:
+    stat = os.stat(video_path)
+    return MediaInfo(path=os.path.abspath(video_path), size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                     duration_seconds=duration_seconds, frame_rate=frame_rate, codec=codec,
+                     width=width, height=height, audio_streams=audio_streams)
+
+
+def read_clpi(clpi_path: str, video_path: str) -> MediaInfo | None:
+    """
+    MediaInfo klipu AVCHD/Blu-ray z pliku informacji o klipie (CLPI/CPI): czas trwania z SequenceInfo
+    (czasy prezentacji 45 kHz), klatkaż, kodek i nominalna rozdzielczość pierwszego strumienia wideo
+    z ProgramInfo oraz liczba strumieni audio. None, jeśli pliku nie da się odczytać.
+    """
+    try:
+        with open(clpi_path, 'rb') as f:
+            data = f.read()
+        if data[:4] != b'HDMV':
+            raise ValueError("brak nagłówka HDMV")
+        sequence_start, program_start = struct.unpack_from('>II', data, 8)
+
+        # SequenceInfo: długość (4), zarezerwowany bajt, liczba sekwencji ATC, dla każdej: SPN (4),
+        # liczba sekwencji STC, offset; dla każdej STC: PID PCR (2), SPN (4), początek i koniec prezentacji (4 + 4)
+        offset = sequence_start + 5
+        start_time = end_time = None
+        atc_count = data[offset]
+        offset += 1
+        for _ in range(atc_count):
+            stc_count = data[offset + 4]
+            offset += 6
+            for _ in range(stc_count):
+                stc_start, stc_end = struct.unpack_from('>II', data, offset + 6)
+                start_time = stc_start if start_time is None else start_time
+                end_time = stc_end
+                offset += 14
+        if start_time is None:
+            raise ValueError("brak sekwencji STC")
+        duration_seconds = ((end_time - start_time) & 0xFFFFFFFF) / CLPI_TIME_BASE
+
+        # ProgramInfo: długość (4), zarezerwowany bajt, liczba programów; dla każdego: SPN (4), PID PMT (2),
+        # liczba strumieni, liczba grup; dla każdego strumienia: PID (2), długość atrybutów, typ kodowania, atrybuty
+        offset = program_start + 5
+        program_count = data[offset]
+        offset += 1
+        video = None
+        audio_streams = 0
+        for _ in range(program_count):
+            stream_count = data[offset + 6]
+            offset += 8
+            for _ in range(stream_count):
+                attributes_length = data[offset + 2]
+                coding_type = data[offset + 3]
+                if coding_type in CLPI_VIDEO_CODECS and video is None:
+                    video = coding_type, data[offset + 4] >> 4, data[offset + 4] & 0x0F
+                elif coding_type in CLPI_AUDIO_CODING_TYPES:
+                    audio_streams += 1
+                offset += 3 + attributes_length
+        if video is None:
+            raise ValueError("brak strumienia wideo")
+        coding_type, video_format, rate_code = video
+        if rate_code not in CLPI_FRAME_RATES:
+            raise ValueError(f"nieznany kod klatkażu {rate_code}")
+        width, height = CLPI_VIDEO_SIZES.get(video_format, (None, None))
+        return _media_info(video_path, duration_seconds, CLPI_FRAME_RATES[rate_code], CLPI_VIDEO_CODECS[coding_type],
+                           width, height, audio_streams)
+    except (OSError, ValueError, IndexError, struct.error) as e:
+        logger.debug("Nie można odczytać informacji o klipie %s: %s", clpi_path, e)
+        return None
+
+
+def _xavc_frame_rate(format_fps: str) -> Fraction:
+    """Klatkaż z atrybutu formatFps XAVC, np. '25p', '29.97p', '59.94i' (półobrazy - klatkaż o połowę mniejszy)."""
+    rate = Fraction(XAVC_FRAME_RATES.get(format_fps[:-1], format_fps[:-1]))
+    return rate / 2 if format_fps.endswith('i') else rate
+
+
+def read_xavc_xml(xml_path: str, video_path: str) -> MediaInfo | None:
+    """
+    MediaInfo klipu Sony XAVC z pliku metadanych NonRealTimeMeta (<nazwa>M01.XML): czas trwania
+    (Duration w klatkach), klatkaż (formatFps), kodek i rozdzielczość. None, jeśli pliku nie da się odczytać.
+    """
+    try:
+        root = ET.parse(xml_path).getroot()
+        frames = int(root.find('{*}Duration').get('value'))
+        video_frame = root.find('{*}VideoFormat/{*}VideoFrame')
+        video_layout = root.find('{*}VideoFormat/{*}VideoLayout')
+        frame_rate = _xavc_frame_rate(video_frame.get('formatFps') or video_frame.get('captureFps'))
+        video_codec = (video_frame.get('videoCodec') or '').upper()
+        codec = 'hevc' if video_codec.startswith('HEVC') else 'h264' if video_codec.startswith('AVC') else None
+        width = height = None
+        if video_layout is not None:
+            width, height = int(video_layout.get('pixel')), int(video_layout.get('numOfVerticalLine'))
+        audio_streams = 1 if root.find('{*}AudioFormat') is not None else 0
+        return _media_info(video_path, float(frames / frame_rate), f"{frame_rate.numerator}/{frame_rate.denominator}", codec,
+                           width, height, audio_streams)
+    except (OSError, ET.ParseError, AttributeError, TypeError, ValueError, ZeroDivisionError) as e:
+        logger.debug("Nie można odczytać metadanych XAVC %s: %s", xml_path, e)
+        return None
+
+
+def _scan(path: str) -> tuple[list[os.DirEntry], list[os.DirEntry]]:
+    """Pliki i katalogi `path` (bez ukrytych), posortowane po nazwie."""
+    files, directories = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry)
+                elif entry.is_file():
+                    files.append(entry)
+    except OSError as e:
+        logger.warning("Nie można odczytać katalogu %s: %s", path, e)
+    files.sort(key=lambda entry: entry.name)
+    directories.sort(key=lambda entry: entry.name)
+    return files, directories
+
+
+def _is_video(name: str) -> bool:
+    return name.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def _find_entry(entries: list[os.DirEntry], name: str) -> os.DirEntry | None:
+    """Wpis o nazwie `name` bez względu na wielkość liter (karty FAT/exFAT bywają montowane różnie)."""
+    name = name.upper()
+    return next((entry for entry in entries if entry.name.upper() == name), None)
+
+
+def _discover_bdmv(bdmv_path: str, layout: str):
+    """Klipy BDMV/STREAM z informacjami z BDMV/CLIPINF (pozostałe katalogi BDMV są pomijane)."""
+    _, directories = _scan(bdmv_path)
+    stream_dir = _find_entry(directories, 'STREAM')
+    if stream_dir is None:
+        return
+    clip_info_files = {}
+    clipinf_dir = _find_entry(directories, 'CLIPINF')
+    if clipinf_dir is not None:
+        clip_info_files = {os.path.splitext(entry.name)[0].upper(): entry.path for entry in _scan(clipinf_dir.path)[0]
+                           if entry.name.upper().endswith(('.CPI', '.CLPI'))}
+    for entry in _scan(stream_dir.path)[0]:
+        if _is_video(entry.name):
+            clpi_path = clip_info_files.get(os.path.splitext(entry.name)[0].upper())
+            yield DiscoveredVideo(entry.path, layout, read_clpi(clpi_path, entry.path) if clpi_path else None)
+
+
+def _discover_xavc(m4root_path: str):
+    """Klipy M4ROOT/CLIP z metadanymi <nazwa>M01.XML (pozostałe katalogi M4ROOT są pomijane)."""
+    clip_dir = _find_entry(_scan(m4root_path)[1], 'CLIP')
+    if clip_dir is None:
+        return
+    files = _scan(clip_dir.path)[0]
+    for entry in files:
+        if _is_video(entry.name):
+            xml_entry = _find_entry(files, f"{os.path.splitext(entry.name)[0]}M01.XML")
+            yield DiscoveredVideo(entry.path, 'xavc', read_xavc_xml(xml_entry.path, entry.path) if xml_entry else None)
+
+
+def discover_videos(input_dir: str, exclude: tuple[str, ...] = ()):
+    """
+    Generator plików wideo (DiscoveredVideo) w `input_dir`, katalog po katalogu, z pominięciem katalogów
+    `exclude` (np. katalogu wyjściowego leżącego w katalogu wejściowym), ukrytych plików i katalogów
+    oraz katalogów pomocniczych kart AVCHD/BDMV i XAVC.
+    """
+    excluded = {os.path.realpath(path) for path in exclude}
+    stack = [(input_dir, False)]
+    while stack:
+        path, in_dcim = stack.pop()
+        if os.path.realpath(path) in excluded:
+            continue
+        name = os.path.basename(os.path.normpath(path)).upper()
+        if name == 'BDMV':
+            parent = os.path.basename(os.path.dirname(os.path.normpath(path))).upper()
+            yield from _discover_bdmv(path, 'avchd' if parent == 'AVCHD' else 'bdmv')
+            continue
+        if name == 'M4ROOT':
+            yield from _discover_xavc(path)
+            continue
+
+        files, directories = _scan(path)
+        if name == 'AVCHD':
+            # Miniatury (AVCHDTN) i pliki producentów obok BDMV nie zawierają klipów
+            directories = [entry for entry in directories if entry.name.upper() == 'BDMV']
+        in_dcim = in_dcim or name == 'DCIM'
+        for entry in files:
+            if _is_video(entry.name):
+                yield DiscoveredVideo(entry.path, 'dcim' if in_dcim else 'generic')
+        # Odwrotna kolejność na stosie - katalogi są przeglądane alfabetycznie
+        stack.extend((entry.path, in_dcim) for entry in reversed(directories))
@@ -0,0 +1,162 @@
+# media_info.py
+# Informacje o plikach wideo z ffprobe i ich trwała pamięć podręczna
+#
+# Opis:
+# Jedno wywołanie `ffprobe -show_format -show_streams` (JSON) na plik zwraca wszystko, czego potrzebujemy:
+# czas trwania, klatkaż, kodek, rozdzielczość, liczbę ścieżek audio i początkowy timecode.
+# Wyniki są zapisywane w bazie SQLite (domyślnie w katalogu wyjściowym) z kluczem (ścieżka, rozmiar, mtime),
+# więc ponowne skanowanie tych samych kart nie uruchamia ffprobe dla niezmienionych plików.
+#
+# Zależności:
+# - ffprobe (część pakietu FFmpeg, musi być zainstalowany i dostępny w PATH)
+
+import json
+import os
+import sqlite3
+import subprocess
+from contextlib import closing
+from dataclasses import dataclass, asdict
+from fractions import Fraction
+from urllib.parse import quote
+
+MEDIA_CACHE_FILENAME = '.ltc_media_cache.sqlite'
+
+
+@dataclass
+class MediaInfo:
+    """Wynik ffprobe dla jednego pliku wideo."""
+    path: str
+    size: int
+    mtime_ns: int
+    duration_seconds: float
+    frame_rate: str                 # klatkaż jako ułamek z ffprobe, np. '30000/1001'
+    codec: str | None = None
+    width: int | None = None
+    height: int | None = None
+    audio_streams: int = 0
+    start_timecode: str | None = None
+
+    @property
+    def frame_rate_fraction(self) -> Fraction:
+        return Fraction(self.frame_rate)
+
+
+def _file_signature(path: str) -> tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _parse_frame_rate(rate: str | None) -> str | None:
+    """Zwraca klatkaż 'licznik/mianownik' albo None dla pustych wartości ffprobe ('0/0', 'N/A')."""
+    if not rate:
+        return None
+    try:
+        value = Fraction(rate)
+    except (ValueError, ZeroDivisionError):
+        return None
+    if value <= 0:
+        return None
+    return f"{value.numerator}/{value.denominator}"
+
+
+def probe_media(video_path: str) -> MediaInfo:
+    """Pobiera informacje o pliku jednym wywołaniem ffprobe (JSON). Rzuca ValueError, jeśli brakuje czasu trwania lub klatkażu."""
+    path, size, mtime_ns = _file_signature(video_path)
+    probe_cmd = [
+        'ffprobe', '-v', 'error', '-print_format', 'json',
+        '-show_format', '-show_streams', video_path
+    ]
+    result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
+    try:
+        probe = json.loads(result.stdout or '{}')
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Nieprawidłowe wyjście JSON z ffprobe dla {video_path}: {e}") from e
+
+    fmt = probe.get('format', {})
+    streams = probe.get('streams', [])
+    video_streams = [stream for stream in streams if stream.get('codec_type') == 'video']
+
+    duration_str = fmt.get('duration')
+    if not duration_str or duration_str == 'N/A':
+        raise ValueError(f"FFprobe nie zwrócił czasu trwania dla {video_path}. Błąd: '{result.stderr.strip()}'")
+
+    if not video_streams:
+        raise ValueError(f"Brak ścieżki wideo w {video_path}.")
+    video = video_streams[0]
+    frame_rate = _parse_frame_rate(video.get('avg_frame_rate')) or _parse_frame_rate(video.get('r_frame_rate'))
+    if frame_rate is None:
+        raise ValueError(f"Nie udało się sparsować klatkażu z wyjścia ffprobe dla {video_path}. Wyjście: '{video.get('avg_frame_rate')}'")
+
+    start_timecode = fmt.get('tags', {}).get('timecode')
+    for stream in streams:
+        if start_timecode:
+            break
+        start_timecode = stream.get('tags', {}).get('timecode')
+
+    return MediaInfo(
+        path=path,
+        size=size,
+        mtime_ns=mtime_ns,
+        duration_seconds=float(duration_str),
+        frame_rate=frame_rate,
+        codec=video.get('codec_name'),
+        width=video.get('width'),
+        height=video.get('height'),
+        audio_streams=sum(1 for stream in streams if stream.get('codec_type') == 'audio'),
+        start_timecode=start_timecode,
+    )
+
+
+class MediaInfoCache:
+    """
+    Trwała pamięć podręczna MediaInfo w bazie SQLite, z kluczem (ścieżka, rozmiar, mtime).
+    Zmieniony plik (inny rozmiar lub czas modyfikacji) jest automatycznie badany ponownie.
+    Baza jest otwierana na czas jednej operacji, więc może być współdzielona przez procesy robocze.
+    Z `read_only` istniejąca baza jest tylko odczytywana, a nowe wyniki zostają w pamięci (--dry-run).
+    """
+
+    def __init__(self, db_path: str, read_only: bool = False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self._memo = {}
+        if read_only:
+            return
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS media_info ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, info TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            return sqlite3.connect(f"file:{quote(os.path.abspath(self.db_path))}?mode=ro", uri=True, timeout=30)
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, video_path: str) -> MediaInfo | None:
+        key = _file_signature(video_path)
+        if key in self._memo:
+            return self._memo[key]
+        path, size, mtime_ns = key
+        with closing(self._connect()) as db, db:
+            row = db.execute("SELECT info FROM media_info WHERE path = ? AND size = ? AND mtime_ns = ?",
+                             (path, size, mtime_ns)).fetchone()
+        if row is None:
+            return None
+        info = MediaInfo(**json.loads(row[0]))
+        self._memo[key] = info
+        return info
+
+    def put(self, info: MediaInfo):
+        self._memo[(info.path, info.size, info.mtime_ns)] = info
+        if self.read_only:
+            return
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO media_info (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                       (info.path, info.size, info.mtime_ns, json.dumps(asdict(info))))
+
+    def get_or_probe(self, video_path: str) -> MediaInfo:
+        info = self.get(video_path)
+        if info is None:
+            info = probe_media(video_path)
+            self.put(info)
+        return info
@@ -0,0 +1,153 @@
+# metrics.py
+# Pomiary etapów przetwarzania pojedynczego pliku i ich zapis (JSON-lines lub plik tekstowy Prometheusa)
+#
+# Opis:
+# FileMetrics zbiera dla jednego pliku czasy etapów (czas ścienny i czas CPU wątku, który mierzy etap) oraz liczniki
+# (odczytane klatki, wywołania pyzbar, wygenerowane próbki, zapisane bajty, czas CPU ffmpeg).
+# Rekord wędruje razem z VideoPlan między etapem analizy i łączenia (także między procesami),
+# a gotowe rekordy zapisuje proces główny:
+# - JSON-lines - jeden rekord (słownik) na plik, dopisywany do pliku,
+# - Prometheus - plik tekstowy dla textfile collectora node_exportera, z sumami w podziale na kamerę
+#   (katalog pliku) i etap, nadpisywany atomowo.
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+
+# Etapy mierzone przez VideoProcessor: 'probe', 'qr', 'ltc_synthesis', 'wav_write', 'ffmpeg'
+METRICS_FORMATS = ('jsonl', 'prometheus')
+
+
+@dataclass
+class FileMetrics:
+    """Czasy etapów i liczniki dla jednego pliku wideo."""
+    file: str
+    camera: str
+    status: str = 'running'
+    stages: dict[str, dict[str, float]] = field(default_factory=dict)
+    counters: dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def span(self, stage: str, exclude: tuple[str, ...] = ()):
+        """
+        Mierzy czas ścienny i czas CPU bieżącego wątku dla bloku `with`; wielokrotne pomiary etapu są sumowane.
+        Czas CPU wątku (a nie całego procesu) nie obejmuje etapów innych plików przetwarzanych równolegle
+        w wątkach; nie obejmuje też wątków roboczych samego etapu (np. synteza LTC z workers > 1).
+        Czas, który w tym bloku przybył etapom z `exclude` (np. synteza LTC w trakcie zapisu), jest odejmowany.
+        """
+        excluded_before = [self._stage_times(name) for name in exclude]
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall_s = time.perf_counter() - wall_start
+            cpu_s = time.thread_time() - cpu_start
+            for name, (wall_before, cpu_before) in zip(exclude, excluded_before):
+                wall_after, cpu_after = self._stage_times(name)
+                wall_s -= wall_after - wall_before
+                cpu_s -= cpu_after - cpu_before
+            self.add_stage(stage, wall_s=max(0.0, wall_s), cpu_s=max(0.0, cpu_s))
+
+    def _stage_times(self, stage: str) -> tuple[float, float]:
+        values = self.stages.get(stage, {})
+        return values.get('wall_s', 0.0), values.get('cpu_s', 0.0)
+
+    def measure_blocks(self, blocks, stage: str = 'ltc_synthesis'):
+        """Przepuszcza bloki próbek z generatora, doliczając czas ich wytworzenia do `stage` oraz liczbę próbek i bajtów."""
+        iterator = iter(blocks)
+        while True:
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            block = next(iterator, None)
+            self.add_stage(stage, wall_s=time.perf_counter() - wall_start, cpu_s=time.thread_time() - cpu_start)
+            if block is None:
+                return
+            self.add('ltc_samples', len(block))
+            self.add('ltc_bytes', block.nbytes)
+            yield block
+
+    def add_stage(self, stage: str, **values: float):
+        stage_values = self.stages.setdefault(stage, {})
+        for name, value in values.items():
+            stage_values[name] = stage_values.get(name, 0.0) + value
+
+    def add(self, counter: str, value: float = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def to_dict(self) -> dict:
+        record = asdict(self)
+        record['wall_s'] = sum(values.get('wall_s', 0.0) for values in self.stages.values())
+        return record
+
+
+def write_jsonl(path: str, records: list[dict]):
+    """Dopisuje rekordy do pliku JSON-lines (jeden rekord na linię)."""
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def write_prometheus_textfile(path: str, records: list[dict]):
+    """
+    Zapisuje sumy z rekordów w formacie tekstowym Prometheusa (textfile collector node_exportera).
+    Plik jest zapisywany obok i podmieniany atomowo, żeby collector nigdy nie odczytał niepełnych danych.
+    """
+    files = {}
+    stage_seconds = {}
+    counters = {}
+    slowest = {}
+    for record in records:
+        camera = record['camera']
+        files[(camera, record['status'])] = files.get((camera, record['status']), 0) + 1
+        for stage, values in record['stages'].items():
+            for name, value in values.items():
+                key = (name, camera, stage)
+                stage_seconds[key] = stage_seconds.get(key, 0.0) + value
+        for name, value in record['counters'].items():
+            counters[(name, camera)] = counters.get((name, camera), 0) + value
+        slowest[camera] = max(slowest.get(camera, 0.0), record['wall_s'])
+
+    lines = ['# HELP ltc_files_total Processed files by camera directory and status.',
+             '# TYPE ltc_files_total counter']
+    for (camera, status), value in sorted(files.items()):
+        lines.append(f'ltc_files_total{{camera="{_escape_label(camera)}",status="{status}"}} {value}')
+
+    for name in sorted({key[0] for key in stage_seconds}):
+        metric = f"ltc_stage_{name.removesuffix('_s')}_seconds_total"
+        lines += [f'# HELP {metric} Time spent per stage ({name}).', f'# TYPE {metric} counter']
+        for (value_name, camera, stage), value in sorted(stage_seconds.items()):
+            if value_name == name:
+                lines.append(f'{metric}{{camera="{_escape_label(camera)}",stage="{stage}"}} {value:.6f}')
+
+    for name in sorted({key[0] for key in counters}):
+        metric = f"{name if name.startswith('ltc_') else f'ltc_{name}'}_total"
+        lines += [f'# HELP {metric} Sum of {name} per camera directory.', f'# TYPE {metric} counter']
+        for (counter_name, camera), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f'{metric}{{camera="{_escape_label(camera)}"}} {value:g}')
+
+    lines += ['# HELP ltc_file_wall_seconds_max Slowest file per camera directory (sum of stage wall times).',
+              '# TYPE ltc_file_wall_seconds_max gauge']
+    for camera, value in sorted(slowest.items()):
+        lines.append(f'ltc_file_wall_seconds_max{{camera="{_escape_label(camera)}"}} {value:.6f}')
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, path)
+
+
+def write_metrics(path: str, records: list[dict], fmt: str = 'jsonl'):
+    if fmt not in METRICS_FORMATS:
+        raise ValueError(f"Nieznany format metryk: {fmt} (dostępne: {', '.join(METRICS_FORMATS)})")
+    if fmt == 'prometheus':
+        write_prometheus_textfile(path, records)
+    else:
+        write_jsonl(path, records)
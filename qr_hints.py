@@ -0,0 +1,79 @@
+# qr_hints.py
+# Trwałe wskazówki wyszukiwania kodu QR dla każdej kamery
+#
+# Opis:
+# Na planie wielokamerowym kod QR pojawia się w każdym klipie danej kamery mniej więcej w tej samej klatce
+# (od początku nagrania) i w tym samym miejscu kadru. Po każdym odczycie zapisujemy w bazie SQLite (domyślnie
+# w katalogu wyjściowym) indeks klatki z kodem, jego położenie (ROI) i skalę, w której został odczytany.
+# Kolejny klip tej kamery - także w następnym uruchomieniu lub w innym procesie roboczym - zaczyna wyszukiwanie
+# od typowej klatki (mediana ostatnich QR_HINT_HISTORY odczytów) i zapamiętanego ROI, a dopiero gdy tam
+# kodu nie ma, przechodzi do pełnego wyszukiwania (qr_scanner.find_first_qr_frame).
+
+import datetime
+import json
+import sqlite3
+import statistics
+from contextlib import closing
+from dataclasses import dataclass
+
+QR_HINTS_FILENAME = '.ltc_qr_hints.sqlite'
+
+# Liczba ostatnich indeksów klatek z kodem zapamiętywanych dla kamery (typowa klatka to ich mediana)
+QR_HINT_HISTORY = 8
+
+
+@dataclass
+class QRHint:
+    """Wskazówka wyszukiwania kodu QR dla jednej kamery."""
+    frame_index: int  # typowy indeks pierwszej klatki z kodem
+    roi: tuple[float, float, float, float] | None  # x, y, szerokość, wysokość jako ułamki wymiarów klatki
+    decode_width: int | None  # szerokość dekodowania (None = pełna rozdzielczość)
+    hits: int = 0  # liczba zapisanych odczytów
+
+
+class QRHintStore:
+    """
+    Wskazówki QR (klucz: katalog kamery) w bazie SQLite.
+    Baza jest otwierana na czas jednej operacji, więc może być współdzielona przez procesy robocze.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS qr_hints ("
+                " camera TEXT PRIMARY KEY,"
+                " frame_indices TEXT NOT NULL,"
+                " roi TEXT, decode_width INTEGER,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " updated_at TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, camera: str) -> QRHint | None:
+        with closing(self._connect()) as db, db:
+            row = db.execute("SELECT frame_indices, roi, decode_width, hits FROM qr_hints WHERE camera = ?",
+                             (camera,)).fetchone()
+        if row is None:
+            return None
+        frame_indices, roi, decode_width, hits = row
+        return QRHint(int(statistics.median_low(json.loads(frame_indices))),
+                      tuple(json.loads(roi)) if roi else None, decode_width, hits)
+
+    def record(self, camera: str, frame_index: int, roi: tuple[float, float, float, float] | None,
+               decode_width: int | None):
+        """Dopisuje odczyt kodu QR (indeks pierwszej klatki z kodem, ROI i skala) do wskazówki kamery."""
+        updated_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        with closing(self._connect()) as db, db:
+            # Odczyt i zapis w jednej transakcji - inne procesy nie zgubią swoich odczytów
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT frame_indices, hits FROM qr_hints WHERE camera = ?", (camera,)).fetchone()
+            frame_indices = json.loads(row[0]) if row is not None else []
+            hits = row[1] if row is not None else 0
+            frame_indices = (frame_indices + [int(frame_index)])[-QR_HINT_HISTORY:]
+            db.execute("INSERT OR REPLACE INTO qr_hints (camera, frame_indices, roi, decode_width, hits, updated_at) "
+                       "VALUES (?, ?, ?, ?, ?, ?)",
+                       (camera, json.dumps(frame_indices), json.dumps(list(roi)) if roi else None,
+                        decode_width, hits + 1, updated_at))
@@ -0,0 +1,365 @@
+# qr_scanner.py
+# Wyszukiwanie pierwszej klatki z kodem QR na początku nagrania
+#
+# Opis:
+# Zamiast dekodować i skanować każdą klatkę po kolei, skaner:
+# 1. przechodzi przez klatki za pomocą grab() (bez konwersji koloru) i skanuje tylko co `stride`-tą klatkę,
+# 2. po pierwszym trafieniu cofa się (seek) do klatki po poprzedniej próbce i sprawdza klatki pośrednie,
+#    żeby znaleźć dokładnie pierwszą klatkę z kodem QR.
+# Źródło klatek jest wymienne, a dekodowanie QR przekazuje wywołujący:
+# - OpenCVFrameSource - cv2.VideoCapture,
+# - FFmpegFrameSource - proces ffmpeg (wielowątkowy dekoder) zwracający zmniejszone klatki w skali
+#   szarości jako surowe bajty, czytane bezpośrednio do bufora NumPy.
+#
+# QRFrameDecoder przygotowuje klatki dla pyzbar: konwersja do skali szarości, próby od najmniejszej
+# rozdzielczości w górę oraz obszar zainteresowania (ROI) zapamiętany z poprzedniego trafienia -
+# w tej samej lub w poprzednich klatkach/klipach z tej samej kamery.
+#
+# Zależności:
+# - OpenCV (cv2) (instalacja: `pip install opencv-python`)
+# - pyzbar (instalacja: `pip install pyzbar`)
+# - numpy (instalacja: `pip install numpy`)
+# - FFmpeg/ffprobe (tylko dla FFmpegFrameSource, muszą być dostępne w PATH)
+
+import logging
+import subprocess
+
+import cv2
+import numpy as np
+from pyzbar import pyzbar
+
+logger = logging.getLogger(__name__)
+
+# Szerokości (w pikselach), do których zmniejszana jest klatka przed dekodowaniem - od najmniejszej.
+# None oznacza pełną rozdzielczość.
+QR_SCAN_WIDTHS = (640, 1280, None)
+
+# Maksymalna szerokość klatek zwracanych przez FFmpegFrameSource (skalowanie po stronie ffmpeg)
+FFMPEG_SCAN_WIDTH = 1280
+
+# Margines wokół zapamiętanego ROI (jako ułamek jego szerokości/wysokości)
+QR_ROI_MARGIN = 0.5
+
+# Okno (w krokach `stride`) przed klatką ze wskazówki, w którym szukamy początku kodu widocznego już w hint_frame - 1
+QR_HINT_WINDOW_STRIDES = 10
+
+
+class OpenCVFrameSource:
+    """Sekwencyjne źródło klatek oparte na cv2.VideoCapture, z możliwością cofnięcia się do wskazanej klatki."""
+
+    def __init__(self, video_path: str):
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        self.position = 0  # Indeks klatki, którą zwróci następne grab()
+        self.frames_read = 0  # Liczba wszystkich pobranych klatek (także przy ponownym przejściu po seek)
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def grab(self) -> bool:
+        """Przechodzi do następnej klatki bez konwersji jej do obrazu BGR."""
+        if not self.cap.grab():
+            return False
+        self.position += 1
+        self.frames_read += 1
+        return True
+
+    def retrieve(self):
+        """Zwraca ostatnio pobraną (grab) klatkę jako obraz albo None."""
+        ret, frame = self.cap.retrieve()
+        return frame if ret else None
+
+    def seek(self, frame_index: int) -> bool:
+        """Ustawia źródło tak, aby następne grab() pobrało klatkę `frame_index`."""
+        if self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index) and int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+            self.position = frame_index
+            return True
+        # Niedokładne przewijanie (np. niektóre kontenery) - otwieramy plik ponownie i przechodzimy klatka po klatce
+        self.cap.release()
+        self.cap = cv2.VideoCapture(self.video_path)
+        self.position = 0
+        while self.position < frame_index:
+            if not self.grab():
+                return False
+        return True
+
+    def release(self):
+        self.cap.release()
+
+
+class FFmpegFrameSource:
+    """
+    Sekwencyjne źródło klatek oparte na procesie ffmpeg.
+
+    ffmpeg dekoduje tylko początkowe `duration_seconds` nagrania, skaluje klatki do szerokości co najwyżej
+    `scan_width` i zwraca je jako surowe bajty w skali szarości (-pix_fmt gray). Klatki są wczytywane
+    bezpośrednio (readinto) do jednego bufora NumPy, bez tworzenia obiektów pośrednich.
+    Cofnięcie się (seek) uruchamia ffmpeg ponownie z opcją -ss.
+    """
+
+    def __init__(self, video_path: str, frame_rate: float, duration_seconds: float,
+                 width: int | None = None, height: int | None = None, scan_width: int = FFMPEG_SCAN_WIDTH):
+        self.video_path = video_path
+        self.frame_rate = frame_rate
+        self.duration_seconds = duration_seconds
+        self.position = 0  # Indeks klatki, którą zwróci następne grab()
+        self.frames_read = 0  # Liczba wszystkich wczytanych klatek (także po ponownym uruchomieniu ffmpeg)
+        self.process = None
+        self._prefetched = False
+
+        if not width or not height:
+            width, height = self._probe_frame_size(video_path)
+        self.out_width = min(scan_width, width) // 2 * 2
+        self.out_height = max(2, round(height * self.out_width / width / 2) * 2)
+        self.buffer = np.empty((self.out_height, self.out_width), dtype=np.uint8)
+        self._start(0)
+
+    @staticmethod
+    def _probe_frame_size(video_path: str) -> tuple[int, int]:
+        probe_cmd = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height', '-of', 'csv=p=0:s=x', video_path
+        ]
+        result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
+        width, height = result.stdout.strip().splitlines()[0].split('x')[:2]
+        return int(width), int(height)
+
+    def _start(self, frame_index: int):
+        self._stop()
+        start_seconds = frame_index / self.frame_rate
+        command = [
+            'ffmpeg', '-v', 'error', '-nostdin', '-noautorotate',
+            '-ss', f"{start_seconds:.6f}",
+            '-i', self.video_path,
+            '-t', f"{max(0.0, self.duration_seconds - start_seconds):.6f}",
+            '-map', '0:v:0', '-an', '-sn',
+            '-vf', f"scale={self.out_width}:{self.out_height}:flags=area",
+            '-vsync', 'passthrough',
+            '-pix_fmt', 'gray', '-f', 'rawvideo', 'pipe:1'
+        ]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        self.position = frame_index
+        self._prefetched = False  # klatka wczytana już przez is_opened(), zwracana przez następne grab()
+
+    def _stop(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+    def is_opened(self) -> bool:
+        """
+        Czy ffmpeg zwraca klatki. Sam start procesu nie wystarcza - ffmpeg sprawdza plik wejściowy dopiero
+        po uruchomieniu, więc pierwsza klatka jest wczytywana z wyprzedzeniem (zwróci ją następne grab()).
+        """
+        if self.process is None:
+            return False
+        if not self._prefetched and self.position == 0 and not self.frames_read:
+            self._prefetched = self._read_frame()
+            return self._prefetched
+        return self.process.poll() in (None, 0)
+
+    def _read_frame(self) -> bool:
+        view = memoryview(self.buffer).cast('B')
+        filled = 0
+        while filled < len(view):
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def grab(self) -> bool:
+        """Wczytuje następną klatkę do bufora."""
+        if self._prefetched:
+            self._prefetched = False
+        elif not self._read_frame():
+            return False
+        self.position += 1
+        self.frames_read += 1
+        return True
+
+    def retrieve(self):
+        """Zwraca ostatnio wczytaną klatkę (bufor jest nadpisywany przez kolejne grab())."""
+        return self.buffer
+
+    def seek(self, frame_index: int) -> bool:
+        self._start(frame_index)
+        return True
+
+    def release(self):
+        self._stop()
+
+
+def to_gray(frame):
+    """Zwraca klatkę w skali szarości (klatki jednokanałowe bez zmian)."""
+    if frame.ndim == 3:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return frame
+
+
+class QRFrameDecoder:
+    """
+    Dekoduje kod QR z klatki: najpierw w zapamiętanym ROI, potem na coraz większych wersjach całej klatki.
+
+    `parse` zamienia tekst z kodu QR na wynik (np. parse_gopro_qr_timecode) i rzuca ValueError dla
+    nieprawidłowych kodów. Po trafieniu `roi` (x, y, szerokość, wysokość jako ułamki wymiarów klatki,
+    więc niezależne od źródła i rozdzielczości klatek) i `decode_width` (szerokość, do której zmniejszono
+    klatkę; None = pełna rozdzielczość) opisują położenie kodu i skalę, w której został odczytany.
+    `frames_decoded` i `pyzbar_calls` liczą sprawdzone klatki i wywołania pyzbar.decode.
+    """
+
+    def __init__(self, parse, roi: tuple[float, float, float, float] | None = None, decode_width: int | None = None,
+                 widths: tuple = QR_SCAN_WIDTHS):
+        self.parse = parse
+        self.roi = roi
+        self.decode_width = decode_width
+        self.widths = widths
+        self.frames_decoded = 0
+        self.pyzbar_calls = 0
+
+    def __call__(self, frame):
+        self.frames_decoded += 1
+        gray = to_gray(frame)
+
+        if self.roi is not None:
+            result = self._decode_roi(gray)
+            if result is not None:
+                return result
+
+        frame_width = gray.shape[1]
+        tried_widths = set()
+        for width in self.widths:
+            if width is None or width >= frame_width:
+                width = frame_width
+            if width in tried_widths:
+                continue
+            tried_widths.add(width)
+
+            scale = width / frame_width
+            image = gray if width == frame_width else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            result = self._decode(image, gray.shape, scale)
+            if result is not None:
+                self.decode_width = None if width == frame_width else width
+                return result
+        return None
+
+    def _decode_roi(self, gray):
+        frame_height, frame_width = gray.shape[:2]
+        x, y, w, h = self.roi
+        x0 = max(0, int((x - w * QR_ROI_MARGIN) * frame_width))
+        y0 = max(0, int((y - h * QR_ROI_MARGIN) * frame_height))
+        x1 = min(frame_width, int((x + w * (1 + QR_ROI_MARGIN)) * frame_width) + 1)
+        y1 = min(frame_height, int((y + h * (1 + QR_ROI_MARGIN)) * frame_height) + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        crop = gray[y0:y1, x0:x1]
+        scale = 1.0
+        if self.decode_width is not None and self.decode_width < frame_width:
+            scale = self.decode_width / frame_width
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return self._decode(crop, gray.shape, scale, offset=(x0, y0))
+
+    def _decode(self, image, frame_shape, scale: float, offset: tuple[int, int] = (0, 0)):
+        frame_height, frame_width = frame_shape[:2]
+        self.pyzbar_calls += 1
+        for obj in pyzbar.decode(image, symbols=[pyzbar.ZBarSymbol.QRCODE]):
+            try:
+                result = self.parse(obj.data.decode('utf-8'))
+            except ValueError:
+                continue
+            left, top, width, height = obj.rect
+            self.roi = ((offset[0] + left / scale) / frame_width, (offset[1] + top / scale) / frame_height,
+                        width / scale / frame_width, height / scale / frame_height)
+            return result
+        return None
+
+
+def _decode_at(source, decode_frame, frame_index: int):
+    """Dekoduje klatkę `frame_index` (po przewinięciu źródła, jeśli trzeba)."""
+    if source.position != frame_index and not source.seek(frame_index):
+        return None
+    if not source.grab():
+        return None
+    frame = source.retrieve()
+    return decode_frame(frame) if frame is not None else None
+
+
+def _refine(source, decode_frame, start: int, end: int):
+    """Pierwsza klatka z przedziału [start, end) z wynikiem dekodowania: (wynik, indeks_klatki) albo None."""
+    if start >= end or not source.seek(start):
+        return None
+    while source.position < end and source.grab():
+        candidate_index = source.position - 1
+        frame = source.retrieve()
+        candidate = decode_frame(frame) if frame is not None else None
+        if candidate is not None:
+            return candidate, candidate_index
+    return None
+
+
+def _scan(source, decode_frame, end: int, stride: int, phase: int = 0):
+    """
+    Skanuje od bieżącej pozycji źródła do klatki `end` (bez niej) co `stride`-tą klatkę (indeksy przystające
+    do `phase` modulo `stride`), a po trafieniu sprawdza klatki od poprzedniej próbki.
+    Zwraca (wynik, indeks_klatki) albo None.
+    """
+    scan_start = source.position
+    while source.position < end:
+        frame_index = source.position
+        if not source.grab():
+            logger.warning("Osiągnięto koniec wideo lub nie udało się odczytać klatki %d dla %s.", frame_index, source.video_path)
+            break
+        if (frame_index - phase) % stride != 0:
+            continue
+
+        frame = source.retrieve()
+        result = decode_frame(frame) if frame is not None else None
+        if result is None:
+            continue
+
+        # Trafienie - sprawdzamy klatki pomiędzy poprzednią próbką a bieżącą
+        found = _refine(source, decode_frame, max(scan_start, frame_index - stride + 1), frame_index)
+        if found is not None:
+            return found
+        return result, frame_index
+
+    return None
+
+
+def find_first_qr_frame(source, decode_frame, max_frames: int, stride: int = 1, hint_frame: int | None = None):
+    """
+    Szuka pierwszej klatki (spośród `max_frames` początkowych), dla której decode_frame(klatka) zwraca wynik inny niż None.
+
+    Najpierw skanowana jest co `stride`-ta klatka, a po trafieniu w klatce k sprawdzane są klatki
+    z przedziału (k - stride, k). Zwraca (wynik, indeks_klatki) albo (None, -1).
+
+    `hint_frame` - typowa pierwsza klatka z kodem (np. z poprzednich klipów tej kamery, patrz qr_hints).
+    Sprawdzane są wtedy najpierw klatki hint_frame - 1 i hint_frame:
+    - kodu nie ma w hint_frame - 1, a jest w hint_frame - pierwszą klatką z kodem jest hint_frame,
+    - kod jest już w hint_frame - 1 - jego początek jest szukany tylko w oknie QR_HINT_WINDOW_STRIDES
+      kroków `stride` przed hint_frame - 1 (a nie od początku nagrania),
+    - kodu nie ma w żadnej z dwóch klatek - wyszukiwanie zaczyna się od początku.
+    """
+    stride = max(1, int(stride))
+
+    if hint_frame is not None and 0 <= hint_frame < max_frames:
+        previous = _decode_at(source, decode_frame, hint_frame - 1) if hint_frame > 0 else None
+        if previous is None:
+            result = _decode_at(source, decode_frame, hint_frame)
+            if result is not None:
+                return result, hint_frame
+        else:
+            # Próbki w oknie są wyrównane do hint_frame - 1, więc ostatnia z nich na pewno zawiera kod
+            window_start = max(0, hint_frame - 1 - QR_HINT_WINDOW_STRIDES * stride)
+            if source.seek(window_start):
+                found = _scan(source, decode_frame, hint_frame, stride, phase=hint_frame - 1)
+                if found is not None:
+                    return found
+            return previous, hint_frame - 1
+        if not source.seek(0):
+            return None, -1
+
+    return _scan(source, decode_frame, max_frames, stride) or (None, -1)
@@ -0,0 +1,109 @@
+# sessions.py
+# Grupowanie rozdziałów nagrań GoPro w sesje
+#
+# Opis:
+# GoPro dzieli długie nagrania na rozdziały (ok. 4 GB): GX01nnnn.MP4, GX02nnnn.MP4, ... (HEVC) lub GH01nnnn.MP4, ... (AVC),
+# a starsze kamery GOPRnnnn.MP4, GP01nnnn.MP4, GP02nnnn.MP4, ... (nnnn - numer nagrania, cc - numer rozdziału).
+# Kod QR widać tylko na początku pierwszego rozdziału, więc rozdziały jednego nagrania są łączone w sesję:
+# QR jest odczytywany raz, a czas startu kolejnych rozdziałów wynika z czasów trwania poprzednich
+# (VideoProcessor.analyze_session), dzięki czemu LTC jest ciągły w całej sesji.
+# Rozdziały sesji muszą leżeć w jednym katalogu, mieć kolejne numery i - jeśli podano funkcję zwracającą
+# MediaInfo - ten sam kodek, rozdzielczość i klatkaż; w przeciwnym razie sesja jest w tym miejscu dzielona.
+# Pozostałe pliki tworzą sesje jednoplikowe.
+
+import logging
+import os
+import re
+import sqlite3
+import subprocess
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# GX/GH + rozdział (01, 02, ...) + numer nagrania, np. GX010042.MP4, GX020042.MP4
+GOPRO_CHAPTER_PATTERN = re.compile(r'^(?P<family>G[HX])(?P<chapter>\d{2})(?P<number>\d{4})\.MP4$', re.IGNORECASE)
+# Starsze kamery: GOPRnnnn.MP4 (pierwszy rozdział), GPccnnnn.MP4 (kolejne, od 01)
+GOPRO_LEGACY_FIRST_PATTERN = re.compile(r'^GOPR(?P<number>\d{4})\.MP4$', re.IGNORECASE)
+GOPRO_LEGACY_CHAPTER_PATTERN = re.compile(r'^GP(?P<chapter>\d{2})(?P<number>\d{4})\.MP4$', re.IGNORECASE)
+
+
+@dataclass
+class RecordingSession:
+    """Jedno nagranie: pojedynczy plik albo kolejne rozdziały GoPro (w kolejności nagrywania)."""
+    chapters: list[str]
+    pending: list[str] = field(default_factory=list)  # rozdziały do przetworzenia; pusta lista = wszystkie
+
+    def __post_init__(self):
+        if not self.pending:
+            self.pending = list(self.chapters)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.chapters[0])
+
+
+def chapter_key(video_path: str) -> tuple[tuple[str, str, str], int] | None:
+    """
+    Klucz nagrania (katalog, rodzina nazw, numer nagrania) i numer kolejny rozdziału (od 1)
+    dla plików nazwanych jak rozdziały GoPro; None dla pozostałych plików.
+    """
+    directory, name = os.path.split(os.path.abspath(video_path))
+    match = GOPRO_CHAPTER_PATTERN.match(name)
+    if match:
+        return (directory, match['family'].upper(), match['number']), int(match['chapter'])
+    match = GOPRO_LEGACY_FIRST_PATTERN.match(name)
+    if match:
+        return (directory, 'GOPR', match['number']), 1
+    match = GOPRO_LEGACY_CHAPTER_PATTERN.match(name)
+    if match:
+        return (directory, 'GOPR', match['number']), int(match['chapter']) + 1
+    return None
+
+
+def _media_signature(video_path: str, get_media_info) -> tuple | None:
+    """Kodek, rozdzielczość i klatkaż pliku albo None, jeśli nie da się go zbadać (błąd wyjdzie przy analizie)."""
+    try:
+        info = get_media_info(video_path)
+    except (subprocess.CalledProcessError, ValueError, OSError, sqlite3.Error) as e:
+        logger.debug("Nie można zbadać %s przy grupowaniu rozdziałów: %s", video_path, e)
+        return None
+    return info.codec, info.width, info.height, info.frame_rate
+
+
+def group_sessions(video_files: list[str], get_media_info=None) -> list[RecordingSession]:
+    """
+    Łączy rozdziały GoPro z `video_files` w sesje (w kolejności pierwszego wystąpienia nagrania na liście).
+    Z `get_media_info` (np. VideoProcessor.get_media_info) sesja jest dzielona na rozdziale o innym kodeku,
+    rozdzielczości lub klatkażu; zawsze jest dzielona na brakującym rozdziale.
+    """
+    groups = {}
+    for video_path in video_files:
+        key = chapter_key(video_path)
+        if key is None:
+            groups[video_path] = [(1, video_path)]
+        else:
+            groups.setdefault(key[0], []).append((key[1], video_path))
+
+    sessions = []
+    for chapters in groups.values():
+        chapters.sort()
+        current = [chapters[0][1]]
+        previous_index = chapters[0][0]
+        previous_signature = _media_signature(current[0], get_media_info) if get_media_info and len(chapters) > 1 else None
+        for index, video_path in chapters[1:]:
+            signature = _media_signature(video_path, get_media_info) if get_media_info else None
+            if index != previous_index + 1:
+                logger.warning("Brak rozdziału przed %s - rozdział zaczyna osobną sesję.", video_path)
+                split = True
+            elif signature is not None and previous_signature is not None and signature != previous_signature:
+                logger.warning("%s ma inny kodek, rozdzielczość lub klatkaż niż poprzedni rozdział - zaczyna osobną sesję.", video_path)
+                split = True
+            else:
+                split = False
+            if split:
+                sessions.append(RecordingSession(current))
+                current = []
+            current.append(video_path)
+            previous_index, previous_signature = index, signature
+        sessions.append(RecordingSession(current))
+    return sessions
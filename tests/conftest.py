@@ -0,0 +1,11 @@
+# conftest.py
+# Ścieżki importu dla testów: moduły z katalogu głównego repozytorium i timecode_tools z external_libs/
+# (tak jak po `pip install -e external_libs/timecode_tools_repo`)
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_DIR, os.path.join(REPO_DIR, 'external_libs', 'timecode_tools_repo')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
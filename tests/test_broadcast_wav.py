@@ -0,0 +1,77 @@
+# Testy pliku Broadcast WAV z sygnałem LTC (chunki 'bext' i 'iXML', video_processor.broadcast_wav_chunks)
+
+import datetime
+import struct
+import wave
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from ltc_audio import BEXT_FIXED_SIZE, iter_ltc_pcm_blocks, wav_header, wav_max_data_length, write_wav_stream
+from video_processor import broadcast_wav_chunks, generate_ltc_audio_file
+
+SAMPLE_RATE = 48000
+
+
+def read_chunks(path) -> dict[bytes, bytes]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:4] == b'RIFF' and data[8:12] == b'WAVE'
+    assert struct.unpack_from('<I', data, 4)[0] == len(data) - 8
+    chunks = {}
+    offset = 12
+    while offset < len(data):
+        chunk_id, size = struct.unpack_from('<4sI', data, offset)
+        chunks[chunk_id] = data[offset + 8:offset + 8 + size]
+        offset += 8 + size + size % 2
+    return chunks
+
+
+def test_bext_time_reference_and_ixml(tmp_path):
+    start = datetime.datetime(2025, 6, 18, 10, 0, 0, tzinfo=datetime.timezone.utc)
+    chunks = broadcast_wav_chunks(start, '30000/1001', SAMPLE_RATE, source_name='GX010042.MP4')
+    path = tmp_path / 'GX010042_LTC.wav'
+    blocks = iter_ltc_pcm_blocks(1078921, '30000/1001', SAMPLE_RATE, SAMPLE_RATE)
+    data_length = write_wav_stream(str(path), SAMPLE_RATE, blocks, chunks=chunks)
+    assert data_length == 2 * SAMPLE_RATE
+
+    chunks = read_chunks(path)
+    assert [chunk_id for chunk_id in chunks] == [b'fmt ', b'bext', b'iXML', b'data']
+    bext = chunks[b'bext']
+    assert len(bext) >= BEXT_FIXED_SIZE
+    assert bext[:256].rstrip(b'\0').decode('ascii').startswith('LTC 10:00:00;01 @ 29.97 fps DF')
+    assert bext[320:338] == b'2025-06-1810:00:00'
+    time_reference_low, time_reference_high, version = struct.unpack_from('<IIH', bext, 338)
+    time_reference = time_reference_high << 32 | time_reference_low
+    # Pierwsza klatka LTC (1078921 od północy, etykieta 10:00:00;01) to klatka trwająca o 10:00:00 -
+    # zaczyna się najwyżej jedną klatkę wcześniej
+    assert 0 <= 36000 * SAMPLE_RATE - time_reference < SAMPLE_RATE * 1001 // 30000 + 1
+    assert time_reference == -(-1078921 * SAMPLE_RATE * 1001 // 30000)
+    assert version == 1
+
+    speed = ET.fromstring(chunks[b'iXML'].decode('utf-8')).find('SPEED')
+    assert speed.findtext('TIMECODE_RATE') == '30000/1001'
+    assert speed.findtext('TIMECODE_FLAG') == 'DF'
+    assert int(speed.findtext('TIMESTAMP_SAMPLES_SINCE_MIDNIGHT_LO')) == time_reference & 0xFFFFFFFF
+
+    # Dodatkowe chunki nie przeszkadzają zwykłym czytnikom WAV
+    with wave.open(str(path), 'rb') as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate(), wav.getnframes()) == (1, 2, SAMPLE_RATE, SAMPLE_RATE)
+        samples = np.frombuffer(wav.readframes(SAMPLE_RATE), dtype='<i2')
+    np.testing.assert_array_equal(samples, np.frombuffer(chunks[b'data'], dtype='<i2'))
+
+
+def test_wav_size_limit(tmp_path):
+    chunks = broadcast_wav_chunks(datetime.datetime(2025, 6, 18, 10, 0, 0, tzinfo=datetime.timezone.utc), 25, SAMPLE_RATE)
+    max_data_length = wav_max_data_length(chunks)
+    header = wav_header(max_data_length, SAMPLE_RATE, chunks=chunks)
+    assert struct.unpack_from('<I', header, 4)[0] == 0xFFFFFFFF
+    with pytest.raises(ValueError, match='32-bit'):
+        wav_header(max_data_length + 2, SAMPLE_RATE, chunks=chunks)
+
+    # Ok. 12.4 h przy 48 kHz, mono, 16 bit - dłuższy klip jest odrzucany przed syntezą LTC
+    path = tmp_path / 'long_LTC.wav'
+    start = datetime.datetime(2025, 6, 18, 10, 0, 0, tzinfo=datetime.timezone.utc)
+    assert not generate_ltc_audio_file(start, 13 * 3600, 25, str(path))
+    assert not path.exists()
@@ -0,0 +1,57 @@
+# Testy kolejności i limitów zadań łączenia na urządzeniach (io_scheduler.py)
+
+import os
+
+import pytest
+
+from io_scheduler import DeviceSlots, device_id, job_devices, largest_first
+from sessions import RecordingSession
+
+
+def test_device_slots_limit_per_device():
+    slots = DeviceSlots(1)
+    card, disk, other = frozenset({1, 3}), frozenset({2, 3}), frozenset({4})
+    assert slots.can_start(card)
+    slots.start(card)
+    assert not slots.can_start(disk)  # wspólny dysk docelowy 3
+    assert slots.can_start(other)
+    slots.start(other)
+    slots.finish(card)
+    assert slots.can_start(disk)
+    assert slots.running == {4: 1}
+
+
+@pytest.mark.parametrize('per_device', [None, 0])
+def test_device_slots_without_limit(per_device):
+    slots = DeviceSlots(per_device)
+    for _ in range(10):
+        assert slots.can_start(frozenset({1}))
+        slots.start(frozenset({1}))
+    assert slots.running == {1: 10}
+
+
+def test_device_slots_reject_negative_limit():
+    with pytest.raises(ValueError):
+        DeviceSlots(-1)
+
+
+def test_device_id_of_missing_output_uses_existing_parent(tmp_path):
+    source = tmp_path / 'GX010042.MP4'
+    source.write_bytes(b'x')
+    output = tmp_path / 'out' / 'gopro' / 'GX010042_LTC.MP4'
+    assert device_id(str(output)) == os.stat(tmp_path).st_dev
+    assert job_devices(str(source), str(output)) == frozenset({os.stat(tmp_path).st_dev})
+
+
+def test_largest_first_orders_by_pending_size(tmp_path):
+    def video(name, size):
+        path = tmp_path / name
+        path.write_bytes(b'\0' * size)
+        return str(path)
+
+    small = RecordingSession([video('A.MP4', 10)])
+    chapters = RecordingSession([video('GX010001.MP4', 30), video('GX020001.MP4', 30)])
+    resumed = RecordingSession(chapters=[video('GX010002.MP4', 50), video('GX020002.MP4', 5)])
+    resumed.pending = [resumed.chapters[1]]  # pierwszy rozdział gotowy - liczy się tylko pozostały
+    missing = RecordingSession([str(tmp_path / 'missing.MP4')])
+    assert largest_first([small, resumed, chapters, missing]) == [chapters, small, resumed, missing]
@@ -0,0 +1,123 @@
+# Testy manifestu zadań (job_manifest.py): przejścia stanów i wykrywanie zmian plików
+
+import datetime
+import os
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from job_manifest import JobManifest, sampled_checksum
+
+
+@pytest.fixture
+def files(tmp_path):
+    source = tmp_path / 'GX010042.MP4'
+    source.write_bytes(b'source' * 1000)
+    output = tmp_path / 'out' / 'GX010042_LTC.MP4'
+    output.parent.mkdir()
+    output.write_bytes(b'output' * 1000)
+    return str(source), str(output)
+
+
+def test_state_transitions(tmp_path, files):
+    source, output = files
+    manifest = JobManifest(str(tmp_path / 'manifest.sqlite'))
+    assert manifest.get(source) is None
+
+    manifest.mark_pending(source)
+    assert manifest.get(source)['state'] == 'pending'
+    manifest.mark_running(source)
+    assert manifest.get(source)['source_size'] == os.path.getsize(source)
+    qr_time = datetime.datetime(2025, 6, 18, 9, 15, 41, 679000, tzinfo=datetime.timezone.utc)
+    manifest.record_qr(source, qr_time, 12)
+    assert not manifest.is_complete(source, output)
+
+    manifest.mark_failed(source, 'ffmpeg')
+    job = manifest.get(source)
+    assert (job['state'], job['error'], job['qr_frame_index']) == ('failed', 'ffmpeg', 12)
+    assert job['qr_time'] == qr_time.isoformat()
+
+    manifest.mark_running(source)
+    manifest.mark_done(source, output)
+    job = manifest.get(source)
+    assert (job['state'], job['error'], job['output_mode']) == ('done', None, 'remux')
+    assert job['output_checksum'] == sampled_checksum(output)
+    assert manifest.is_complete(source, output)
+    assert manifest.is_complete(source, output, verify_checksum=True)
+
+
+def test_is_complete_detects_changes(tmp_path, files):
+    source, output = files
+    manifest = JobManifest(str(tmp_path / 'manifest.sqlite'))
+    manifest.mark_running(source)
+    manifest.mark_done(source, output)
+
+    assert not manifest.is_complete(source, output, output_mode='sidecar')
+    assert not manifest.is_complete(source, output + '.other')
+
+    stat = os.stat(output)
+    with open(output, 'r+b') as f:
+        f.write(b'X')
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert manifest.is_complete(source, output)  # rozmiar i mtime bez zmian
+    assert not manifest.is_complete(source, output, verify_checksum=True)
+
+    # Źródło o tym samym rozmiarze i mtime, ale innej zawartości
+    manifest.mark_done(source, output)
+    stat = os.stat(source)
+    with open(source, 'r+b') as f:
+        f.write(b'X')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert not manifest.is_complete(source, output)
+
+    with open(source, 'ab') as f:
+        f.write(b'more')
+    assert not manifest.is_complete(source, output)
+
+    os.remove(output)
+    assert not manifest.is_complete(source, output)
+
+
+def test_old_manifest_gains_output_mode_column(tmp_path, files):
+    source, output = files
+    db_path = str(tmp_path / 'manifest.sqlite')
+    with closing(sqlite3.connect(db_path)) as db, db:
+        db.execute("CREATE TABLE jobs (source_path TEXT PRIMARY KEY, source_size INTEGER, source_mtime_ns INTEGER,"
+                   " source_checksum TEXT, state TEXT NOT NULL DEFAULT 'pending', qr_time TEXT, qr_frame_index INTEGER,"
+                   " output_path TEXT, output_size INTEGER, output_mtime_ns INTEGER, output_checksum TEXT,"
+                   " error TEXT, updated_at TEXT NOT NULL)")
+    manifest = JobManifest(db_path)
+    manifest.mark_running(source)
+    manifest.mark_done(source, output, output_mode='sidecar')
+    assert manifest.is_complete(source, output, output_mode='sidecar')
+
+
+def test_read_only_manifest(tmp_path, files):
+    source, output = files
+    db_path = str(tmp_path / 'manifest.sqlite')
+    JobManifest(db_path).mark_pending(source)
+
+    reader = JobManifest(db_path, read_only=True)
+    assert reader.get(source)['state'] == 'pending'
+    with pytest.raises(sqlite3.Error):
+        reader.mark_running(source)
+    assert JobManifest(db_path).get(source)['state'] == 'pending'
+
+
+def test_dry_run_processor_leaves_output_dir_untouched(tmp_path, files):
+    from video_processor import VideoProcessor
+
+    source, _ = files
+    output_dir = tmp_path / 'target'
+    processor = VideoProcessor(str(output_dir), str(tmp_path), read_only=True)
+    assert processor.manifest is None and processor.media_cache is None and processor.qr_hints is None
+    assert not processor.is_up_to_date(source)
+    assert not output_dir.exists()
+
+    VideoProcessor(str(output_dir), str(tmp_path)).manifest.mark_pending(source)
+    before = {path.name: path.read_bytes() for path in output_dir.iterdir()}
+    processor = VideoProcessor(str(output_dir), str(tmp_path), read_only=True)
+    assert processor.manifest.read_only and processor.media_cache.read_only
+    assert not processor.is_up_to_date(source)
+    assert {path.name: path.read_bytes() for path in output_dir.iterdir()} == before
@@ -0,0 +1,84 @@
+# Testy syntezy sygnału LTC (ltc_audio.py)
+
+import numpy as np
+import pytest
+
+from timecode_tools.tools import ltc_encode_frames, ltc_frame_parity
+from ltc_audio import (LTCFrameTemplateCache, iter_ltc_pcm_blocks, ltc_frame_count, render_ltc_frames,
+                       ON_VALUE, OFF_VALUE)
+
+SAMPLE_RATE = 48000
+
+# (klatkaż, numer klatki startowej) - całkowite i ułamkowe klatkaże, start tuż przed pełną minutą
+RATES = [(24, 86390), (25, 89990), ('30000/1001', 1790), ('60000/1001', 3590)]
+
+
+def synthesize(start_frame, rate, total_samples, **kwargs) -> np.ndarray:
+    return np.concatenate(list(iter_ltc_pcm_blocks(start_frame, rate, SAMPLE_RATE, total_samples, **kwargs)))
+
+
+def reference(start_frame, rate, total_samples) -> np.ndarray:
+    """Cały sygnał jednym wywołaniem render_ltc_frames (bez pamięci podręcznej szablonów)."""
+    levels = np.array([OFF_VALUE, ON_VALUE], dtype=np.int16)
+    count = ltc_frame_count(rate, SAMPLE_RATE, total_samples)
+    return render_ltc_frames(start_frame, 0, count, rate, SAMPLE_RATE, True, total_samples, levels)
+
+
+@pytest.mark.parametrize('rate, start_frame', RATES)
+def test_cached_templates_match_direct_rendering(rate, start_frame):
+    total_samples = 3 * SAMPLE_RATE + 123
+    cache = LTCFrameTemplateCache()
+    signal = synthesize(start_frame, rate, total_samples, cache=cache, block_samples=20000)
+    assert signal.dtype == np.int16 and len(signal) == total_samples
+    np.testing.assert_array_equal(signal, reference(start_frame, rate, total_samples))
+
+    # Ponowna synteza korzysta z szablonów i daje ten sam sygnał
+    misses = cache.misses
+    np.testing.assert_array_equal(synthesize(start_frame, rate, total_samples, cache=cache, block_samples=20000), signal)
+    assert cache.misses == misses and cache.hits > 0
+
+
+@pytest.mark.parametrize('block_samples', [1, 4000, 1 << 18])
+def test_block_size_does_not_change_signal(block_samples):
+    total_samples = 2 * SAMPLE_RATE
+    expected = reference(1790, '30000/1001', total_samples)
+    np.testing.assert_array_equal(synthesize(1790, '30000/1001', total_samples, block_samples=block_samples,
+                                             cache=LTCFrameTemplateCache()), expected)
+
+
+def test_frames_start_at_exact_sample_positions():
+    # Przy 30000/1001 kl/s i 48 kHz klatka k zaczyna się w próbce ceil(k * 1601.6); każdy bit LTC zaczyna się
+    # zmianą poziomu, więc w pierwszej próbce każdej klatki poziom jest inny niż w ostatniej próbce poprzedniej
+    signal = synthesize(0, '30000/1001', SAMPLE_RATE, cache=LTCFrameTemplateCache())
+    starts = [-(-k * SAMPLE_RATE * 1001 // 30000) for k in range(1, 29)]
+    assert all(signal[start] != signal[start - 1] for start in starts)
+    lengths = np.diff([0] + starts)
+    assert set(lengths.tolist()) == {1601, 1602}
+
+
+def test_template_cache_evicts_least_recently_used():
+    cache = LTCFrameTemplateCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, np.zeros(1, dtype=np.uint8))
+        if key == 'b':
+            assert cache.get('a') is not None
+    assert len(cache) == 2
+    assert cache.get('b') is None and cache.get('a') is not None and cache.get('c') is not None
+
+
+@pytest.mark.parametrize('rate, start_frame', RATES)
+@pytest.mark.parametrize('workers', [2, 4])
+def test_threaded_blocks_are_byte_identical_to_serial(rate, start_frame, workers):
+    total_samples = 4 * SAMPLE_RATE + 7
+    serial = list(iter_ltc_pcm_blocks(start_frame, rate, SAMPLE_RATE, total_samples, block_samples=10000,
+                                      cache=LTCFrameTemplateCache()))
+    threaded = list(iter_ltc_pcm_blocks(start_frame, rate, SAMPLE_RATE, total_samples, block_samples=10000,
+                                        workers=workers))
+    assert b''.join(block.tobytes() for block in threaded) == b''.join(block.tobytes() for block in serial)
+
+
+@pytest.mark.parametrize('rate, start_frame', RATES + [(120, 7150)])
+def test_frame_parity_matches_encoded_frames(rate, start_frame):
+    frame_bits = ltc_encode_frames(start_frame, 200, rate)
+    expected = (np.count_nonzero(frame_bits == 0, axis=1) & 1).astype(np.uint8)
+    np.testing.assert_array_equal(ltc_frame_parity(start_frame, 200, rate), expected)
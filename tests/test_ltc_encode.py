@@ -0,0 +1,91 @@
+# Testy kodowania ramek LTC z tablic (timecode_tools.tools.ltc_encode_frames)
+# względem kodowania klatka po klatce (ltc_encode z obiektem Timecode).
+
+import numpy as np
+import pytest
+from timecode import Timecode
+
+from timecode_tools.tools import (ltc_encode, ltc_encode_frames, frames_to_tc_string, ltc_frame_rate,
+                                  LTC_BITS_PER_FRAME, LTC_DROP_FRAME_BIT, LTC_SYNC_WORD)
+
+
+def per_frame_bits(rate: str, frame_number: int) -> np.ndarray:
+    """Bity ramki z ltc_encode dla klatki o numerze `frame_number` (od zera)."""
+    text = ltc_encode(Timecode(rate, frames=frame_number + 1), as_string=True)
+    return np.frombuffer(text.encode('ascii'), dtype=np.uint8) - ord('0')
+
+
+# Klatki na granicach sekund, minut, godzin i doby
+NDF_FRAMES = {
+    '24': (0, 1, 23, 24, 1439, 1440, 86399, 86400, 2073599),
+    '25': (0, 1, 24, 25, 1499, 1500, 89999, 90000, 2159999),
+    '30': (0, 1, 29, 30, 1799, 1800, 107999, 108000, 2591999),
+    '60': (0, 39, 40, 59, 60, 3599, 3600, 5183999),
+    # Wartości klatek 40-119 nie mieszczą się w 2-bitowym polu dziesiątek - ltc_encode je obcina
+    '120': (0, 39, 40, 99, 100, 119, 120, 7199, 7200, 10367999),
+}
+
+# Drop-frame: pierwsze klatki minut (pominięte etykiety ;00 i ;01 lub ;00-;03), co dziesiąta minuta bez pominięć
+DF_FRAMES = {
+    '29.97': ('30000/1001', (0, 1799, 1800, 1801, 3597, 3598, 17981, 17982, 17983, 107891, 107892, 2589407)),
+    '59.94': ('60000/1001', (0, 3599, 3600, 3601, 7195, 7196, 35963, 35964, 35965, 215783, 215784, 5178815)),
+}
+
+
+@pytest.mark.parametrize('rate', sorted(NDF_FRAMES))
+def test_ltc_encode_frames_matches_per_frame_ndf(rate):
+    for frame_number in NDF_FRAMES[rate]:
+        bits = ltc_encode_frames(frame_number, 1, int(rate))
+        assert bits.shape == (1, LTC_BITS_PER_FRAME)
+        np.testing.assert_array_equal(bits[0], per_frame_bits(rate, frame_number), err_msg=f"{rate} kl/s, klatka {frame_number}")
+
+
+@pytest.mark.parametrize('rate', sorted(NDF_FRAMES))
+def test_ltc_encode_frames_batch_equals_single_frames(rate):
+    start = NDF_FRAMES[rate][5] - 40
+    batch = ltc_encode_frames(start, 80, int(rate))
+    for i in range(80):
+        np.testing.assert_array_equal(batch[i], per_frame_bits(rate, start + i))
+
+
+@pytest.mark.parametrize('rate', sorted(DF_FRAMES))
+def test_ltc_encode_frames_matches_per_frame_df(rate):
+    fraction, frame_numbers = DF_FRAMES[rate]
+    for frame_number in frame_numbers:
+        bits = ltc_encode_frames(frame_number, 1, fraction)
+        assert bits[0, LTC_DROP_FRAME_BIT] == 1
+        np.testing.assert_array_equal(bits[0], per_frame_bits(rate, frame_number), err_msg=f"{rate} kl/s, klatka {frame_number}")
+
+
+@pytest.mark.parametrize('rate', sorted(DF_FRAMES))
+def test_ltc_encode_frames_batch_across_dropped_labels(rate):
+    fraction, frame_numbers = DF_FRAMES[rate]
+    start = frame_numbers[2] - 10
+    batch = ltc_encode_frames(start, 20, fraction)
+    for i in range(20):
+        np.testing.assert_array_equal(batch[i], per_frame_bits(rate, start + i))
+
+
+def test_drop_frame_labels():
+    assert frames_to_tc_string(1799, '30000/1001') == '00:00:59;29'
+    assert frames_to_tc_string(1800, '30000/1001') == '00:01:00;02'
+    assert frames_to_tc_string(17982, '30000/1001') == '00:10:00;00'
+    assert frames_to_tc_string(3600, '60000/1001') == '00:01:00;04'
+    assert frames_to_tc_string(1800, 30) == '00:01:00:00'
+
+
+def test_ltc_frame_rate_is_exact():
+    assert ltc_frame_rate(29.97) == ltc_frame_rate('30000/1001') == ltc_frame_rate('29.97')
+    assert ltc_frame_rate(59.94).denominator == 1001
+    assert ltc_frame_rate(25) == 25
+
+
+def test_ltc_encode_frames_layout():
+    # 01:02:03:04 przy 25 kl/s: cyfry BCD od najmłodszego bitu, słowo synchronizacji na końcu, bez flagi DF
+    bits = ltc_encode_frames(((1 * 60 + 2) * 60 + 3) * 25 + 4, 1, 25)[0]
+    assert bits[0:4].tolist() == [0, 0, 1, 0]      # jednostki klatek: 4
+    assert bits[16:20].tolist() == [1, 1, 0, 0]    # jednostki sekund: 3
+    assert bits[32:36].tolist() == [0, 1, 0, 0]    # jednostki minut: 2
+    assert bits[48:52].tolist() == [1, 0, 0, 0]    # jednostki godzin: 1
+    assert bits[10] == 0
+    assert ''.join(map(str, bits[64:])) == LTC_SYNC_WORD
@@ -0,0 +1,48 @@
+# Testy numeru klatki startowej LTC (video_processor.ltc_start_frame) i jego odwrotności (ltc_frame_time)
+
+import datetime
+from fractions import Fraction
+
+import pytest
+
+from timecode_tools.tools import frames_to_tc_string
+from video_processor import broadcast_wav_chunks, ltc_frame_time, ltc_start_frame
+
+START = datetime.datetime(2025, 6, 18, 18, 0, 0, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize('rate, label', [
+    (Fraction(24000, 1001), '18:00:00:00'),
+    (Fraction(24), '18:00:00:00'),
+    (Fraction(25), '18:00:00:00'),
+    (Fraction(30000, 1001), '18:00:00;01'),
+])
+def test_start_label_matches_time_of_day(rate, label):
+    assert frames_to_tc_string(ltc_start_frame(START, rate), rate) == label
+
+
+def test_23976_label_uses_wall_clock_second():
+    rate = Fraction(24000, 1001)
+    # 18:00:00.5 to 12. klatka sekundy (0.5 s * 24000/1001 = 11.99 -> klatka 11)
+    start = START + datetime.timedelta(microseconds=500000)
+    assert frames_to_tc_string(ltc_start_frame(start, rate), rate) == '18:00:00:11'
+    # Ostatnia klatka sekundy nie przechodzi na następną sekundę
+    start = START + datetime.timedelta(microseconds=999999)
+    assert frames_to_tc_string(ltc_start_frame(start, rate), rate) == '18:00:00:23'
+
+
+@pytest.mark.parametrize('rate', [Fraction(24000, 1001), Fraction(25), Fraction(30000, 1001), Fraction(60000, 1001)])
+def test_frame_time_inverts_start_frame(rate):
+    first = ltc_start_frame(START, rate)
+    for frame_number in range(first - 50, first + 50):
+        frame_time = ltc_frame_time(START, frame_number, rate)
+        assert ltc_start_frame(frame_time, rate) == frame_number
+        assert ltc_start_frame(frame_time - datetime.timedelta(microseconds=1), rate) == frame_number - 1
+
+
+def test_23976_bext_time_reference_is_wall_clock():
+    chunks = broadcast_wav_chunks(START, '24000/1001', 48000)
+    assert chunks[:4] == b'bext'
+    bext = chunks[8:]
+    assert bext[:256].rstrip(b'\0').decode('ascii').startswith('LTC 18:00:00:00 @ 23.976 fps')
+    assert int.from_bytes(bext[338:346], 'little') == 18 * 3600 * 48000
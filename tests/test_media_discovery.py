@@ -0,0 +1,94 @@
+# Testy wyszukiwania plików wideo na kartach i odczytu metadanych klipów (media_discovery.py)
+
+import os
+import shutil
+
+import pytest
+
+from media_discovery import discover_videos, read_clpi, read_xavc_xml
+
+from conftest import REPO_DIR
+
+# Plik informacji o klipie z karty Panasonic (AVCHD, 1080/50p) dołączony do repozytorium
+SAMPLE_CPI = os.path.join(REPO_DIR, 'source', 'Panasonic 90', 'PRIVATE', 'AVCHD', 'AVCHDTN', 'BDMV', 'CLIPINF', '00071.CPI')
+# Metadane NonRealTimeMeta klipu Sony XAVC S (2160/59.94p HEVC)
+SAMPLE_XAVC_XML = os.path.join(os.path.dirname(__file__), 'data', 'C0001M01.XML')
+
+
+def touch(path, size=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    return str(path)
+
+
+def test_read_clpi_bundled_sample(tmp_path):
+    video_path = touch(tmp_path / '00071.MTS', 188)
+    info = read_clpi(SAMPLE_CPI, video_path)
+    assert info is not None
+    assert info.path == os.path.abspath(video_path) and info.size == 188
+    assert info.duration_seconds == pytest.approx(112.32)
+    assert info.frame_rate == '50/1'
+    assert (info.codec, info.width, info.height, info.audio_streams) == ('h264', 1920, 1080, 1)
+
+
+def test_read_clpi_rejects_other_files(tmp_path):
+    video_path = touch(tmp_path / '00071.MTS')
+    assert read_clpi(SAMPLE_XAVC_XML, video_path) is None
+    assert read_clpi(touch(tmp_path / 'short.CPI', 6), video_path) is None
+    assert read_clpi(str(tmp_path / 'missing.CPI'), video_path) is None
+
+
+def test_read_xavc_xml_bundled_sample(tmp_path):
+    video_path = touch(tmp_path / 'C0001.MP4')
+    info = read_xavc_xml(SAMPLE_XAVC_XML, video_path)
+    assert info is not None
+    assert info.frame_rate == '60000/1001'
+    assert info.duration_seconds == pytest.approx(1200 * 1001 / 60000)
+    assert (info.codec, info.width, info.height, info.audio_streams) == ('hevc', 3840, 2160, 1)
+
+
+def test_read_xavc_xml_rejects_other_files(tmp_path):
+    video_path = touch(tmp_path / 'C0001.MP4')
+    assert read_xavc_xml(SAMPLE_CPI, video_path) is None
+    broken = tmp_path / 'C0002M01.XML'
+    broken.write_text('<NonRealTimeMeta><Duration value="x"/></NonRealTimeMeta>')
+    assert read_xavc_xml(str(broken), video_path) is None
+
+
+def test_discover_videos_card_layouts(tmp_path):
+    gopro = tmp_path / 'cam1' / 'DCIM' / '100GOPRO'
+    for name in ('GX010042.MP4', 'GX020042.MP4', 'GL010042.LRV', 'GX010042.THM'):
+        touch(gopro / name)
+    avchd = tmp_path / 'Panasonic' / 'PRIVATE' / 'AVCHD'
+    touch(avchd / 'BDMV' / 'STREAM' / '00071.MTS', 188)
+    os.makedirs(avchd / 'BDMV' / 'CLIPINF')
+    shutil.copy(SAMPLE_CPI, avchd / 'BDMV' / 'CLIPINF' / '00071.CPI')
+    touch(avchd / 'AVCHDTN' / 'THUMB.MTS')  # miniatury - pomijane
+    m4root = tmp_path / 'sony' / 'PRIVATE' / 'M4ROOT'
+    touch(m4root / 'CLIP' / 'C0001.MP4')
+    shutil.copy(SAMPLE_XAVC_XML, m4root / 'CLIP' / 'C0001M01.XML')
+    touch(m4root / 'SUB' / 'C0001S03.MP4')  # proxy - pomijane
+    touch(tmp_path / 'scene' / 'take1.mov')
+    touch(tmp_path / '.hidden' / 'x.mp4')
+    touch(tmp_path / 'notes.mts.txt')
+    touch(tmp_path / 'out' / 'GX010042_LTC.MP4')
+
+    videos = list(discover_videos(str(tmp_path), exclude=(str(tmp_path / 'out'),)))
+    found = {os.path.relpath(video.path, tmp_path): video for video in videos}
+    assert sorted(found) == sorted([
+        os.path.join('Panasonic', 'PRIVATE', 'AVCHD', 'BDMV', 'STREAM', '00071.MTS'),
+        os.path.join('cam1', 'DCIM', '100GOPRO', 'GX010042.MP4'),
+        os.path.join('cam1', 'DCIM', '100GOPRO', 'GX020042.MP4'),
+        os.path.join('scene', 'take1.mov'),
+        os.path.join('sony', 'PRIVATE', 'M4ROOT', 'CLIP', 'C0001.MP4'),
+    ])
+    layouts = {path.split(os.sep)[0]: video.layout for path, video in found.items()}
+    assert layouts == {'Panasonic': 'avchd', 'cam1': 'dcim', 'scene': 'generic', 'sony': 'xavc'}
+    clips = {video.layout: video.clip_info for video in videos}
+    assert clips['avchd'].frame_rate == '50/1' and clips['xavc'].frame_rate == '60000/1001'
+    assert clips['dcim'] is None and clips['generic'] is None
+
+    # Pliki katalogu są zwracane razem, w kolejności nazw (rozdziały GoPro trafiają do jednej grupy)
+    gopro_files = [os.path.basename(video.path) for video in videos if video.layout == 'dcim']
+    assert gopro_files == ['GX010042.MP4', 'GX020042.MP4']
@@ -0,0 +1,100 @@
+# Testy wskazówek wyszukiwania kodu QR (qr_hints.py) i wyszukiwania od wskazanej klatki (qr_scanner.py)
+
+import pytest
+
+from qr_hints import QR_HINT_HISTORY, QRHintStore
+
+
+def test_hint_store_keeps_median_of_recent_reads(tmp_path):
+    store = QRHintStore(str(tmp_path / 'hints.sqlite'))
+    assert store.get('/cards/cam1') is None
+
+    for frame_index in (40, 10, 12, 11):
+        store.record('/cards/cam1', frame_index, (0.25, 0.5, 0.1, 0.2), 480)
+    hint = store.get('/cards/cam1')
+    assert (hint.frame_index, hint.roi, hint.decode_width, hint.hits) == (11, (0.25, 0.5, 0.1, 0.2), 480, 4)
+
+    # Starsze odczyty wypadają z historii; wskazówka jest widoczna dla innych instancji (procesów)
+    for _ in range(QR_HINT_HISTORY):
+        store.record('/cards/cam1', 90, None, None)
+    hint = QRHintStore(str(tmp_path / 'hints.sqlite')).get('/cards/cam1')
+    assert (hint.frame_index, hint.roi, hint.decode_width, hint.hits) == (90, None, None, 4 + QR_HINT_HISTORY)
+    assert store.get('/cards/cam2') is None
+
+
+class FakeFrameSource:
+    """Źródło klatek, w którym klatka to jej indeks (interfejs jak OpenCVFrameSource)."""
+    video_path = 'fake.mp4'
+
+    def __init__(self, frame_count: int):
+        self.frame_count = frame_count
+        self.position = 0
+
+    def grab(self) -> bool:
+        if self.position >= self.frame_count:
+            return False
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        return self.position - 1
+
+    def seek(self, frame_index: int) -> bool:
+        self.position = frame_index
+        return True
+
+
+def qr_decoder(intervals, decoded):
+    def decode(frame_index):
+        decoded.append(frame_index)
+        return f"QR@{frame_index}" if any(first <= frame_index <= last for first, last in intervals) else None
+    return decode
+
+
+@pytest.fixture
+def find_first_qr_frame():
+    pytest.importorskip('cv2')
+    pytest.importorskip('pyzbar.pyzbar')
+    from qr_scanner import find_first_qr_frame
+    return find_first_qr_frame
+
+
+@pytest.mark.parametrize('stride', [1, 7, 15])
+def test_hinted_search_matches_full_search_for_one_appearance(find_first_qr_frame, stride):
+    for first in range(0, 60, 3):
+        intervals = [(first, first + 20)]
+        expected = find_first_qr_frame(FakeFrameSource(300), qr_decoder(intervals, []), 300, stride)
+        for hint in (0, first - 5, first, first + 1, first + 30, 250):
+            result = find_first_qr_frame(FakeFrameSource(300), qr_decoder(intervals, []), 300, stride, hint)
+            assert result == expected, (first, hint)
+
+
+def test_exact_hint_decodes_two_frames(find_first_qr_frame):
+    decoded = []
+    assert find_first_qr_frame(FakeFrameSource(300), qr_decoder([(45, 80)], decoded), 300, 15, 45) == ('QR@45', 45)
+    assert decoded == [44, 45]
+
+
+def test_late_hint_searches_window_before_hint(find_first_qr_frame):
+    # Kod widoczny już w klatce przed wskazówką - próbki co `stride` wyrównane do hint - 1, potem klatki pośrednie
+    decoded = []
+    assert find_first_qr_frame(FakeFrameSource(300), qr_decoder([(40, 80)], decoded), 300, 15, 60) == ('QR@40', 40)
+    assert decoded == [59, 14, 29, 44, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40]
+
+
+def test_late_hint_search_is_bounded_to_window(find_first_qr_frame):
+    from qr_scanner import QR_HINT_WINDOW_STRIDES
+
+    decoded = []
+    hint = 200
+    window_start = hint - 1 - QR_HINT_WINDOW_STRIDES * 5
+    result = find_first_qr_frame(FakeFrameSource(300), qr_decoder([(10, 250)], decoded), 300, 5, hint)
+    assert result == (f'QR@{window_start}', window_start)
+    assert min(decoded) == window_start
+
+
+def test_hint_on_second_appearance_is_accepted(find_first_qr_frame):
+    # Kod pokazany dwa razy: typowa klatka kamery trafia w początek drugiego pokazania - bez przeszukiwania od początku
+    intervals = [(12, 20), (45, 80)]
+    assert find_first_qr_frame(FakeFrameSource(300), qr_decoder(intervals, []), 300, 15) == ('QR@12', 12)
+    assert find_first_qr_frame(FakeFrameSource(300), qr_decoder(intervals, []), 300, 15, 45) == ('QR@45', 45)
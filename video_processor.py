@@ -9,62 +9,86 @@
 # Ten moduł zawiera klasę VideoProcessor do przetwarzania plików wideo.
 # Główne funkcje obejmują:
 # 1. Odczytywanie kodu QR GoPro z nagrań wideo w celu uzyskania dokładnego czasu rozpoczęcia.
-# 2. Generowanie sygnału Linear Timecode (LTC) jako pliku audio WAV, opartego na odczytanym czasie i klatkażu wideo.
-# 3. Łączenie wygenerowanego pliku audio z oryginalnym wideo jako dodatkowej ścieżki audio za pomocą FFmpeg.
+# 2. Generowanie sygnału Linear Timecode (LTC) jako pliku audio WAV, opartego na odczytanym czasie i klatkażu wideo
+#    (klatkaż jako dokładny ułamek z ffprobe; dla 29.97 i 59.94 fps timecode drop-frame).
+# 3. Łączenie wygenerowanego audio z oryginalnym wideo jako dodatkowej ścieżki audio za pomocą FFmpeg
+#    (domyślnie próbki PCM trafiają do ffmpeg przez stdin; tymczasowy plik WAV to tryb zapasowy).
 #    Rozwiązanie omija brak filtra 'smpteh' w standardowych kompilacjach FFmpeg.
+# 4. Zapisywanie stanu każdego pliku w manifeście zadań (job_manifest.py), żeby ponowne uruchomienie
+#    pomijało pliki już przetworzone i wznawiało tylko oczekujące, nieudane lub przerwane.
+# 5. Asynchroniczną orkiestrację wielu sesji w jednym procesie (VideoProcessor.process_sessions_async):
+#    ffprobe kolejnych plików, odczyt QR i łączenie działają jednocześnie, z osobnymi limitami równoległości.
 #
 # Zależności:
 # - FFmpeg (musi być zainstalowany i dostępny w PATH)
 # - ffprobe (część pakietu FFmpeg, musi być zainstalowany i dostępny w PATH)
 # - OpenCV (cv2) (instalacja: `pip install opencv-python`)
 # - pyzbar (instalacja: `pip install pyzbar`)
-# - pytz (biblioteka Python, instalacja: `pip install pytz`)
 # - numpy (instalacja: `pip install numpy`)
-# - scipy (instalacja: `pip install scipy`)
-# - timecode (biblioteka Python, najprawdopodobniej zainstalowana globalnie, np. `pip install timecode`)
+# - ltc_audio.py (lokalny moduł syntezy LTC i strumieniowego zapisu WAV)
+# - timecode (biblioteka Python, zależność timecode_tools, np. `pip install timecode`)
 # - timecode_tools (repozytorium sklonowane do external_libs/, używamy tylko tools.py z tego)
+#
+# Ciężkie zależności (cv2, pyzbar, numpy, timecode_tools, ltc_audio, qr_scanner) są importowane dopiero
+# w etapach, które ich używają (odczyt QR, synteza LTC, łączenie), więc import modułu, listowanie plików,
+# --dry-run i wznawianie z manifestu ich nie ładują (patrz bench/run_benchmarks.py --suite startup).
 
-import sys
 import os
 import datetime
 import subprocess
-import cv2
-from pyzbar import pyzbar
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
 import re
 from fractions import Fraction
-import pytz
-import numpy as np
-import traceback
 import numbers
+import math
+import contextlib
+import logging
+from dataclasses import dataclass
+import xml.etree.ElementTree as ET
 
-# Import dla zapisu pliku WAV (nadal używamy scipy)
-from scipy.io.wavfile import write as write_wav
-
-# Dodaj ścieżkę do katalogu 'external_libs'
-#current_script_dir = os.path.dirname(os.path.abspath(__file__))
-#external_libs_path = os.path.join(current_script_dir, 'external_libs')
-#if external_libs_path not in sys.path:
-#    sys.path.insert(0, external_libs_path)
-
-
-from timecode import Timecode
-from timecode_tools.tools import ltc_encode, cint
+from media_info import MediaInfo, MediaInfoCache, probe_media, MEDIA_CACHE_FILENAME
+from job_manifest import JobManifest, MANIFEST_FILENAME
+from qr_hints import QRHintStore, QR_HINTS_FILENAME
+from metrics import FileMetrics
+from sessions import RecordingSession
+from ffmpeg_runner import run_ffmpeg
+from io_scheduler import DeviceSlots, job_devices
 
+logger = logging.getLogger(__name__)
 
-# --- KLUCZOWE ZMIANY W IMPORCIE ---
-try:
-    # Import Timecode z systemowej biblioteki (tej, którą masz zainstalowaną)
-    from timecode import Timecode
-    # Import ltc_encode i cint z 'external_libs/timecode_tools/tools.py'
-    from timecode_tools.tools import ltc_encode, cint 
-    print("Pomyślnie załadowano Timecode (zewnętrzny) i ltc_encode/cint (z timecode_tools).")
-except ImportError as e:
-    print(f"Błąd: Nie można załadować wymaganych modułów. Upewnij się, że 'timecode' (pip install timecode) jest zainstalowany i 'external_libs/timecode_tools/tools.py' jest dostępne. Błąd: {e}")
-    traceback.print_exc()
-    sys.exit(1) # Zakończ program z błędem, ponieważ to jest krytyczny import
+# FileMetrics pliku przetwarzanego w bieżącym kontekście (wątku lub zadaniu asyncio) - patrz VideoProcessor._metrics
+_current_metrics = contextvars.ContextVar('current_metrics', default=None)
 
 __version__ = "4.8" # Zaktualizowany numer wersji
-print(f"Ładowanie video_processor.py - Wersja: {__version__}")
+
+LTC_SAMPLE_RATE = 48000 # Częstotliwość próbkowania generowanego sygnału LTC
+
+# Sposób przekazania audio LTC do ffmpeg:
+# 'pipe' - surowe próbki s16le przez stdin ffmpeg (bez pliku tymczasowego),
+# 'file' - tymczasowy plik WAV w katalogu wyjściowym (tryb zapasowy).
+LTC_TRANSPORTS = ('pipe', 'file')
+# Postać wyniku:
+# 'remux'   - kopia wideo (-c copy) z dodatkową ścieżką audio LTC, <nazwa>_LTC<rozszerzenie>,
+# 'sidecar' - bez kopiowania wideo: plik LTC <nazwa>_LTC.wav i mały plik QuickTime <nazwa>_TC.mov
+#             ze ścieżką timecode (tmcd) i zastępczym obrazem 16x16 o klatkażu i długości klipu.
+OUTPUT_MODES = ('remux', 'sidecar')
+SIDECAR_VIDEO_SIZE = '16x16'
+# Sposób zapisu plików WAV z LTC:
+# 'stream' - bloki próbek dopisywane kolejno do pliku,
+# 'memmap' - obszar danych pliku mapowany w pamięci (np.memmap) i wypełniany przez syntezę w miejscu.
+WAV_WRITERS = ('stream', 'memmap')
+# Źródła klatek dla wyszukiwania QR (qr_scanner.OpenCVFrameSource, qr_scanner.FFmpegFrameSource)
+QR_FRAME_SOURCES = ('opencv', 'ffmpeg')
+# Domyślny odstęp między skanowanymi klatkami w pierwszym przebiegu wyszukiwania QR (w sekundach)
+QR_SCAN_STRIDE_SECONDS = 0.5
+# Autor zapisywany w chunku 'bext' i historii kodowania plików Broadcast WAV
+BWF_ORIGINATOR = 'LTC-timecode-embedder'
+# Podsumowanie z opcji -benchmark ffmpeg
+FFMPEG_BENCH_PATTERN = re.compile(r'bench: utime=([\d.]+)s stime=([\d.]+)s rtime=([\d.]+)s')
 
 
 # --- FUNKCJA parse_gopro_qr_timecode - PRZYWRÓCONA ---
@@ -120,248 +144,548 @@ def parse_gopro_qr_timecode(qr_data: str) -> datetime.datetime:
     return utc_dt
 
 
-def generate_ltc_audio_file(start_time_utc: datetime.datetime, duration_seconds: float, fps: float, output_path: str):
+def _wall_clock_labels(frame_rate: Fraction) -> bool:
     """
-    Generuje plik WAV zawierający sygnał LTC.
-    Używa klasy Timecode z zewnętrznej biblioteki 'timecode' i funkcji ltc_encode z 'timecode_tools/tools.py'.
+    Czy etykiety LTC liczone są od czasu zegarowego: klatkaże ułamkowe bez drop-frame (np. 24000/1001).
+    Ich etykiety mają całkowitą bazę (24 klatki na sekundę timecode'u), więc numer klatki z liczby
+    rzeczywistych klatek od północy dawałby etykietę opóźnioną o minuty względem pory dnia.
     """
-    sample_rate = 48000
-    bits = 16 # Domyślnie 16-bitowe audio, jak w standardach LTC
+    from timecode_tools.tools import ltc_rate_params
 
-    print(f"DEBUG (LTC Gen): start_time_utc: {start_time_utc} (type: {type(start_time_utc)})")
-    print(f"DEBUG (LTC Gen): duration_seconds: {duration_seconds} (type: <class 'float'>)")
-    print(f"DEBUG (LTC Gen): fps: {fps} (type: <class 'float'>)")
+    return frame_rate.denominator != 1 and not ltc_rate_params(frame_rate)[1]
 
-    try:
-        if not isinstance(duration_seconds, (int, float)):
-            raise TypeError(f"duration_seconds musi być liczbą, otrzymano {type(duration_seconds)}: {duration_seconds}")
-        if not isinstance(fps, (int, float)):
-            raise TypeError(f"fps musi być liczbą, otrzymano {type(fps)}: {fps}")
-        if not isinstance(start_time_utc, datetime.datetime):
-            raise TypeError(f"start_time_utc musi być obiektem datetime.datetime, otrzymano {type(start_time_utc)}: {start_time_utc}")
-
-        print(f"DEBUG (LTC Gen): Wartości po konwersji/sprawdzeniu: duration_seconds={duration_seconds}, fps={fps}")
-
-        # Utworzenie obiektu Timecode
-        # Biblioteka Timecode (v1.4.1) nie posiada metody from_datetime().
-        # Musimy ręcznie sformatować datetime na string HH:MM:SS:FF dla konstruktora Timecode(fps, start_string).
-        
-        # Obliczanie całkowitej liczby klatek od północy UTC do start_time_utc
-        # Upewniamy się, że czas jest "naiwny" (bez strefy czasowej) do obliczeń
-        naive_start_time = start_time_utc.replace(tzinfo=None)
-        
-        # Oblicz sekundy od północy
-        total_seconds_from_midnight = (naive_start_time - naive_start_time.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds()
-        
-        # Dodaj klatki wynikające z milisekund. Zaokrąglamy w dół, aby nie przekroczyć bieżącej klatki.
-        frames_from_seconds = int(total_seconds_from_midnight * fps)
-        
-        # Rozłożenie całkowitej liczby klatek na HH:MM:SS:FF
-        frames_per_hour = int(fps * 3600)
-        frames_per_minute = int(fps * 60)
-        frames_per_second = int(fps)
 
-        hours = frames_from_seconds // frames_per_hour
-        remaining_frames = frames_from_seconds % frames_per_hour
-        
-        minutes = remaining_frames // frames_per_minute
-        remaining_frames %= frames_per_minute
-        
-        seconds = remaining_frames // frames_per_second
-        frames = remaining_frames % frames_per_second
+def ltc_frame_seconds(frame_number: int, frame_rate: Fraction) -> Fraction:
+    """Dokładny czas początku klatki `frame_number` (numer z ltc_start_frame) w sekundach od północy."""
+    if _wall_clock_labels(frame_rate):
+        base = round(frame_rate)
+        return frame_number // base + Fraction(frame_number % base * frame_rate.denominator, frame_rate.numerator)
+    return Fraction(frame_number * frame_rate.denominator, frame_rate.numerator)
 
-        # Upewniamy się, że nie ma wartości ujemnych dla klatek (może się zdarzyć przy bardzo małych floatach)
-        frames = max(0, frames)
 
-        start_time_code_string = f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}:{int(frames):02d}"
-        
-        print(f"DEBUG (LTC Gen): Tworzenie obiektu Timecode. Start timecode string: {start_time_code_string}, fps: {fps}")
+def ltc_start_frame(start_time_utc: datetime.datetime, frame_rate: Fraction) -> int:
+    """
+    Numer klatki startowej, od którego timecode_tools.tools wylicza etykiety HH:MM:SS:FF.
+    Dla klatkaży całkowitych i drop-frame to klatki rzeczywistego czasu od północy, liczone w arytmetyce
+    całkowitej (mikrosekundy * klatkaż) i zaokrąglone w dół, aby nie przekroczyć bieżącej klatki.
+    Dla klatkaży ułamkowych bez drop-frame (23.976) etykieta to czas zegarowy HH:MM:SS i klatka w tej sekundzie.
+    """
+    naive_start_time = start_time_utc.replace(tzinfo=None)
+    since_midnight = naive_start_time - naive_start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    microseconds_from_midnight = since_midnight // datetime.timedelta(microseconds=1)
+    if _wall_clock_labels(frame_rate):
+        seconds, microseconds = divmod(microseconds_from_midnight, 10**6)
+        return seconds * round(frame_rate) + microseconds * frame_rate.numerator // (10**6 * frame_rate.denominator)
+    return microseconds_from_midnight * frame_rate.numerator // (10**6 * frame_rate.denominator)
 
-        tc_start = Timecode(fps, start_time_code_string) # Używamy konstruktora Timecode(fps, start_string)
-        print(f"DEBUG (LTC Gen): Obiekt Timecode startowy utworzony: {tc_start}")
 
+def ltc_frame_time(start_time_utc: datetime.datetime, frame_number: int, frame_rate: Fraction) -> datetime.datetime:
+    """
+    Czas początku klatki `frame_number` liczonej od północy dnia `start_time_utc` - odwrotność ltc_start_frame
+    (zaokrąglenie w górę do mikrosekundy, więc ltc_start_frame zwraca dla wyniku dokładnie `frame_number`).
+    """
+    midnight = start_time_utc.replace(hour=0, minute=0, second=0, microsecond=0)
+    microseconds = math.ceil(ltc_frame_seconds(frame_number, frame_rate) * 10**6)
+    return midnight + datetime.timedelta(microseconds=microseconds)
 
-        total_frames_to_generate_ltc = int(duration_seconds * fps)
-        print(f"DEBUG (LTC Gen): Całkowita liczba klatek do wygenerowania LTC: {total_frames_to_generate_ltc}")
 
-        # Generowanie danych LTC dla każdej klatki
-        ltc_frames_data = []
-        current_tc = tc_start
-        # Generujemy o jedną klatkę więcej niż total_frames_to_generate_ltc, aby upewnić się,
-        # że pokrywamy pełny czas trwania i uniknąć niedomiaru w przypadku zaokrągleń
-        for _ in range(total_frames_to_generate_ltc + 1): 
-            ltc_frames_data.append(ltc_encode(current_tc, as_string=True))
-            current_tc.next()
-        
-        # Łączenie danych binarnych LTC
-        ltc_bitstream = ''.join(ltc_frames_data)
-
-        # Generowanie sygnału "Double Pulse" na podstawie bitstreamu LTC
-        double_pulse_data = ''
-        next_is_up = True
-        for bit_char in ltc_bitstream:
-            if bit_char == '0':
-                if next_is_up:
-                    double_pulse_data += '11'
-                else:
-                    double_pulse_data += '00'
-                next_is_up = not next_is_up
-            else:
-                double_pulse_data += '10' if next_is_up else '01'
-        
-        # Konwersja sygnału "Double Pulse" na dane PCM
-        total_samples = int(sample_rate * duration_seconds)
-        
-        # Obliczamy liczbę próbek na "bit" w double_pulse_data
-        # Jeśli double_pulse_data jest puste (mało prawdopodobne, ale dla bezpieczeństwa)
-        if not double_pulse_data:
-            print("Ostrzeżenie: double_pulse_data jest puste, nie można wygenerować audio LTC.")
-            return False
+def ltc_synthesis_params(start_time_utc: datetime.datetime, duration_seconds: float, fps: numbers.Real,
+                         sample_rate: int = LTC_SAMPLE_RATE) -> tuple[int, Fraction, int]:
+    """
+    Sprawdza argumenty syntezy LTC i zwraca (klatka startowa, klatkaż jako Fraction, liczba próbek).
+    Rzuca TypeError dla nieprawidłowych argumentów.
+    """
+    from timecode_tools.tools import frames_to_tc_string, ltc_frame_rate, ltc_rate_params
+    from ltc_audio import ltc_frame_count
 
-        samples_per_bit_in_double_pulse = total_samples / len(double_pulse_data)
+    logger.debug("LTC Gen: start_time_utc=%s, duration_seconds=%s, fps=%s", start_time_utc, duration_seconds, fps)
 
-        # Stworzenie tablicy NumPy na dane audio
-        audio_data = np.zeros(total_samples, dtype=np.int16) # np.int16 dla 16-bitowych próbek
+    if not isinstance(duration_seconds, numbers.Real):
+        raise TypeError(f"duration_seconds musi być liczbą, otrzymano {type(duration_seconds)}: {duration_seconds}")
+    if not isinstance(fps, numbers.Real):
+        raise TypeError(f"fps musi być liczbą, otrzymano {type(fps)}: {fps}")
+    if not isinstance(start_time_utc, datetime.datetime):
+        raise TypeError(f"start_time_utc musi być obiektem datetime.datetime, otrzymano {type(start_time_utc)}: {start_time_utc}")
 
-        on_val = 32767  # Max wartość dla int16
-        off_val = -32768 # Min wartość dla int16
+    frame_rate = ltc_frame_rate(fps)
+    start_frame = ltc_start_frame(start_time_utc, frame_rate)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LTC Gen: timecode startowy %s (klatka %d, fps: %s%s)", frames_to_tc_string(start_frame, frame_rate),
+                     start_frame, frame_rate, ' DF' if ltc_rate_params(frame_rate)[1] else '')
 
-        for i in range(total_samples):
-            # Obliczenie, który bit z double_pulse_data odpowiada bieżącej próbce
-            # Używamy min, aby zapobiec wyjściu poza zakres przy ostatniej próbce
-            double_pulse_index = min(int(i / samples_per_bit_in_double_pulse), len(double_pulse_data) - 1)
-            
-            if double_pulse_data[double_pulse_index] == '1':
-                audio_data[i] = on_val
-            else:
-                audio_data[i] = off_val
-        
-        # Zapisanie danych audio do pliku WAV
-        write_wav(output_path, sample_rate, audio_data)
-        
-        print(f"Wygenerowano tymczasowy plik audio (LTC): {output_path}")
+    total_samples = int(sample_rate * duration_seconds)
+    logger.debug("LTC Gen: całkowita liczba klatek do wygenerowania LTC: %d", ltc_frame_count(frame_rate, sample_rate, total_samples))
+
+    return start_frame, frame_rate, total_samples
+
+
+def generate_ltc_audio_blocks(start_time_utc: datetime.datetime, duration_seconds: float, fps: numbers.Real, sample_rate: int = LTC_SAMPLE_RATE,
+                              workers: int = 1):
+    """
+    Przygotowuje generator bloków PCM (int16, mono) z sygnałem LTC dla całego klipu.
+    `fps` najlepiej podać jako Fraction z ffprobe (np. 30000/1001); liczby zmiennoprzecinkowe są zamieniane
+    na dokładny ułamek (timecode_tools.tools.ltc_frame_rate). Dla 29.97 i 59.94 fps timecode jest drop-frame
+    (z ustawioną flagą DF w ramce LTC). Używa strumieniowego generatora z ltc_audio.py (wsadowy koder
+    ltc_encode_frames z 'timecode_tools/tools.py'), więc zużycie pamięci nie zależy od długości klipu.
+    Z `workers` > 1 bloki są syntezowane równolegle w tylu wątkach (ltc_audio.iter_ltc_pcm_blocks).
+    Rzuca TypeError dla nieprawidłowych argumentów.
+    """
+    from ltc_audio import iter_ltc_pcm_blocks
+
+    start_frame, frame_rate, total_samples = ltc_synthesis_params(start_time_utc, duration_seconds, fps, sample_rate)
+    # Generowanie próbek PCM blokami pełnych klatek, z granicami klatek na dokładnych pozycjach próbek
+    # i klatkami z pamięci podręcznej szablonów (ltc_audio.LTC_TEMPLATE_CACHE)
+    return iter_ltc_pcm_blocks(start_frame, frame_rate, sample_rate, total_samples, workers=workers)
+
+
+def broadcast_wav_chunks(start_time_utc: datetime.datetime, fps: numbers.Real, sample_rate: int = LTC_SAMPLE_RATE,
+                         bits: int = 16, source_name: str | None = None) -> bytes:
+    """
+    Chunki 'bext' i 'iXML' pliku Broadcast WAV z sygnałem LTC.
+    TimeReference to liczba próbek od północy do pierwszej próbki pliku, czyli do początku pierwszej klatki LTC
+    (czas z kodu QR zaokrąglony w dół do klatki); iXML opisuje klatkaż, drop-frame i ten sam znacznik czasu.
+    """
+    from timecode_tools.tools import frames_to_tc_string, ltc_frame_rate, ltc_rate_params
+    from ltc_audio import bext_chunk, ixml_chunk
+
+    frame_rate = ltc_frame_rate(fps)
+    _, drop_frame = ltc_rate_params(frame_rate)
+    start_frame = ltc_start_frame(start_time_utc, frame_rate)
+    # Klatka k zaczyna się w próbce ceil(k * sample_rate / fps) - tak samo jak w ltc_audio.iter_ltc_pcm_blocks
+    time_reference = math.ceil(ltc_frame_seconds(start_frame, frame_rate) * sample_rate)
+    timecode = frames_to_tc_string(start_frame, frame_rate)
+
+    description = f"LTC {timecode} @ {round(float(frame_rate), 3):g} fps{' DF' if drop_frame else ''}"
+    if source_name:
+        description += f" - {source_name}"
+    bext = bext_chunk(description, BWF_ORIGINATOR, source_name or '',
+                      start_time_utc.strftime('%Y-%m-%d'), start_time_utc.strftime('%H:%M:%S'), time_reference,
+                      coding_history=f"A=PCM,F={sample_rate},W={bits},M=mono,T={BWF_ORIGINATOR}\r\n")
+
+    root = ET.Element('BWFXML')
+    ET.SubElement(root, 'IXML_VERSION').text = '2.10'
+    ET.SubElement(root, 'NOTE').text = description
+    speed = ET.SubElement(root, 'SPEED')
+    rate = f"{frame_rate.numerator}/{frame_rate.denominator}"
+    for tag, value in (('MASTER_SPEED', rate), ('CURRENT_SPEED', rate), ('TIMECODE_RATE', rate),
+                       ('TIMECODE_FLAG', 'DF' if drop_frame else 'NDF'),
+                       ('FILE_SAMPLE_RATE', sample_rate), ('AUDIO_BIT_DEPTH', bits), ('DIGITIZER_SAMPLE_RATE', sample_rate),
+                       ('TIMESTAMP_SAMPLES_SINCE_MIDNIGHT_HI', time_reference >> 32),
+                       ('TIMESTAMP_SAMPLES_SINCE_MIDNIGHT_LO', time_reference & 0xFFFFFFFF),
+                       ('TIMESTAMP_SAMPLE_RATE', sample_rate)):
+        ET.SubElement(speed, tag).text = str(value)
+    track_list = ET.SubElement(root, 'TRACK_LIST')
+    ET.SubElement(track_list, 'TRACK_COUNT').text = '1'
+    track = ET.SubElement(track_list, 'TRACK')
+    for tag, value in (('CHANNEL_INDEX', '1'), ('INTERLEAVE_INDEX', '1'), ('NAME', 'LTC')):
+        ET.SubElement(track, tag).text = value
+    ixml = ixml_chunk('<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding='unicode'))
+    return bext + ixml
+
+
+def generate_ltc_audio_file(start_time_utc: datetime.datetime, duration_seconds: float, fps: numbers.Real, output_path: str,
+                            metrics: FileMetrics | None = None, broadcast_wav: bool = False, source_name: str | None = None,
+                            workers: int = 1, wav_writer: str = 'stream'):
+    """
+    Generuje plik WAV zawierający sygnał LTC (patrz generate_ltc_audio_blocks, także `workers`).
+    Z `broadcast_wav` plik jest zapisywany jako Broadcast WAV z chunkami 'bext' (TimeReference) i 'iXML'
+    (patrz broadcast_wav_chunks); `source_name` trafia do opisu pliku.
+    `wav_writer` (WAV_WRITERS): 'stream' dopisuje bloki do pliku, 'memmap' mapuje obszar danych pliku w pamięci
+    i synteza wypełnia go w miejscu (ltc_audio.write_wav_memmap, fill_ltc_pcm).
+    Z `metrics` mierzone są osobno etapy 'ltc_synthesis' i 'wav_write' (przy 'memmap' zapis odbywa się
+    w trakcie syntezy przez pamięć podręczną systemu, więc 'wav_write' to tylko zapis nagłówka i flush).
+    """
+    from ltc_audio import check_wav_data_length, fill_ltc_pcm, write_wav_memmap, write_wav_stream
+
+    sample_rate = LTC_SAMPLE_RATE
+    bits = 16 # Domyślnie 16-bitowe audio, jak w standardach LTC
+
+    try:
+        if wav_writer not in WAV_WRITERS:
+            raise ValueError(f"Nieznany sposób zapisu WAV: {wav_writer} (dostępne: {', '.join(WAV_WRITERS)})")
+        chunks = broadcast_wav_chunks(start_time_utc, fps, sample_rate, bits, source_name) if broadcast_wav else b''
+        start_frame, frame_rate, total_samples = ltc_synthesis_params(start_time_utc, duration_seconds, fps, sample_rate)
+        # Zbyt długi klip (32-bitowe pola rozmiaru RIFF) jest odrzucany przed syntezą, a nie po zapisaniu 4 GB
+        check_wav_data_length(total_samples * bits // 8, sample_rate, bits, chunks=chunks)
+
+        if wav_writer == 'memmap':
+            def fill(samples):
+                def record_block(sample_count):
+                    metrics.add('ltc_samples', sample_count)
+                    metrics.add('ltc_bytes', sample_count * samples.itemsize)
+                with metrics.span('ltc_synthesis') if metrics is not None else contextlib.nullcontext():
+                    fill_ltc_pcm(samples, start_frame, frame_rate, sample_rate, workers=workers,
+                                 on_block=record_block if metrics is not None else None)
+
+            with metrics.span('wav_write', exclude=('ltc_synthesis',)) if metrics is not None else contextlib.nullcontext():
+                write_wav_memmap(output_path, sample_rate, total_samples, fill, bits=bits, chunks=chunks)
+            logger.debug("Wygenerowano plik audio (LTC%s, memmap): %s", ', BWF' if broadcast_wav else '', output_path)
+            return True
+
+        audio_blocks = generate_ltc_audio_blocks(start_time_utc, duration_seconds, fps, sample_rate, workers)
+
+        # Zapisanie danych audio do pliku WAV (nagłówek RIFF uzupełniany po zapisaniu wszystkich bloków)
+        if metrics is None:
+            write_wav_stream(output_path, sample_rate, audio_blocks, bits=bits, chunks=chunks)
+        else:
+            with metrics.span('wav_write', exclude=('ltc_synthesis',)):
+                write_wav_stream(output_path, sample_rate, metrics.measure_blocks(audio_blocks), bits=bits, chunks=chunks)
+
+        logger.debug("Wygenerowano plik audio (LTC%s): %s", ', BWF' if broadcast_wav else '', output_path)
         return True
     except Exception as e:
-        print(f"Błąd podczas generowania pliku LTC audio {output_path}: {e}")
-        traceback.print_exc()
+        logger.error("Błąd podczas generowania pliku LTC audio %s: %s", output_path, e, exc_info=True)
         return False
 
 
+@dataclass
+class VideoPlan:
+    """Wynik etapu analizy pliku wideo - wszystko, czego potrzeba do wygenerowania i osadzenia LTC."""
+    video_path: str
+    start_time_utc: datetime.datetime
+    qr_frame_index: int | None  # None dla kolejnych rozdziałów sesji (czas startu z poprzednich rozdziałów)
+    frame_rate: Fraction
+    duration_seconds: float
+    metrics: FileMetrics | None = None  # pomiary etapu analizy, uzupełniane w etapie łączenia
+
+
 class VideoProcessor:
-    def __init__(self, output_base_dir: str, input_base_dir: str):
+    def __init__(self, output_base_dir: str, input_base_dir: str, ltc_transport: str = 'pipe',
+                 qr_scan_stride_seconds: float = QR_SCAN_STRIDE_SECONDS, qr_frame_source: str = 'opencv',
+                 media_cache_path: str | None = None, use_media_cache: bool = True,
+                 manifest_path: str | None = None, use_manifest: bool = True, output_mode: str = 'remux',
+                 ltc_workers: int = 1, wav_writer: str = 'stream',
+                 qr_hints_path: str | None = None, use_qr_hints: bool = True, read_only: bool = False):
+        if ltc_transport not in LTC_TRANSPORTS:
+            raise ValueError(f"Nieznany sposób przekazania LTC: {ltc_transport} (dostępne: {', '.join(LTC_TRANSPORTS)})")
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Nieznana postać wyniku: {output_mode} (dostępne: {', '.join(OUTPUT_MODES)})")
+        if wav_writer not in WAV_WRITERS:
+            raise ValueError(f"Nieznany sposób zapisu WAV: {wav_writer} (dostępne: {', '.join(WAV_WRITERS)})")
+        if qr_frame_source not in QR_FRAME_SOURCES:
+            raise ValueError(f"Nieznane źródło klatek QR: {qr_frame_source} (dostępne: {', '.join(QR_FRAME_SOURCES)})")
         self.output_base_dir = output_base_dir
         self.input_base_dir = input_base_dir
-        if not os.path.exists(self.output_base_dir):
+        self.ltc_transport = ltc_transport
+        self.ltc_workers = max(1, ltc_workers) # wątki syntezy LTC jednego pliku (ltc_audio.iter_ltc_pcm_blocks)
+        self.wav_writer = wav_writer # 'stream' lub 'memmap' - zapis plików WAV z LTC (sidecar i tymczasowy WAV)
+        self.output_mode = output_mode # 'remux' (kopia wideo z dodaną ścieżką LTC) lub 'sidecar' (WAV + mały .mov z tmcd)
+        self.qr_scan_stride_seconds = qr_scan_stride_seconds # 0 = skanowanie każdej klatki
+        self.qr_frame_source = qr_frame_source # 'opencv' (cv2.VideoCapture) lub 'ffmpeg' (surowe klatki z potoku)
+        self._qr_roi_by_camera = {} # katalog kamery -> (ROI, szerokość dekodowania) ostatnio odczytanego kodu QR
+        self._finished_metrics = [] # rekordy zakończonych plików, odbierane przez drain_metrics()
+        self._known_media = {} # ścieżka -> MediaInfo z metadanych karty (add_media_info)
+        # `read_only` (--dry-run): bez tworzenia katalogu wyjściowego i baz, istniejące bazy są tylko odczytywane
+        self.read_only = read_only
+        if not read_only and not os.path.exists(self.output_base_dir):
             os.makedirs(self.output_base_dir)
+        # Trwała pamięć podręczna wyników ffprobe (domyślnie w katalogu wyjściowym)
+        self.media_cache = None
+        media_cache_path = media_cache_path or os.path.join(self.output_base_dir, MEDIA_CACHE_FILENAME)
+        if use_media_cache and not (read_only and not os.path.exists(media_cache_path)):
+            self.media_cache = MediaInfoCache(media_cache_path, read_only=read_only)
+        # Manifest zadań - stan przetwarzania plików między uruchomieniami (domyślnie w katalogu wyjściowym)
+        self.manifest = None
+        manifest_path = manifest_path or os.path.join(self.output_base_dir, MANIFEST_FILENAME)
+        if use_manifest and not (read_only and not os.path.exists(manifest_path)):
+            self.manifest = JobManifest(manifest_path, read_only=read_only)
+        # Wskazówki wyszukiwania QR (typowa klatka, ROI, skala) każdej kamery między uruchomieniami
+        self.qr_hints = None
+        if use_qr_hints and not read_only:
+            self.qr_hints = QRHintStore(qr_hints_path or os.path.join(self.output_base_dir, QR_HINTS_FILENAME))
+
+    def get_output_path(self, video_path: str) -> str:
+        """
+        Ścieżka pliku wyjściowego w odpowiadającym podkatalogu katalogu wyjściowego:
+        <nazwa>_LTC<rozszerzenie> (tryb 'remux') lub plik LTC <nazwa>_LTC.wav (tryb 'sidecar').
+        """
+        relative_to_input = os.path.relpath(video_path, start=self.input_base_dir)
+        output_sub_dir = os.path.join(self.output_base_dir, os.path.dirname(relative_to_input))
+        base_name, ext = os.path.splitext(os.path.basename(video_path))
+        if self.output_mode == 'sidecar':
+            ext = '.wav'
+        return os.path.join(output_sub_dir, f"{base_name}_LTC{ext}")
+
+    def get_timecode_reference_path(self, video_path: str) -> str:
+        """Ścieżka pliku QuickTime ze ścieżką timecode (tryb 'sidecar'): <nazwa>_TC.mov obok pliku LTC."""
+        base_name = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(os.path.dirname(self.get_output_path(video_path)), f"{base_name}_TC.mov")
+
+    def is_up_to_date(self, video_path: str) -> bool:
+        """
+        Czy plik został już przetworzony we wcześniejszym uruchomieniu w tej samej postaci wyniku,
+        a źródło i plik wyjściowy się nie zmieniły.
+        """
+        if self.manifest is None:
+            return False
+        if self.output_mode == 'sidecar' and not os.path.exists(self.get_timecode_reference_path(video_path)):
+            return False
+        try:
+            return self.manifest.is_complete(video_path, self.get_output_path(video_path), self.output_mode)
+        except sqlite3.Error as e:
+            logger.warning("Nie można odczytać manifestu zadań dla %s: %s", video_path, e)
+            return False
 
-    def _get_video_info(self, video_path: str) -> tuple[float, float]:
-        """Pobiera czas trwania wideo i klatkaż za pomocą ffprobe."""
+    @property
+    def _metrics(self) -> FileMetrics | None:
+        """
+        FileMetrics bieżącego pliku. Trzymane w zmiennej kontekstowej, a nie w atrybucie instancji, żeby
+        pliki przetwarzane jednocześnie w wątkach process_sessions_async nie nadpisywały sobie pomiarów.
+        """
+        return _current_metrics.get()
+
+    @_metrics.setter
+    def _metrics(self, metrics: FileMetrics | None):
+        _current_metrics.set(metrics)
+
+    def drain_metrics(self) -> list[dict]:
+        """Zwraca i czyści rekordy pomiarów (FileMetrics.to_dict()) plików zakończonych od ostatniego wywołania."""
+        records, self._finished_metrics = self._finished_metrics, []
+        return records
+
+    def _span(self, stage: str, exclude: tuple[str, ...] = ()):
+        if self._metrics is None:
+            return contextlib.nullcontext()
+        return self._metrics.span(stage, exclude)
+
+    def _count(self, counter: str, value: float = 1):
+        if self._metrics is not None:
+            self._metrics.add(counter, value)
+
+    def _finish_metrics(self, status: str):
+        if self._metrics is not None:
+            self._metrics.status = status
+            self._finished_metrics.append(self._metrics.to_dict())
+            self._metrics = None
+
+    def _update_manifest(self, method: str, video_path: str, *args):
+        """Zapisuje stan pliku w manifeście; błąd manifestu nie przerywa przetwarzania."""
+        if self.manifest is None:
+            return
+        try:
+            getattr(self.manifest, method)(video_path, *args)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Nie można zapisać stanu w manifeście zadań dla %s: %s", video_path, e)
+
+    def get_media_info(self, video_path: str) -> MediaInfo:
+        """
+        Zwraca informacje o pliku z ffprobe (jedno wywołanie, JSON), korzystając z trwałej pamięci podręcznej, jeśli jest włączona,
+        albo z metadanych karty przekazanych przez add_media_info.
+        """
+        info = self._known_media.get(os.path.abspath(video_path))
+        if info is not None:
+            return info
+        if self.media_cache is not None:
+            return self.media_cache.get_or_probe(video_path)
+        return probe_media(video_path)
+
+    def add_media_info(self, info: MediaInfo):
+        """
+        Zapamiętuje MediaInfo odczytane bez ffprobe (media_discovery: pliki CLPI/CPI, XML XAVC). Wynik ffprobe
+        już zapisany w pamięci podręcznej ma pierwszeństwo; nowy wpis trafia do niej, więc widzą go też
+        procesy robocze.
+        """
+        try:
+            if self.media_cache is not None:
+                if self.media_cache.get(info.path) is not None:
+                    return
+                self.media_cache.put(info)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Nie można zapisać informacji o klipie %s w pamięci podręcznej: %s", info.path, e)
+        self._known_media[info.path] = info
+
+    def _get_video_info(self, video_path: str) -> tuple[float, Fraction]:
+        """Pobiera czas trwania wideo i klatkaż (dokładny ułamek, np. 30000/1001) za pomocą ffprobe."""
         
         try:
-            probe_duration_cmd = [
-                'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', video_path
-            ]
-            duration_result = subprocess.run(probe_duration_cmd, capture_output=True, text=True, check=True)
-            duration_str = duration_result.stdout.strip()
+            with self._span('probe'):
+                media_info = self.get_media_info(video_path)
+            duration_seconds = media_info.duration_seconds
+            frame_rate = media_info.frame_rate_fraction
             
-            if not duration_str:
-                raise ValueError(f"FFprobe nie zwrócił czasu trwania dla {video_path}. Wyjście: '{duration_result.stdout.strip()}' Błąd: '{duration_result.stderr.strip()}'")
-            
-            duration_seconds = float(duration_str)
-
-            probe_fps_cmd = [
-                'ffprobe', '-v', 'error', '-select_streams', 'v:0',
-                '-show_entries', 'stream=avg_frame_rate',
-                '-of', 'default=noprint_wrappers=1:nokey=1', video_path
-            ]
-            fps_result = subprocess.run(probe_fps_cmd, capture_output=True, text=True, check=True)
-            fps_output = fps_result.stdout.strip()
-
-            fps_matches = re.findall(r'^\d+(?:/\d+)?$', fps_output, re.MULTILINE)
-            if not fps_matches:
-                raise ValueError(f"Nie udało się sparsować klatkażu z wyjścia ffprobe dla {video_path}. Wyjście: '{fps_output}' Błąd: '{fps_result.stderr.strip()}'")
-
-            fps_str = fps_matches[0]
-            frame_rate = float(Fraction(fps_str))
-            
-            print(f"DEBUG: _get_video_info dla {video_path} zwróciło: duration={duration_seconds}, fps={frame_rate}")
+            logger.debug("_get_video_info dla %s: duration=%s, fps=%s, codec=%s, audio=%s, timecode=%s", video_path,
+                         duration_seconds, frame_rate, media_info.codec, media_info.audio_streams, media_info.start_timecode)
             return duration_seconds, frame_rate
-        except (subprocess.CalledProcessError, ValueError, ZeroDivisionError) as e:
+        except (subprocess.CalledProcessError, ValueError, ZeroDivisionError, sqlite3.Error) as e:
             raise ValueError(f"Błąd podczas pobierania informacji wideo dla {video_path}: {e}") from e
 
 
-    def _read_qr_from_video(self, video_path: str, frame_rate: float) -> tuple[datetime.datetime | None, int]:
-        """Odczytuje pierwszy prawidłowy kod QR z początku wideo."""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Błąd: Nie można otworzyć pliku wideo {video_path}")
-            return None, -1
-
-        first_qr_time = None
-        first_qr_frame_index = -1
-
-        frame_index = 0
-        max_frames_to_scan = int(frame_rate * 10) # Skanuj pierwsze 5 sekund
+    def _read_qr_from_video(self, video_path: str, frame_rate: numbers.Real) -> tuple[datetime.datetime | None, int]:
+        """
+        Odczytuje pierwszy prawidłowy kod QR z początku wideo.
+        Skanowana jest co n-ta klatka (co `qr_scan_stride_seconds`), a po trafieniu wyszukiwana jest dokładnie
+        pierwsza klatka z kodem (patrz qr_scanner.find_first_qr_frame). Klatki są dekodowane w skali szarości,
+        od najmniejszej rozdzielczości, najpierw w miejscu, gdzie kod był w poprzednim klipie tej kamery.
+        Ze wskazówkami QR (qr_hints) wyszukiwanie zaczyna się od typowej klatki z kodem tej kamery.
+        """
+        # Położenie i skala kodu QR z poprzednich klipów tej samej kamery (katalogu)
+        camera_key = os.path.dirname(os.path.abspath(video_path))
+        roi, decode_width = self._qr_roi_by_camera.get(camera_key, (None, None))
+        hint_frame = None
+        hint = None
+        if self.qr_hints is not None:
+            try:
+                hint = self.qr_hints.get(camera_key)
+            except sqlite3.Error as e:
+                logger.warning("Nie można odczytać wskazówki QR dla %s: %s", camera_key, e)
+        if hint is not None:
+            hint_frame = hint.frame_index
+            if roi is None:
+                roi, decode_width = hint.roi, hint.decode_width
+        from qr_scanner import OpenCVFrameSource, FFmpegFrameSource, QRFrameDecoder, find_first_qr_frame
+
+        decoder = QRFrameDecoder(parse_gopro_qr_timecode, roi=roi, decode_width=decode_width)
+
+        max_frames_to_scan = int(frame_rate * 10) # Skanuj pierwsze 10 sekund
         if max_frames_to_scan < 50: # Przynajmniej 50 klatek, żeby nie przegapić QR
             max_frames_to_scan = 50
 
-        while frame_index < max_frames_to_scan:
-            ret, frame = cap.read()
-            if not ret:
-                print(f"Ostrzeżenie: Osiągnięto koniec wideo lub nie udało się odczytać klatki {frame_index} dla {video_path}.")
-                break
+        try:
+            if self.qr_frame_source == 'ffmpeg':
+                media_info = self.get_media_info(video_path)
+                source = FFmpegFrameSource(video_path, float(frame_rate), float(max_frames_to_scan / frame_rate),
+                                           width=media_info.width, height=media_info.height)
+            else:
+                source = OpenCVFrameSource(video_path)
+        except (subprocess.CalledProcessError, ValueError, IndexError, OSError, sqlite3.Error) as e:
+            logger.error("Nie można otworzyć pliku wideo %s (%s): %s", video_path, self.qr_frame_source, e)
+            return None, -1
+        if not source.is_opened():
+            logger.error("Nie można otworzyć pliku wideo %s", video_path)
+            return None, -1
+        stride = max(1, int(round(frame_rate * self.qr_scan_stride_seconds)))
 
-            decoded_objects = pyzbar.decode(frame)
-            for obj in decoded_objects:
+        try:
+            with self._span('qr'):
+                first_qr_time, first_qr_frame_index = find_first_qr_frame(source, decoder, max_frames_to_scan, stride, hint_frame)
+        finally:
+            source.release()
+            self._count('frames_read', source.frames_read)
+            self._count('qr_frames_decoded', decoder.frames_decoded)
+            self._count('pyzbar_calls', decoder.pyzbar_calls)
+
+        if first_qr_time is None:
+            logger.info("Nie znaleziono prawidłowego kodu QR w pierwszych %d klatkach %s.", max_frames_to_scan, video_path)
+        else:
+            self._qr_roi_by_camera[camera_key] = (decoder.roi, decoder.decode_width)
+            if hint_frame is not None:
+                self._count('qr_hint_hits', int(first_qr_frame_index == hint_frame))
+            if self.qr_hints is not None:
                 try:
-                    qr_data = obj.data.decode('utf-8')
-                    # Upewnij się, że parse_gopro_qr_timecode jest zdefiniowane
-                    qr_timestamp = parse_gopro_qr_timecode(qr_data) 
-                    first_qr_time = qr_timestamp
-                    first_qr_frame_index = frame_index
-                    cap.release()
-                    return first_qr_time, first_qr_frame_index
-                except ValueError as e:
-                    # print(f"Ostrzeżenie: Nieprawidłowy kod QR: {e}") # Można włączyć dla debugowania
-                    continue
-
-            frame_index += 1
+                    self.qr_hints.record(camera_key, first_qr_frame_index, decoder.roi, decoder.decode_width)
+                except sqlite3.Error as e:
+                    logger.warning("Nie można zapisać wskazówki QR dla %s: %s", camera_key, e)
+        return first_qr_time, first_qr_frame_index
 
-        cap.release()
-        print(f"Nie znaleziono prawidłowego kodu QR w pierwszych {max_frames_to_scan} klatkach {video_path}.")
-        return None, -1
-
-    def _add_ltc_track_to_video(self, video_path: str, start_datetime_utc: datetime.datetime, frame_rate: float, duration_seconds: float) -> bool:
+    def _add_ltc_track_to_video(self, video_path: str, start_datetime_utc: datetime.datetime, frame_rate: numbers.Real, duration_seconds: float) -> bool:
         """Dodaje ścieżkę audio z sygnałem (LTC) do wideo za pomocą ffmpeg."""
 
-        relative_to_input = os.path.relpath(video_path, start=self.input_base_dir)
-        output_sub_dir = os.path.join(self.output_base_dir, os.path.dirname(relative_to_input))
-        os.makedirs(output_sub_dir, exist_ok=True)
+        output_path = self.get_output_path(video_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
         base_name, ext = os.path.splitext(os.path.basename(video_path))
-        output_filename = f"{base_name}_LTC{ext}"
-        output_path = os.path.join(output_sub_dir, output_filename)
-
         temp_ltc_audio_file = os.path.join(os.path.dirname(output_path), f"temp_ltc_{base_name}.wav")
 
         if start_datetime_utc is None or duration_seconds is None or frame_rate is None:
-            print(f"Błąd (w _add_ltc_track_to_video): Brak wymaganych danych (czas rozpoczęcia, czas trwania lub klatkaż) do wygenerowania audio dla {video_path}. Pomijam generowanie audio.")
+            logger.error("Brak wymaganych danych (czas rozpoczęcia, czas trwania lub klatkaż) do wygenerowania audio dla %s. Pomijam generowanie audio.", video_path)
             return False
 
-        if not isinstance(duration_seconds, (int, float)) or not isinstance(frame_rate, (int, float)):
-            print(f"Błąd (w _add_ltc_track_to_video): Czas trwania ({duration_seconds}) lub klatkaż ({frame_rate}) nie jest liczbą dla {video_path}. Pomijam generowanie audio.")
+        if not isinstance(duration_seconds, numbers.Real) or not isinstance(frame_rate, numbers.Real):
+            logger.error("Czas trwania (%s) lub klatkaż (%s) nie jest liczbą dla %s. Pomijam generowanie audio.", duration_seconds, frame_rate, video_path)
             return False
 
+        # ffmpeg zapisuje do pliku .part, który po sukcesie zastępuje plik wyjściowy - przerwany zapis
+        # nigdy nie zostawia niepełnego pliku pod docelową nazwą
+        partial_output_path = os.path.join(os.path.dirname(output_path), f"{base_name}_LTC.part{ext}")
+
+        ok = False
+        if self.ltc_transport == 'pipe':
+            ok = self._mux_ltc_track(video_path, partial_output_path, start_datetime_utc, frame_rate, duration_seconds)
+            if not ok:
+                logger.warning("Przesłanie LTC do ffmpeg przez potok nie powiodło się dla %s. Ponawiam z tymczasowym plikiem WAV.", video_path)
 
-        if not generate_ltc_audio_file(start_datetime_utc, duration_seconds, frame_rate, temp_ltc_audio_file):
+        if not ok:
+            ok = self._mux_ltc_track(video_path, partial_output_path, start_datetime_utc, frame_rate, duration_seconds, temp_ltc_audio_file)
+
+        if not ok:
+            if os.path.exists(partial_output_path):
+                os.remove(partial_output_path)
             return False
+        os.replace(partial_output_path, output_path)
+        self._count('output_bytes', os.path.getsize(output_path))
+        logger.info("Plik zapisano jako %s", output_path)
+        return True
 
-        # Komenda FFmpeg do dodawania ścieżki audio
+    def _write_ltc_sidecar(self, video_path: str, start_datetime_utc: datetime.datetime, frame_rate: numbers.Real, duration_seconds: float) -> bool:
+        """
+        Zapisuje LTC obok wideo zamiast kopiować cały plik (tryb 'sidecar'): <nazwa>_LTC.wav z sygnałem LTC
+        (Broadcast WAV z TimeReference w chunku 'bext' i metadanymi iXML) i <nazwa>_TC.mov ze ścieżką timecode (tmcd) zaczynającą się od tej samej klatki co LTC.
+        Oba pliki powstają jako .part i zastępują pliki docelowe dopiero, gdy oba się udały.
+        """
+        if start_datetime_utc is None or duration_seconds is None or frame_rate is None:
+            logger.error("Brak wymaganych danych (czas rozpoczęcia, czas trwania lub klatkaż) do wygenerowania LTC dla %s.", video_path)
+            return False
+
+        wav_path = self.get_output_path(video_path)
+        reference_path = self.get_timecode_reference_path(video_path)
+        os.makedirs(os.path.dirname(wav_path), exist_ok=True)
+        partial_paths = {path: f"{os.path.splitext(path)[0]}.part{os.path.splitext(path)[1]}" for path in (wav_path, reference_path)}
+
+        ok = (generate_ltc_audio_file(start_datetime_utc, duration_seconds, frame_rate, partial_paths[wav_path], self._metrics,
+                                      broadcast_wav=True, source_name=os.path.basename(video_path),
+                                      workers=self.ltc_workers, wav_writer=self.wav_writer)
+              and self._write_timecode_reference(video_path, partial_paths[reference_path], start_datetime_utc, frame_rate, duration_seconds))
+        if not ok:
+            for partial_path in partial_paths.values():
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            return False
+        for path, partial_path in partial_paths.items():
+            os.replace(partial_path, path)
+            self._count('output_bytes', os.path.getsize(path))
+        logger.info("Zapisano LTC jako %s i %s", wav_path, reference_path)
+        return True
+
+    def _write_timecode_reference(self, video_path: str, output_path: str, start_datetime_utc: datetime.datetime,
+                                  frame_rate: numbers.Real, duration_seconds: float) -> bool:
+        """
+        Zapisuje mały plik QuickTime ze ścieżką timecode (tmcd) o klatkażu i długości klipu.
+        Obraz zastępczy (czarny 16x16, qtrle) kompresuje się prawie do zera, więc plik ma kilkaset KB.
+        """
+        from timecode_tools.tools import frames_to_tc_string, ltc_frame_rate
+
+        frame_rate = ltc_frame_rate(frame_rate)
+        timecode = frames_to_tc_string(ltc_start_frame(start_datetime_utc, frame_rate), frame_rate)
         command = [
+            'ffmpeg',
+            '-f', 'lavfi',
+            '-i', f"color=c=black:s={SIDECAR_VIDEO_SIZE}:r={frame_rate.numerator}/{frame_rate.denominator}:d={duration_seconds}",
+            '-c:v', 'qtrle',      # QuickTime Animation - klatki bez zmian zajmują kilka bajtów
+            '-timecode', timecode, # Ścieżka tmcd z timecode pierwszej klatki (';' = drop-frame)
+            '-benchmark',
+            '-y',
+            '-metadata', f"creation_time={start_datetime_utc.isoformat(timespec='milliseconds').replace('+00:00', 'Z')}",
+            output_path
+        ]
+        logger.debug("FFmpeg command (timecode): %s", subprocess.list2cmdline(command))
+        try:
+            with self._span('ffmpeg'):
+                result = run_ffmpeg(command, on_progress=self._ffmpeg_progress_logger(video_path))
+            self._record_ffmpeg_benchmark(result.stderr)
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error("Błąd FFmpeg podczas zapisu ścieżki timecode dla %s: %s\nFFmpeg stderr (ostatnie linie):\n%s", video_path, e, e.stderr)
+            return False
+        except FileNotFoundError:
+            logger.error("ffmpeg nie znaleziono. Upewnij się, że jest zainstalowany i dostępny w PATH.")
+            return False
+
+    def _build_ffmpeg_command(self, video_path: str, ltc_input_args: list[str], output_path: str, start_datetime_utc: datetime.datetime) -> list[str]:
+        """Buduje komendę FFmpeg dodającą ścieżkę LTC; `ltc_input_args` opisują drugie wejście (plik WAV lub potok)."""
+        return [
             'ffmpeg',
             '-i', video_path,
-            '-i', temp_ltc_audio_file,
+            *ltc_input_args,
             '-map', '0:v:0',      # Mapuje pierwszą ścieżkę wideo z wejścia 0 (oryginalne wideo)
             '-map', '0:a?',       # Mapuje wszystkie istniejące ścieżki audio z wejścia 0, jeśli są
             '-map', '1:a:0',      # Mapuje pierwszą ścieżkę audio z wejścia 1 (nasz nowo wygenerowany LTC)
@@ -370,57 +694,314 @@ class VideoProcessor:
             '-c:a:1', 'pcm_s16le', # Koduje NOWĄ (drugą, jeśli była oryginalna) ścieżkę audio (nasz LTC) jako PCM 16-bit Little-Endian
                                    # UWAGA: Index `1` dla `-c:a:1` oznacza, że ta opcja będzie dotyczyć mapowanego strumienia audio z indeksu 1 (czyli `1:a:0`)
             '-shortest',          # Kończy kodowanie, gdy najkrótszy strumień się skończy
+            '-benchmark',         # Wypisuje na końcu czas CPU ffmpeg (utime/stime/rtime) - trafia do metryk
             '-y',                 # Nadpisuje plik wyjściowy bez pytania
             '-metadata', f"creation_time={start_datetime_utc.isoformat(timespec='milliseconds').replace('+00:00', 'Z')}", # Dodaje metadane czasu utworzenia
             output_path
         ]
 
-        print(f"FFmpeg command (final): {' '.join(command)}")
-
+    def _ffmpeg_progress_logger(self, video_path: str):
+        """Funkcja dla ffmpeg_runner (on_progress) logująca postęp ffmpeg na poziomie DEBUG; None bez DEBUG."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return None
+        name = os.path.basename(video_path)
+
+        def log_progress(progress: dict):
+            logger.debug("FFmpeg %s: %s, %s B, speed=%s (%s)", name, progress.get('out_time'), progress.get('total_size'),
+                         progress.get('speed'), progress.get('progress'))
+        return log_progress
+
+    def _record_ffmpeg_benchmark(self, stderr: str | None):
+        """Dopisuje do metryk czas CPU ffmpeg z wyjścia opcji -benchmark ('bench: utime=...s stime=...s rtime=...s')."""
+        if self._metrics is None or not stderr:
+            return
+        match = FFMPEG_BENCH_PATTERN.search(stderr)
+        if match:
+            utime, stime, rtime = (float(value) for value in match.groups())
+            self._metrics.add_stage('ffmpeg', utime_s=utime, stime_s=stime, rtime_s=rtime)
+
+    def _mux_ltc_track(self, video_path: str, output_path: str, start_datetime_utc: datetime.datetime, frame_rate: numbers.Real, duration_seconds: float, temp_ltc_audio_file: str | None = None) -> bool:
+        """
+        Generuje LTC i łączy go z wideo. Bez `temp_ltc_audio_file` próbki trafiają do ffmpeg przez stdin
+        (surowe s16le), w przeciwnym razie najpierw zapisywany jest tymczasowy plik WAV.
+        """
         try:
-            # Użycie subprocess.run z przekierowaniem wyjścia dla lepszego debugowania
-            result = subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8')
-            print(f"Pomyślnie dodano sygnał audio (LTC) do {video_path}. Plik zapisano jako {output_path}")
-            if result.stdout:
-                print("FFmpeg stdout (fragment):\n", result.stdout[-500:]) # Ostatnie 500 znaków
-            if result.stderr:
-                print("FFmpeg stderr (fragment):\n", result.stderr[-500:]) # Ostatnie 500 znaków
+            if temp_ltc_audio_file is None:
+                audio_blocks = generate_ltc_audio_blocks(start_datetime_utc, duration_seconds, frame_rate, LTC_SAMPLE_RATE, self.ltc_workers)
+                if self._metrics is not None:
+                    audio_blocks = self._metrics.measure_blocks(audio_blocks)
+                ltc_input_args = ['-f', 's16le', '-ar', str(LTC_SAMPLE_RATE), '-ac', '1', '-i', 'pipe:0']
+            else:
+                if not generate_ltc_audio_file(start_datetime_utc, duration_seconds, frame_rate, temp_ltc_audio_file, self._metrics,
+                                               workers=self.ltc_workers, wav_writer=self.wav_writer):
+                    return False
+                ltc_input_args = ['-i', temp_ltc_audio_file]
+
+            # Komenda FFmpeg do dodawania ścieżki audio
+            command = self._build_ffmpeg_command(video_path, ltc_input_args, output_path, start_datetime_utc)
+            logger.debug("FFmpeg command (final): %s", subprocess.list2cmdline(command))
+
+            # Postęp ffmpeg jest czytany na bieżąco (-progress), a ze stderr zostaje tylko końcówka
+            stdin_blocks = None
+            if temp_ltc_audio_file is None:
+                import numpy as np
+                stdin_blocks = (np.ascontiguousarray(block, dtype='<i2').tobytes() for block in audio_blocks)
+            with self._span('ffmpeg', exclude=('ltc_synthesis',)):
+                result = run_ffmpeg(command, stdin_blocks, on_progress=self._ffmpeg_progress_logger(video_path))
+            self._record_ffmpeg_benchmark(result.stderr)
+            logger.debug("Pomyślnie dodano sygnał audio (LTC) do %s (%s B).", video_path, result.progress.get('total_size'))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("FFmpeg stderr (fragment):\n%s", result.stderr[-500:]) # Ostatnie 500 znaków
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Błąd FFmpeg podczas dodawania audio do {video_path}: {e}")
-            print("FFmpeg stdout (pełny):\n", e.stdout)
-            print("FFmpeg stderr (pełny):\n", e.stderr)
+            logger.error("Błąd FFmpeg podczas dodawania audio do %s: %s\nFFmpeg stderr (ostatnie linie):\n%s",
+                         video_path, e, e.stderr)
             return False
         except FileNotFoundError:
-            print("Błąd: ffmpeg nie znaleziono. Upewnij się, że jest zainstalowany i dostępny w PATH.")
+            logger.error("ffmpeg nie znaleziono. Upewnij się, że jest zainstalowany i dostępny w PATH.")
             return False
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd podczas wywołania FFmpeg dla {video_path}: {e}")
-            traceback.print_exc()
+            logger.error("Wystąpił nieoczekiwany błąd podczas wywołania FFmpeg dla %s: %s", video_path, e, exc_info=True)
             return False
         finally:
-            if os.path.exists(temp_ltc_audio_file):
+            if temp_ltc_audio_file is not None and os.path.exists(temp_ltc_audio_file):
                 os.remove(temp_ltc_audio_file)
-                print(f"Usunięto tymczasowy plik audio (LTC): {temp_ltc_audio_file}")
-
-    def process_video(self, video_path: str) -> bool:
-        """Przetwarza pojedynczy plik wideo, aby dodać ścieżkę audio (LTC)."""
-        print(f"Przetwarzanie: {video_path}")
+                logger.debug("Usunięto tymczasowy plik audio (LTC): %s", temp_ltc_audio_file)
+
+    def analyze_video(self, video_path: str) -> VideoPlan | None:
+        """
+        Etap analizy (ffprobe + odczyt QR) dla pojedynczego pliku wideo.
+        Zwraca VideoPlan gotowy do etapu łączenia (mux_video) albo None, jeśli pliku nie da się przetworzyć.
+        """
+        logger.info("Przetwarzanie: %s", video_path)
+        self._update_manifest('mark_running', video_path)
+        self._metrics = FileMetrics(video_path, self._camera_name(video_path))
+        plan = self._plan_video(video_path)
+        if plan is None:
+            self._update_manifest('mark_failed', video_path, "analiza nie powiodła się (brak kodu QR lub błąd odczytu)")
+            self._finish_metrics('failed')
+        else:
+            self._update_manifest('record_qr', video_path, plan.start_time_utc, plan.qr_frame_index)
+            plan.metrics, self._metrics = self._metrics, None
+        return plan
+
+    def analyze_session(self, session: RecordingSession) -> list[VideoPlan | None]:
+        """
+        Etap analizy sesji nagrania (sessions.py). Dla pojedynczego pliku to analyze_video. Dla rozdziałów GoPro
+        kod QR jest odczytywany tylko z pierwszego rozdziału, a kolejne zaczynają się od klatki LTC następującej
+        po ostatniej klatce poprzedniego (czasy trwania z ffprobe liczone w pełnych klatkach) - LTC jest ciągły
+        w całej sesji, a rozdziały mogą być łączone niezależnie od siebie.
+        Zwraca plany (albo None) dla rozdziałów session.pending, w tej samej kolejności.
+        """
+        plans = {}
+        try:
+            if len(session.chapters) == 1:
+                for video_path in session.pending:
+                    plans[video_path] = self.analyze_video(video_path)
+                return [plans[video_path] for video_path in session.pending]
+
+            logger.info("Sesja %s: %d rozdziały, kod QR z pierwszego rozdziału", session.name, len(session.chapters))
+            from timecode_tools.tools import ltc_frame_rate
+
+            first = session.chapters[0]
+            # Gotowy już pierwszy rozdział jest potrzebny tylko do odczytu czasu startu sesji (bez zmian w manifeście)
+            first_plan = self.analyze_video(first) if first in session.pending else self._plan_video(first)
+            plans[first] = first_plan
+
+            next_frame = None
+            if first_plan is not None:
+                frame_rate = ltc_frame_rate(first_plan.frame_rate)
+                next_frame = ltc_start_frame(first_plan.start_time_utc, frame_rate) + round(first_plan.duration_seconds * frame_rate)
+            for chapter in session.chapters[1:]:
+                if chapter not in session.pending:
+                    if next_frame is not None:
+                        try:
+                            duration_seconds, _ = self._get_video_info(chapter)
+                            next_frame += round(duration_seconds * frame_rate)
+                        except Exception as e:
+                            logger.error("Nie można odczytać czasu trwania rozdziału %s: %s", chapter, e)
+                            next_frame = None
+                    continue
+                plans[chapter] = plan = self._analyze_chapter(chapter, first_plan, next_frame)
+                next_frame = None if plan is None else next_frame + round(plan.duration_seconds * frame_rate)
+        except Exception as e:
+            # Błąd jednej sesji nie przerywa przetwarzania pozostałych - jej nieprzeanalizowane rozdziały są nieudane
+            logger.error("Wystąpił nieoczekiwany błąd podczas analizy sesji %s: %s", session.name, e, exc_info=True)
+            self._finish_metrics('failed')
+            for video_path in session.pending:
+                if video_path not in plans:
+                    plans[video_path] = None
+                    self._update_manifest('mark_failed', video_path, f"analiza sesji nie powiodła się: {e}")
+        return [plans[video_path] for video_path in session.pending]
+
+    def _analyze_chapter(self, video_path: str, first_plan: VideoPlan | None, start_frame: int | None) -> VideoPlan | None:
+        """Plan kolejnego rozdziału sesji: czas startu to początek klatki LTC `start_frame` (bez odczytu QR)."""
+        logger.info("Przetwarzanie: %s", video_path)
+        self._update_manifest('mark_running', video_path)
+        self._metrics = FileMetrics(video_path, self._camera_name(video_path))
+        plan = None
+        if start_frame is None:
+            error = "brak czasu startu sesji (kod QR w pierwszym rozdziale) lub czasu trwania poprzedniego rozdziału"
+        else:
+            try:
+                from timecode_tools.tools import ltc_frame_rate
+
+                duration_seconds, frame_rate = self._get_video_info(video_path)
+                if ltc_frame_rate(frame_rate) != ltc_frame_rate(first_plan.frame_rate):
+                    error = f"klatkaż {frame_rate} różni się od klatkażu pierwszego rozdziału ({first_plan.frame_rate})"
+                else:
+                    start_time_utc = ltc_frame_time(first_plan.start_time_utc, start_frame, ltc_frame_rate(frame_rate))
+                    plan = VideoPlan(video_path, start_time_utc, None, frame_rate, duration_seconds)
+                    logger.info("Rozdział sesji %s: start %s (klatka LTC %d)", os.path.basename(first_plan.video_path),
+                                start_time_utc.isoformat(), start_frame)
+            except ValueError as e:
+                error = str(e)
+            except Exception as e:
+                logger.error("Wystąpił nieoczekiwany błąd podczas przetwarzania %s: %s", video_path, e, exc_info=True)
+                error = f"nieoczekiwany błąd: {e}"
+        if plan is None:
+            logger.warning("Pomijanie %s: %s.", video_path, error)
+            self._update_manifest('mark_failed', video_path, error)
+            self._finish_metrics('failed')
+        else:
+            self._update_manifest('record_qr', video_path, plan.start_time_utc, None)
+            plan.metrics, self._metrics = self._metrics, None
+        return plan
+
+    def _camera_name(self, video_path: str) -> str:
+        """Katalog pliku względem katalogu wejściowego - etykieta kamery w metrykach."""
+        return os.path.dirname(os.path.relpath(video_path, start=self.input_base_dir)) or '.'
+
+    def _plan_video(self, video_path: str) -> VideoPlan | None:
         try:
             duration_seconds, frame_rate = self._get_video_info(video_path)
 
             calculated_start_time_utc, qr_frame_index = self._read_qr_from_video(video_path, frame_rate)
 
             if calculated_start_time_utc:
-                print(f"Znaleziono QR kod w klatce {qr_frame_index}: {calculated_start_time_utc.isoformat()}")
-                print(f"Obliczony czas rozpoczęcia wideo (UTC): {calculated_start_time_utc}")
-                return self._add_ltc_track_to_video(video_path, calculated_start_time_utc, frame_rate, duration_seconds)
+                logger.info("Znaleziono QR kod w klatce %d: %s", qr_frame_index, calculated_start_time_utc.isoformat())
+                logger.debug("Obliczony czas rozpoczęcia wideo (UTC): %s", calculated_start_time_utc)
+                return VideoPlan(video_path, calculated_start_time_utc, qr_frame_index, frame_rate, duration_seconds)
             else:
-                print(f"Pomijanie {video_path}: Nie znaleziono prawidłowego kodu QR lub błąd odczytu.")
-                return False
+                logger.warning("Pomijanie %s: Nie znaleziono prawidłowego kodu QR lub błąd odczytu.", video_path)
+                return None
         except ValueError as e:
-            print(f"Wystąpił błąd podczas pobierania informacji o wideo dla {video_path}: {e}")
-            return False
+            logger.error("Wystąpił błąd podczas pobierania informacji o wideo dla %s: %s", video_path, e)
+            return None
+        except Exception as e:
+            logger.error("Wystąpił nieoczekiwany błąd podczas przetwarzania %s: %s", video_path, e, exc_info=True)
+            return None
+
+    def mux_video(self, plan: VideoPlan) -> bool:
+        """
+        Etap generowania LTC i łączenia go z wideo (ffmpeg) na podstawie wyniku analyze_video;
+        w trybie 'sidecar' zamiast kopii wideo zapisywane są plik LTC i plik ze ścieżką timecode.
+        """
+        self._metrics = plan.metrics or FileMetrics(plan.video_path, self._camera_name(plan.video_path))
+        write_output = self._write_ltc_sidecar if self.output_mode == 'sidecar' else self._add_ltc_track_to_video
+        try:
+            ok = write_output(plan.video_path, plan.start_time_utc, plan.frame_rate, plan.duration_seconds)
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd podczas przetwarzania {video_path}: {e}")
+            logger.error("Wystąpił nieoczekiwany błąd podczas przetwarzania %s: %s", plan.video_path, e, exc_info=True)
+            ok = False
+        if ok:
+            self._update_manifest('mark_done', plan.video_path, self.get_output_path(plan.video_path), self.output_mode)
+        else:
+            self._update_manifest('mark_failed', plan.video_path, "łączenie LTC z wideo (ffmpeg) nie powiodło się")
+        self._finish_metrics('done' if ok else 'failed')
+        return ok
+
+    def process_video(self, video_path: str) -> bool:
+        """Przetwarza pojedynczy plik wideo, aby dodać ścieżkę audio (LTC)."""
+        plan = self.analyze_video(video_path)
+        if plan is None:
             return False
+        return self.mux_video(plan)
+
+    async def process_sessions_async(self, sessions: list[RecordingSession], probe_jobs: int = 4, analyze_jobs: int = 1,
+                                     mux_jobs: int = 2, device_jobs: int | None = None, on_file_done=None) -> dict[str, bool]:
+        """
+        Przetwarza sesje w jednym procesie jako zadania asyncio z osobnymi limitami równoległości:
+        ffprobe wszystkich plików (`probe_jobs`, wyniki trafiają do pamięci podręcznej), analiza sesji - odczyt QR
+        (`analyze_jobs`) i łączenie plików (`mux_jobs`). Analiza sesji czeka tylko na ffprobe jej rozdziałów,
+        a łączenie pliku startuje zaraz po analizie jego sesji, więc ffprobe i odczyt QR kolejnych plików
+        nakładają się na ffmpeg bieżących - bez przerw między procesami. Etapy działają w wątkach
+        (ffmpeg, ffprobe, OpenCV i pyzbar zwalniają GIL), każdy z własnymi pomiarami (_metrics).
+        Z `device_jobs` na każdym urządzeniu źródłowym i docelowym (st_dev, io_scheduler.py) działa najwyżej
+        tyle łączeń naraz.
+        `on_file_done(video_path, ok)` jest wywoływana w wątku pętli zdarzeń po zakończeniu każdego pliku.
+        Zwraca {plik: czy się udało} dla plików session.pending.
+        """
+        loop = asyncio.get_running_loop()
+        probe_limit = asyncio.Semaphore(max(1, probe_jobs))
+        analyze_limit = asyncio.Semaphore(max(1, analyze_jobs))
+        mux_jobs = max(1, mux_jobs)
+        mux_ready = asyncio.Condition()
+        slots = DeviceSlots(device_jobs)
+        running_mux = 0
+        results = {}
+
+        def run_in_thread(executor, func, *args):
+            # Kopia kontekstu (jak w asyncio.to_thread), żeby _metrics pliku nie wyciekały między zadaniami
+            return loop.run_in_executor(executor, functools.partial(contextvars.copy_context().run, func, *args))
+
+        async def probe(video_path: str):
+            async with probe_limit:
+                try:
+                    await run_in_thread(executor, self.get_media_info, video_path)
+                except (subprocess.CalledProcessError, ValueError, OSError, sqlite3.Error) as e:
+                    # Błąd zostanie zgłoszony (i zapisany w manifeście) przy analizie pliku
+                    logger.debug("ffprobe %s nie powiódł się przed analizą: %s", video_path, e)
+
+        def file_done(video_path: str, ok: bool):
+            results[video_path] = ok
+            if on_file_done is not None:
+                on_file_done(video_path, ok)
+
+        def file_failed(video_path: str, error: Exception):
+            # Błąd jednego pliku nie przerywa pozostałych zadań (jak w batch_runner.run_batch)
+            logger.error("Wystąpił nieoczekiwany błąd podczas przetwarzania %s: %s", video_path, error,
+                         exc_info=(type(error), error, error.__traceback__))
+            self._update_manifest('mark_failed', video_path, f"nieoczekiwany błąd: {error}")
+            file_done(video_path, False)
+
+        async def mux(video_path: str, plan: VideoPlan | None):
+            nonlocal running_mux
+            ok = False
+            try:
+                if plan is not None:
+                    devices = job_devices(video_path, self.get_output_path(video_path))
+                    async with mux_ready:
+                        await mux_ready.wait_for(lambda: running_mux < mux_jobs and slots.can_start(devices))
+                        running_mux += 1
+                        slots.start(devices)
+                    try:
+                        ok = await run_in_thread(executor, self.mux_video, plan)
+                    finally:
+                        async with mux_ready:
+                            running_mux -= 1
+                            slots.finish(devices)
+                            mux_ready.notify_all()
+            except Exception as e:
+                file_failed(video_path, e)
+                return
+            file_done(video_path, ok)
+
+        async def run_session(session: RecordingSession):
+            try:
+                await asyncio.gather(*(probes[video_path] for video_path in session.chapters))
+                async with analyze_limit:
+                    plans = await run_in_thread(executor, self.analyze_session, session)
+            except Exception as e:
+                for video_path in session.pending:
+                    file_failed(video_path, e)
+                return
+            await asyncio.gather(*(mux(video_path, plan) for video_path, plan in zip(session.pending, plans)))
+
+        # Wątków tyle, ile łącznie może działać etapów - żaden limit nie czeka na wolny wątek innego etapu
+        with ThreadPoolExecutor(max_workers=max(1, probe_jobs) + max(1, analyze_jobs) + mux_jobs,
+                                thread_name_prefix='ltc') as executor:
+            probes = {video_path: asyncio.create_task(probe(video_path))
+                      for session in sessions for video_path in session.chapters}
+            await asyncio.gather(*(run_session(session) for session in sessions))
+        return results